@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: batch hand evaluator based on numpy
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import numpy as np
+
+from texaspoker import TexasPoker
+
+
+class BatchEvaluator:
+    """
+    用numpy一次计算很多手牌的rank key，结果和TexasPoker.rank_key_ints相同
+
+    牌用整数编码，点数位图的第w位表示权重w（1~13），A同时占第0位用来判断A2345。
+    取最大的k个权重等操作都预先做成以14位位图为下标的表。
+    """
+    CHUNK_SIZE = 1 << 16    # 分块计算，限制临时数组的内存
+    MASK_SIZE = 1 << 14
+
+    def __init__(self):
+        masks = np.arange(self.MASK_SIZE)
+        self._popcount = np.zeros(self.MASK_SIZE, dtype=np.int8)
+        self._high_bit = np.zeros(self.MASK_SIZE, dtype=np.int32)
+        for weight in range(14):
+            has_bit = (masks >> weight & 1).astype(bool)
+            self._popcount += has_bit
+            self._high_bit[has_bit] = weight
+        # self._top[k][mask]: 最大的k个权重，每个占4位，最大的在最高位
+        self._top = {}
+        for count in (1, 2, 3, 5):
+            top = np.zeros(self.MASK_SIZE, dtype=np.int32)
+            rest = masks & ~1
+            for i in range(count):
+                high = self._high_bit[rest]
+                top = top << 4 | high
+                rest = rest & ~(1 << high)
+            self._top[count] = top
+        self._straight_high = np.zeros(self.MASK_SIZE, dtype=np.int32)
+        for mask in range(self.MASK_SIZE):
+            self._straight_high[mask] = TexasPoker._straight_high(mask)
+
+    def _key(self, category, weights):
+        """
+        weights已经按位置打包好（比如牌型权重<<16 | 踢脚<<...）
+        """
+        return category << TexasPoker.CATEGORY_SHIFT | weights
+
+    def _clear(self, mask, weight):
+        return mask & ~(np.int32(1) << weight)
+
+    def _rank_keys_chunk(self, cards):
+        weight_bits = np.int32(1) << ((cards >> 2) + 1)
+        suits = cards & 3
+        rank_mask = np.bitwise_or.reduce(weight_bits, axis=1)
+        counts = np.zeros((len(cards), 14), dtype=np.int8)
+        rows = np.arange(len(cards))[:, None]
+        for column in ((cards >> 2) + 1).T:   # 每列里同一行只出现一次
+            counts[rows[:, 0], column] += 1
+        weights = np.int32(1) << np.arange(14, dtype=np.int32)
+        quads_mask = (counts == 4) @ weights
+        trips_mask = (counts == 3) @ weights
+        pairs_mask = (counts == 2) @ weights
+
+        suit_masks = np.stack([
+            np.bitwise_or.reduce(np.where(suits == suit, weight_bits, 0),
+                                 axis=1)
+            for suit in range(4)], axis=1)
+        suit_counts = self._popcount[suit_masks]
+        has_flush = suit_counts.max(axis=1) >= 5
+        flush_mask = suit_masks[rows[:, 0], suit_counts.argmax(axis=1)]
+        flush_mask = np.where(has_flush, flush_mask, 0)
+
+        high_bit = self._high_bit
+        top = self._top
+        straight_flush_high = self._straight_high[flush_mask]
+        quads = high_bit[quads_mask]
+        trips = high_bit[trips_mask]
+        fullhouse_rest = self._clear(trips_mask, trips) | pairs_mask
+        pair1 = high_bit[pairs_mask]
+        pair2 = high_bit[self._clear(pairs_mask, pair1)]
+        straight_high = self._straight_high[rank_mask]
+
+        conditions = [
+            straight_flush_high == 13,
+            straight_flush_high > 0,
+            quads_mask > 0,
+            (trips_mask > 0) & (fullhouse_rest > 0),
+            has_flush,
+            straight_high > 0,
+            trips_mask > 0,
+            self._popcount[pairs_mask] >= 2,
+            pairs_mask > 0,
+        ]
+        choices = [
+            self._key(TexasPoker.ROYAL_FLUSH, 0),
+            self._key(TexasPoker.STRAIGHT_FLUSH, straight_flush_high << 16),
+            self._key(TexasPoker.FOUR_OF_A_KIND, quads << 16 |
+                      top[1][self._clear(rank_mask, quads)] << 12),
+            self._key(TexasPoker.FULLHOUSE, trips << 16 |
+                      high_bit[fullhouse_rest] << 12),
+            self._key(TexasPoker.FLUSH, top[5][flush_mask]),
+            self._key(TexasPoker.STRAIGHT, straight_high << 16),
+            self._key(TexasPoker.THREE_OF_A_KIND, trips << 16 |
+                      top[2][self._clear(rank_mask, trips)] << 8),
+            self._key(TexasPoker.TWO_PAIRS, pair1 << 16 | pair2 << 12 |
+                      top[1][self._clear(self._clear(rank_mask, pair1),
+                                         pair2)] << 8),
+            self._key(TexasPoker.ONE_PAIR, pair1 << 16 |
+                      top[3][self._clear(rank_mask, pair1)] << 4),
+        ]
+        return np.select(conditions, choices,
+                         self._key(TexasPoker.HIGH_CARD, top[5][rank_mask]))
+
+    def rank_keys(self, cards):
+        """
+        cards: (N, 7)的整数编码数组，返回长度为N的rank key数组
+        """
+        cards = np.asarray(cards, dtype=np.int32)
+        keys = np.empty(len(cards), dtype=np.int32)
+        for start in range(0, len(cards), self.CHUNK_SIZE):
+            chunk = cards[start:start + self.CHUNK_SIZE]
+            keys[start:start + len(chunk)] = self._rank_keys_chunk(chunk)
+        return keys
+
+    def card_types(self, cards):
+        """
+        同TexasPoker.get_card_type，返回牌型名称数组
+        """
+        categories = self.rank_keys(cards) >> TexasPoker.CATEGORY_SHIFT
+        return np.array(TexasPoker.CARD_TYPE)[
+            TexasPoker.ROYAL_FLUSH - categories]
+
+
+class BulkDealer:
+    """
+    一次发很多手牌，每一行用部分Fisher-Yates洗牌只洗要用的前k张
+    k步里每一步都是对所有行同时做的数组操作
+
+        dealer = BulkDealer(player_count=6, seed=1)
+        deals = dealer.deal(1000000)    # deals.hole_cards: (M, 6, 2)
+        keys = dealer.rank_keys(deals)  # (M, 6)
+    """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, player_count=2, seed=None, rng=None,
+                 evaluator=None):
+        self.player_count = player_count
+        self._rng = rng if rng is not None else np.random.default_rng(seed)
+        self._evaluator = evaluator
+
+    @property
+    def evaluator(self):
+        if self._evaluator is None:
+            self._evaluator = TexasPoker._get_batch_evaluator()
+        return self._evaluator
+
+    def sample(self, deck, count, rows):
+        """
+        从deck（一维整数编码）里给每一行不放回地抽count张，返回(rows, count)
+        """
+        deck = np.asarray(deck, dtype=np.int8)
+        result = np.empty((rows, count), dtype=np.int8)
+        for start in range(0, rows, self.CHUNK_SIZE):
+            size = min(self.CHUNK_SIZE, rows - start)
+            cards = np.tile(deck, (size, 1))
+            index = np.arange(size)
+            for i in range(count):
+                j = i + self._rng.integers(0, len(deck) - i, size=size)
+                picked = cards[index, j]
+                cards[index, j] = cards[:, i]
+                cards[:, i] = picked
+            result[start:start + size] = cards[:, :count]
+        return result
+
+    def deal(self, hands):
+        """
+        发hands手完整的牌，返回BulkDeals
+        """
+        count = 2 * self.player_count + 5
+        cards = self.sample(np.arange(52), count, hands)
+        return BulkDeals(
+            cards[:, :2 * self.player_count].reshape(
+                hands, self.player_count, 2),
+            cards[:, 2 * self.player_count:])
+
+    def rank_keys(self, deals):
+        """
+        每手牌每个座位的rank key，(M, N)
+        """
+        return self.evaluator.rank_keys(deals.seven_cards().reshape(
+            -1, 7)).reshape(len(deals.board), -1)
+
+    @staticmethod
+    def showdown(keys):
+        """
+        keys为(M, N)，返回每手牌每个座位分到的底池比例和是否单独赢
+        """
+        winners = keys == keys.max(axis=1, keepdims=True)
+        counts = winners.sum(axis=1, keepdims=True)
+        return winners / counts, winners & (counts == 1)
+
+    def simulate(self, hands, stats=None):
+        """
+        发hands手牌并摊牌，结果累计到SimulationStats里（不给就新建一个）
+        """
+        from simulation import SimulationStats
+
+        if stats is None:
+            stats = SimulationStats(self.player_count)
+        for start in range(0, hands, self.CHUNK_SIZE):
+            size = min(self.CHUNK_SIZE, hands - start)
+            self.record(self.deal(size), stats)
+        return stats
+
+    def record(self, deals, stats):
+        """
+        给已经发好的deals摊牌，结果累计到stats里
+        """
+        keys = self.rank_keys(deals)
+        shares, wins = self.showdown(keys)
+        categories = np.bincount(
+            (keys >> TexasPoker.CATEGORY_SHIFT).ravel(),
+            minlength=len(TexasPoker.CARD_TYPE))
+        stats.hands += len(deals)
+        for category, count in enumerate(categories.tolist()):
+            stats.category_counts[category] += count
+        ties = (shares > 0) & ~wins
+        for seat in range(self.player_count):
+            stats.seat_wins[seat] += int(wins[:, seat].sum())
+            stats.seat_ties[seat] += int(ties[:, seat].sum())
+            stats.seat_shares[seat] += float(shares[:, seat].sum())
+        return stats
+
+    def equity(self, holes, board, trials, deck=None):
+        """
+        底牌固定（整数编码），已发的公共牌为board，从deck里随机发完trials次
+        返回EquityResult
+        """
+        from equity import EquityResult
+
+        if deck is None:
+            dead = set(board)
+            for hole in holes:
+                dead.update(hole)
+            deck = [card for card in range(52) if card not in dead]
+        need = 5 - len(board)
+        result = EquityResult(len(holes))
+        for start in range(0, trials, self.CHUNK_SIZE):
+            size = min(self.CHUNK_SIZE, trials - start)
+            boards = np.empty((size, 5), dtype=np.int8)
+            boards[:, :len(board)] = board
+            boards[:, len(board):] = self.sample(deck, need, size)
+            deals = BulkDeals(np.broadcast_to(
+                np.asarray(holes, dtype=np.int8), (size, len(holes), 2)),
+                boards)
+            shares, wins = self.showdown(self.rank_keys(deals))
+            result.trials += size
+            for player in range(len(holes)):
+                result.wins[player] += int(wins[:, player].sum())
+                result.ties[player] += int(
+                    ((shares[:, player] > 0) & ~wins[:, player]).sum())
+                result.shares[player] += float(shares[:, player].sum())
+                result.shares_square[player] += float(
+                    (shares[:, player] ** 2).sum())
+        return result
+
+
+class BulkDeals:
+    """
+    M手牌：hole_cards为(M, N, 2)，board为(M, 5)，整数编码
+    """
+    def __init__(self, hole_cards, board):
+        self.hole_cards = hole_cards
+        self.board = board
+
+    def __len__(self):
+        return len(self.board)
+
+    @classmethod
+    def concatenate(cls, deals_list):
+        return cls(np.concatenate([deals.hole_cards for deals in deals_list]),
+                   np.concatenate([deals.board for deals in deals_list]))
+
+    def seven_cards(self):
+        """
+        每个座位的底牌加公共牌，(M, N, 7)
+        """
+        hands, players = self.hole_cards.shape[:2]
+        return np.concatenate([
+            self.hole_cards,
+            np.broadcast_to(self.board[:, None, :], (hands, players, 5))],
+            axis=2)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng()
+    cards = np.argsort(rng.random((5, 52)), axis=1)[:, :7]
+    evaluator = BatchEvaluator()
+    for hand, card_type in zip(cards, evaluator.card_types(cards)):
+        print(TexasPoker.ints_to_cards(hand.tolist()), card_type)
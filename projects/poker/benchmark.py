@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: benchmarks for deck, evaluator and table hot paths
+author: haoranzeus@gmail.com (zhanghaoran)
+
+用法：
+    python benchmark.py                         跑所有用例并打印结果
+    python benchmark.py --save baseline.json    保存为基准
+    python benchmark.py --compare baseline.json 和基准比较，有退化时返回1
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from icm import ICMCalculator
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+class HandCorpus:
+    """
+    固定种子生成的测试手牌，每种牌型各count手
+    每手牌是(底牌, 公共牌)，用[suit, point]编码
+    """
+    def __init__(self, seed=20161018, count=200):
+        self._rng = random.Random(seed)
+        self.hands = {}
+        for category in range(len(TexasPoker.CARD_TYPE)):
+            card_type = TexasPoker.get_card_type_by_key(
+                category << TexasPoker.CATEGORY_SHIFT)
+            self.hands[card_type] = [self._make_hand(category)
+                                     for i in range(count)]
+
+    def _core_cards(self, category):
+        """
+        先按牌型凑出关键的几张牌（整数编码）
+        """
+        rng = self._rng
+        suit = rng.randrange(4)
+        ranks = rng.sample(range(13), 2)
+        if category == TexasPoker.ROYAL_FLUSH:
+            return [rank * 4 + suit for rank in range(8, 13)]
+        if category == TexasPoker.STRAIGHT_FLUSH:
+            high = rng.randrange(3, 12)
+            return [(rank % 13) * 4 + suit
+                    for rank in range(high - 4, high + 1)]
+        if category == TexasPoker.FOUR_OF_A_KIND:
+            return [ranks[0] * 4 + i for i in range(4)]
+        if category == TexasPoker.FULLHOUSE:
+            return ([ranks[0] * 4 + i for i in rng.sample(range(4), 3)] +
+                    [ranks[1] * 4 + i for i in rng.sample(range(4), 2)])
+        if category == TexasPoker.FLUSH:
+            return [rank * 4 + suit for rank in rng.sample(range(13), 5)]
+        if category == TexasPoker.STRAIGHT:
+            high = rng.randrange(3, 13)
+            return [(rank % 13) * 4 + rng.randrange(4)
+                    for rank in range(high - 4, high + 1)]
+        if category == TexasPoker.THREE_OF_A_KIND:
+            return [ranks[0] * 4 + i for i in rng.sample(range(4), 3)]
+        if category == TexasPoker.TWO_PAIRS:
+            return ([ranks[0] * 4 + i for i in rng.sample(range(4), 2)] +
+                    [ranks[1] * 4 + i for i in rng.sample(range(4), 2)])
+        if category == TexasPoker.ONE_PAIR:
+            return [ranks[0] * 4 + i for i in rng.sample(range(4), 2)]
+        return []
+
+    def _make_hand(self, category):
+        while True:
+            cards = self._core_cards(category)
+            rest = [card for card in range(52) if card not in cards]
+            cards += self._rng.sample(rest, 7 - len(cards))
+            key = TexasPoker.rank_key_ints(cards)
+            if key >> TexasPoker.CATEGORY_SHIFT == category:
+                break
+        self._rng.shuffle(cards)
+        cards = TexasPoker.ints_to_cards(cards)
+        return cards[:2], cards[2:]
+
+    def all_hands(self):
+        return [hand for hands in self.hands.values() for hand in hands]
+
+
+class Benchmark:
+    """
+    每个用例是一个无参数函数，执行一次算一批操作（ops次）
+    计时取repeat次里最快的一次；内存分配单独用tracemalloc跑一次
+    """
+    def __init__(self, seed=20161018, repeat=5, min_time=0.2):
+        self._seed = seed
+        self._repeat = repeat
+        self._min_time = min_time
+        self.corpus = HandCorpus(seed=seed)
+        self.cases = {}     # name -> (func, ops)
+        self._register_cases()
+
+    def _with_board(self, tp, board):
+        tp._flops = board[:3]
+        tp._turn = board[3]
+        tp._rever = board[4]
+
+    def _register_cases(self):
+        hands = self.corpus.all_hands()
+        tp = TexasPoker()
+
+        def pop_card():
+            tp.reset()
+            for i in range(52):
+                tp.pop_card()
+        self.cases['Poker.pop_card'] = (pop_card, 52)
+
+        def evaluate(method):
+            def run():
+                for hole_cards, board in hands:
+                    self._with_board(tp, board)
+                    method(hole_cards)
+            return run
+        self.cases['TexasPoker.get_card_type'] = (
+            evaluate(tp.get_card_type), len(hands))
+        for name in ('is_royal_flush', 'is_straight_flush',
+                     'is_four_of_a_kind', 'is_fullhouse', 'is_flush',
+                     'is_straight', 'is_three_of_a_kind', 'is_two_paires',
+                     'is_one_pair'):
+            self.cases['TexasPoker.' + name] = (
+                evaluate(getattr(tp, name)), len(hands))
+
+        rng = random.Random(self._seed)
+        pairs = []
+        for hole_cards, board in hands:
+            used = hole_cards + board
+            rest = [card for card in TexasPoker().cards if card not in used]
+            pairs.append((hole_cards, rng.sample(rest, 2), board))
+
+        def compare_hole_cards():
+            for hole1, hole2, board in pairs:
+                self._with_board(tp, board)
+                tp.compare_hole_cards(hole1, hole2)
+        self.cases['TexasPoker.compare_hole_cards'] = (
+            compare_hole_cards, len(pairs))
+
+        for player_count in (2, 9):
+            table = TexasTable(player_count=player_count, seed=self._seed)
+
+            def table_cycle(table=table):
+                for i in range(100):
+                    table.shuffle()
+                    table.deal()
+                    table.deal_board()
+                    table.players_rank()
+            self.cases['TexasTable.cycle_%d_players' % player_count] = (
+                table_cycle, 100)
+
+        calculator = ICMCalculator([50, 30, 20, 10, 8, 6, 5, 4, 3, 2])
+        stacks = [3000, 2500, 2000, 1800, 1500, 1200, 1000, 800, 500, 200]
+        self.cases['ICMCalculator.exact_10_players'] = (
+            lambda: calculator.exact(stacks), 1)
+
+        try:
+            from batch_eval import BulkDealer
+        except ImportError:     # 没装numpy
+            return
+        dealer = BulkDealer(player_count=9, seed=self._seed)
+        self.cases['BulkDealer.simulate_9_players'] = (
+            lambda: dealer.simulate(10000), 10000)
+
+    def _time(self, func):
+        """
+        一次执行够min_time为止，返回每次执行的最短时间
+        """
+        loops = 1
+        while True:
+            start = time.perf_counter()
+            for i in range(loops):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self._min_time:
+                break
+            loops *= 2
+        best = elapsed / loops
+        for i in range(self._repeat - 1):
+            start = time.perf_counter()
+            for j in range(loops):
+                func()
+            best = min(best, (time.perf_counter() - start) / loops)
+        return best
+
+    def _allocations(self, func):
+        """
+        执行一次时分配内存的峰值和分配的内存块数
+        """
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in
+                     after.compare_to(before, 'filename') if
+                     stat.count_diff > 0)
+        return peak, blocks
+
+    def run(self, names=None):
+        results = {}
+        for name, (func, ops) in self.cases.items():
+            if names and not any(part in name for part in names):
+                continue
+            func()  # 预热
+            seconds = self._time(func)
+            peak, blocks = self._allocations(func)
+            results[name] = {
+                'ops_per_sec': ops / seconds,
+                'usec_per_op': seconds / ops * 1e6,
+                'peak_bytes_per_op': peak / ops,
+                'retained_blocks': blocks,
+            }
+        return results
+
+    @staticmethod
+    def compare(results, baseline, threshold=0.2):
+        """
+        ops/sec比基准低threshold以上的用例算退化，返回[(用例, 比值)]
+        """
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+            if ratio < 1 - threshold:
+                regressions.append((name, ratio))
+        return regressions
+
+
+def _print_results(results, baseline=None):
+    print('%-36s %14s %10s %12s %8s' % (
+        'case', 'ops/sec', 'usec/op', 'peak B/op', 'vs base'))
+    for name, result in results.items():
+        ratio = ''
+        if baseline and name in baseline:
+            ratio = '%.2fx' % (result['ops_per_sec'] /
+                               baseline[name]['ops_per_sec'])
+        print('%-36s %14.0f %10.2f %12.1f %8s' % (
+            name, result['ops_per_sec'], result['usec_per_op'],
+            result['peak_bytes_per_op'], ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='texas poker benchmarks')
+    parser.add_argument('names', nargs='*', help='only run matching cases')
+    parser.add_argument('--save', help='save results as baseline json')
+    parser.add_argument('--compare', help='compare with baseline json')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed ops/sec drop before failing')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results = Benchmark(repeat=args.repeat).run(args.names)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if baseline:
+        regressions = Benchmark.compare(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print('REGRESSION %s: %.2fx of baseline' % (name, ratio))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: no limit betting engine with blinds and side pots
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+from exceptions import BettingError
+from texas_table import TexasTable
+
+
+class Seat:
+    """
+    一个座位在一手牌里的状态
+    bet: 这条街已经下的注，committed: 这手牌一共投入的筹码
+    acted: 上一次完整加注之后是否行动过（行动过的人遇到不足额的全下加注只能跟或弃）
+    """
+    __slots__ = ('player_id', 'stack', 'bet', 'committed', 'folded',
+                 'all_in', 'acted')
+
+    def __init__(self, player_id, stack):
+        self.player_id = player_id
+        self.stack = stack
+        self.reset()
+
+    def reset(self):
+        self.bet = 0
+        self.committed = 0
+        self.folded = self.stack <= 0   # 没有筹码的座位这手牌不参加
+        self.all_in = False
+        self.acted = False
+
+    @property
+    def can_act(self):
+        return not self.folded and not self.all_in
+
+
+class Pot:
+    """
+    主池或者边池：amount为筹码数，eligible为有资格分这个池的player_id
+    """
+    __slots__ = ('amount', 'eligible', 'winners')
+
+    def __init__(self, amount, eligible):
+        self.amount = amount
+        self.eligible = eligible
+        self.winners = []
+
+
+class HandResult:
+    """
+    一手牌的结果：payouts为{player_id: 赢回的筹码}（包括退回的没被跟的注）
+    """
+    __slots__ = ('pots', 'payouts', 'board', 'rank_keys')
+
+    def __init__(self, pots, payouts, board, rank_keys):
+        self.pots = pots
+        self.payouts = payouts
+        self.board = board
+        self.rank_keys = rank_keys  # 摊牌时{player_id: rank key}，没摊牌为{}
+
+
+class BettingEngine:
+    """
+    TexasTable上的无限注下注流程：前注、盲注、四条街、全下和多层边池
+
+        engine = BettingEngine(TexasTable(player_count=3), [1000] * 3, 5, 10)
+        engine.start_hand()
+        while not engine.finished:
+            engine.act('call')      # 轮到engine.to_act_player行动
+        engine.result.payouts
+
+    act的amount是这条街加注到的总数（不是加了多少）。
+    摊牌时所有没弃牌的玩家只判断一次牌力，每个池子在里面挑有资格的最大者。
+    """
+    STREETS = ('preflop', 'flop', 'turn', 'rever')
+
+    def __init__(self, table, stacks, small_blind, big_blind, ante=0,
+                 button=0):
+        """
+        stacks: 按player_id顺序每个座位的筹码
+        button: 庄家位的座位序号（从0开始）
+        """
+        if len(stacks) != table._player_count:
+            raise BettingError('need one stack per seat')
+        self._table = table
+        self.seats = [Seat(player_id, stack)
+                      for player_id, stack in enumerate(stacks, 1)]
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.ante = ante
+        self.button = button
+        self.street = None
+        self.current_bet = 0
+        self.min_raise = big_blind
+        self.to_act = None
+        self.finished = True
+        self.result = None
+
+    @property
+    def stacks(self):
+        """
+        {player_id: 筹码}，可以直接给ICMCalculator.table_equities
+        """
+        return {seat.player_id: seat.stack for seat in self.seats}
+
+    @property
+    def to_act_player(self):
+        return None if self.to_act is None else \
+            self.seats[self.to_act].player_id
+
+    @property
+    def pot_total(self):
+        return sum(seat.committed for seat in self.seats)
+
+    def _next_seat(self, index, condition):
+        """
+        从index的下一个座位开始，第一个满足condition的座位序号
+        """
+        count = len(self.seats)
+        for step in range(1, count + 1):
+            candidate = (index + step) % count
+            if condition(self.seats[candidate]):
+                return candidate
+        return None
+
+    def _post(self, seat, amount):
+        amount = min(amount, seat.stack)
+        seat.stack -= amount
+        seat.bet += amount
+        seat.committed += amount
+        if seat.stack == 0:
+            seat.all_in = True
+        return amount
+
+    def start_hand(self, seed=None):
+        """
+        洗牌发牌，收前注和盲注，轮到大盲后面的人行动
+        """
+        for seat in self.seats:
+            seat.reset()
+        players = [seat for seat in self.seats if not seat.folded]
+        if len(players) < 2:
+            raise BettingError('need at least two players with chips')
+        self._table.shuffle(seed)
+        self._table.deal()
+        self.finished = False
+        self.result = None
+        self.street = 0
+        self.min_raise = self.big_blind
+        if self.button is None or self.seats[self.button].folded:
+            self.button = self._next_seat(self.button or 0,
+                                          lambda seat: not seat.folded)
+        if self.ante:
+            for seat in players:
+                self._post(seat, self.ante)
+                seat.bet = 0
+        if len(players) == 2:   # 单挑时庄家是小盲，翻牌前先行动
+            small = self.button
+        else:
+            small = self._next_seat(self.button,
+                                    lambda seat: not seat.folded)
+        big = self._next_seat(small, lambda seat: not seat.folded)
+        self._post(self.seats[small], self.small_blind)
+        self._post(self.seats[big], self.big_blind)
+        # 大盲不够也要按整个大盲跟
+        self.current_bet = max([self.big_blind] +
+                               [seat.bet for seat in self.seats])
+        self.to_act = big
+        self._advance()
+
+    def legal_actions(self):
+        """
+        当前行动的人可以做的动作：
+        {'fold': True, 'check'或'call': 要跟的数, 'raise': (最少加到, 最多加到)}
+        """
+        seat = self.seats[self.to_act]
+        to_call = self.current_bet - seat.bet
+        actions = {'fold': True}
+        if to_call > 0:
+            actions['call'] = min(to_call, seat.stack)
+        else:
+            actions['check'] = 0
+        most = seat.bet + seat.stack
+        if not seat.acted and most > self.current_bet:
+            least = min(self.current_bet + self.min_raise, most)
+            actions['raise'] = (least, most)
+        return actions
+
+    def act(self, action, amount=None):
+        """
+        action: 'fold'、'check'、'call'、'bet'、'raise'、'all_in'
+        amount: bet/raise时这条街加注到的总数
+        """
+        if self.finished:
+            raise BettingError('hand is over')
+        seat = self.seats[self.to_act]
+        to_call = self.current_bet - seat.bet
+        if action == 'all_in':
+            amount = seat.bet + seat.stack
+            action = 'call' if amount <= self.current_bet else 'raise'
+            if action == 'call' and to_call == 0:
+                action = 'check'
+        if action == 'fold':
+            seat.folded = True
+        elif action == 'check':
+            if to_call > 0:
+                raise BettingError('cannot check, %d to call' % to_call)
+        elif action == 'call':
+            if to_call <= 0:
+                raise BettingError('nothing to call')
+            self._post(seat, to_call)
+        elif action in ('bet', 'raise'):
+            self._raise(seat, amount)
+        else:
+            raise BettingError('unknown action: %s' % action)
+        seat.acted = True
+        self._advance()
+
+    def _raise(self, seat, amount):
+        if seat.acted:
+            raise BettingError('betting was not reopened')
+        if amount is None or amount <= self.current_bet:
+            raise BettingError('raise must be more than %d' %
+                               self.current_bet)
+        if amount - seat.bet > seat.stack:
+            raise BettingError('not enough chips')
+        full = amount - self.current_bet >= self.min_raise
+        if not full and amount - seat.bet < seat.stack:
+            raise BettingError('raise to at least %d' %
+                               (self.current_bet + self.min_raise))
+        self._post(seat, amount - seat.bet)
+        if full:    # 完整的加注，其他人要重新行动
+            self.min_raise = amount - self.current_bet
+            for other in self.seats:
+                other.acted = False
+        self.current_bet = amount
+
+    def _betting_closed(self):
+        """
+        没人能再下注：能行动的人不超过一个，而且他已经跟够了
+        """
+        active = [seat for seat in self.seats if seat.can_act]
+        if not active:
+            return True
+        if len(active) > 1:
+            return False
+        return active[0].bet >= max(seat.bet for seat in self.seats
+                                    if not seat.folded)
+
+    def _advance(self):
+        if sum(1 for seat in self.seats if not seat.folded) == 1:
+            self._finish()
+            return
+        if not self._betting_closed():
+            index = self._next_seat(
+                self.to_act, lambda seat: seat.can_act and (
+                    not seat.acted or seat.bet < self.current_bet))
+            if index is not None:
+                self.to_act = index
+                return
+        self._end_street()
+
+    def _end_street(self):
+        """
+        这条街的下注结束，发下一条街；没人能下注时直接发完
+        """
+        while True:
+            for seat in self.seats:
+                seat.bet = 0
+                seat.acted = False
+            self.current_bet = 0
+            self.min_raise = self.big_blind
+            if self.street == len(self.STREETS) - 1:
+                self._finish()
+                return
+            self.street += 1
+            self._table.deal_street(self.STREETS[self.street])
+            if not self._betting_closed():
+                self.to_act = self._next_seat(
+                    self.button, lambda seat: seat.can_act)
+                return
+
+    def _build_pots(self):
+        """
+        按没弃牌的玩家投入的筹码分层，每一层是一个池子，资格相同的相邻层合并
+        """
+        seats = self.seats
+        levels = sorted(set(seat.committed for seat in seats
+                            if not seat.folded))
+        pots = []
+        previous = 0
+        for level in levels:
+            amount = sum(min(seat.committed, level) -
+                         min(seat.committed, previous) for seat in seats)
+            eligible = [seat.player_id for seat in seats
+                        if not seat.folded and seat.committed >= level]
+            if pots and pots[-1].eligible == eligible:
+                pots[-1].amount += amount
+            elif amount:
+                pots.append(Pot(amount, eligible))
+            previous = level
+        # 弃牌的人投入的比所有没弃牌的人都多的部分
+        extra = sum(max(seat.committed - previous, 0) for seat in seats)
+        if extra:
+            pots[-1].amount += extra
+        return pots
+
+    def _finish(self):
+        pots = self._build_pots()
+        contenders = [seat.player_id for seat in self.seats
+                      if not seat.folded]
+        rank_keys = {}
+        if len(contenders) > 1:
+            rank_keys = dict(zip(contenders,
+                                 self._table.get_rank_keys(contenders)))
+        # 分不开的零头从庄家左边开始给
+        count = len(self.seats)
+        order = {self.seats[(self.button + step) % count].player_id: step
+                 for step in range(1, count + 1)}
+        payouts = {}
+        for pot in pots:
+            if len(pot.eligible) == 1:
+                pot.winners = pot.eligible
+            else:
+                best = max(rank_keys[player_id] for player_id in pot.eligible)
+                pot.winners = sorted(
+                    (player_id for player_id in pot.eligible
+                     if rank_keys[player_id] == best), key=order.get)
+            share, odd = divmod(pot.amount, len(pot.winners))
+            for i, player_id in enumerate(pot.winners):
+                payouts[player_id] = payouts.get(player_id, 0) + share + \
+                    (1 if i < odd else 0)
+        for seat in self.seats:
+            seat.stack += payouts.get(seat.player_id, 0)
+        self.result = HandResult(pots, payouts, self._table.get_board(),
+                                 rank_keys)
+        self.finished = True
+        self.to_act = None
+
+    def next_button(self):
+        """
+        庄家位移到下一个有筹码的座位
+        """
+        self.button = self._next_seat(self.button,
+                                      lambda seat: seat.stack > 0)
+
+    def run_hand(self, policy, seed=None):
+        """
+        用policy(engine, seat)返回(action, amount)打完一手牌，返回HandResult
+        """
+        self.start_hand(seed)
+        while not self.finished:
+            action, amount = policy(self, self.seats[self.to_act])
+            self.act(action, amount)
+        return self.result
+
+
+def _call_down(engine, seat):
+    """
+    一直跟到底（或者过牌）的策略
+    """
+    actions = engine.legal_actions()
+    return ('call', None) if 'call' in actions else ('check', None)
+
+
+if __name__ == '__main__':
+    import time
+
+    engine = BettingEngine(TexasTable(player_count=6, int_cards=True,
+                                      seed=1), [1000] * 6, 5, 10)
+    start = time.perf_counter()
+    hands = 0
+    while hands < 2000 and sum(1 for seat in engine.seats
+                               if seat.stack > 0) > 1:
+        engine.run_hand(_call_down)
+        engine.next_button()
+        hands += 1
+    print('%d hands, %.0f hands/s' % (hands,
+                                      hands / (time.perf_counter() - start)))
+    print(engine.stacks)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: suit isomorphism canonical forms and a bounded lru result cache
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import collections
+
+from equity import EquityCalculator
+from texaspoker import TexasPoker
+
+
+class SuitCanonicalizer:
+    """
+    只差一个花色置换的牌面（底牌+公共牌）牌力和胜率都一样，把它们映射到同一个标准形式
+
+    每种花色的特征是它在每一组牌（每个玩家的底牌、公共牌）里的点数位图，
+    按特征从大到小重新给花色编号，两个牌面同构当且仅当标准形式相同。
+    每组牌内部不分顺序，组的顺序（玩家顺序）保留。
+    """
+    @staticmethod
+    def _to_int(card):
+        return card if isinstance(card, int) else TexasPoker.card_to_int(card)
+
+    @classmethod
+    def _signatures(cls, groups):
+        """
+        返回每种花色的特征：(第0组的点数位图, 第1组的点数位图, ...)
+        """
+        masks = [[0] * len(groups) for suit in range(4)]
+        for i, group in enumerate(groups):
+            for card in group:
+                card = cls._to_int(card)
+                masks[card & 3][i] |= 1 << (card >> 2)
+        return [tuple(suit_masks) for suit_masks in masks]
+
+    @classmethod
+    def canonical_key(cls, hole_cards_list, board=()):
+        """
+        可以直接当字典键用的标准形式
+        """
+        groups = list(hole_cards_list) + [board]
+        return tuple(sorted(cls._signatures(groups), reverse=True))
+
+    @classmethod
+    def canonical_cards(cls, hole_cards_list, board=()):
+        """
+        把牌换成标准花色后返回(底牌列表, 公共牌)，整数编码，每组内部排好序
+        """
+        groups = list(hole_cards_list) + [board]
+        signatures = cls._signatures(groups)
+        order = sorted(range(4), key=lambda suit: signatures[suit],
+                       reverse=True)
+        suit_map = [0] * 4
+        for new_suit, suit in enumerate(order):
+            suit_map[suit] = new_suit
+        canonical = []
+        for group in groups:
+            cards = [cls._to_int(card) for card in group]
+            canonical.append(sorted(card & ~3 | suit_map[card & 3]
+                                    for card in cards))
+        return canonical[:-1], canonical[-1]
+
+
+class LRUCache:
+    """
+    有大小上限的LRU缓存，记录命中和未命中次数
+    """
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate}
+
+
+class CachedEvaluator:
+    """
+    按花色同构的标准形式缓存rank key和胜率，同样纹理的公共牌再查就直接命中
+    返回的EquityResult是缓存里的同一个对象，不要修改
+    store: 给了EquityStore时内存里没有再查磁盘，算出来的结果也存进去
+    """
+    def __init__(self, maxsize=65536, equity_maxsize=None, lut_path=None,
+                 store=None):
+        self.rank_key_cache = LRUCache(maxsize)
+        self.equity_cache = LRUCache(equity_maxsize or maxsize)
+        self._lut_path = lut_path
+        self._store = store
+
+    def rank_key(self, hole_cards, board):
+        key = SuitCanonicalizer.canonical_key([list(hole_cards) + list(board)])
+        rank_key = self.rank_key_cache.get(key)
+        if rank_key is None:
+            cards = [SuitCanonicalizer._to_int(card)
+                     for card in list(hole_cards) + list(board)]
+            rank_key = TexasPoker.rank_key_ints(cards)
+            self.rank_key_cache.put(key, rank_key)
+        return rank_key
+
+    def equity(self, hole_cards_list, board=(), method='exact', **kwargs):
+        """
+        method: 'exact'或'monte_carlo'，kwargs传给EquityCalculator对应的方法
+        不同的参数分开缓存
+        """
+        key = (method, tuple(sorted(kwargs.items())),
+               SuitCanonicalizer.canonical_key(hole_cards_list, board))
+        result = self.equity_cache.get(key)
+        if result is not None:
+            return result
+        if self._store is not None:
+            store_key = self._store.make_key(hole_cards_list, board, method,
+                                             **kwargs)
+            result = self._store.get_by_key(store_key)
+            if result is not None:
+                self.equity_cache.put(key, result)
+                return result
+        holes, board = SuitCanonicalizer.canonical_cards(
+            hole_cards_list, board)
+        tp = TexasPoker(int_cards=True)
+        tp._flops = board[:3]
+        tp._turn = board[3] if len(board) > 3 else None
+        tp._rever = board[4] if len(board) > 4 else None
+        calculator = EquityCalculator(tp, lut_path=self._lut_path)
+        result = getattr(calculator, method)(holes, **kwargs)
+        self.equity_cache.put(key, result)
+        if self._store is not None:
+            self._store.put_by_key(store_key, result)
+        return result
+
+    def stats(self):
+        stats = {'rank_key': self.rank_key_cache.stats(),
+                 'equity': self.equity_cache.stats()}
+        if self._store is not None:
+            stats['store'] = self._store.stats()
+        return stats
+
+
+if __name__ == '__main__':
+    evaluator = CachedEvaluator(maxsize=1000)
+    holes = [[['heart', 'A'], ['heart', 'K']],
+             [['spade', '9'], ['diamond', '9']]]
+    board = [['heart', '9'], ['heart', '8'], ['club', '2']]
+    print(evaluator.equity(holes, board).equities)
+    # 红桃和黑桃互换，是同一个牌面
+    swap = {'heart': 'spade', 'spade': 'heart'}
+    holes = [[[swap.get(suit, suit), point] for suit, point in hole]
+             for hole in holes]
+    board = [[swap.get(suit, suit), point] for suit, point in board]
+    print(evaluator.equity(holes, board).equities)
+    print(evaluator.stats())
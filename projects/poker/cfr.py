@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: monte carlo cfr solver for heads up limit play with equity buckets
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+from batch_eval import BulkDealer
+from preflop import PreflopTable
+from texas_table import TexasTable
+
+
+class LimitBettingTree:
+    """
+    单挑限注的下注树，预先展开成数组
+
+    每个决策节点有行动的玩家、街和三个动作（弃牌、过牌/跟注、下注/加注）的子节点，
+    子节点 >= 0 为决策节点，< 0 为终局节点 ~child。
+    玩家0是庄家（小盲），翻牌前先行动，翻牌后后行动。
+    前两条街每次下注big_blind，后两条街加倍，每条街最多max_bets次下注（翻牌前大盲算一次）。
+    """
+    FOLD, CALL, RAISE = range(3)
+    ACTIONS = ('fold', 'call', 'raise')
+    STREETS = ('preflop', 'flop', 'turn', 'rever')
+
+    def __init__(self, small_blind=1, big_blind=2, max_bets=4):
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.max_bets = max_bets
+        self._players = []
+        self._streets = []
+        self._children = []
+        self._folders = []     # 终局时弃牌的玩家，摊牌为-1
+        self._amounts = []     # 终局时输家输掉的筹码（每人投入的筹码）
+        self._build(0, 0, [small_blind, big_blind], 1, 0)
+        self.players = np.array(self._players, dtype=np.int8)
+        self.streets = np.array(self._streets, dtype=np.int8)
+        self.children = np.array(self._children, dtype=np.int32)
+        self.legal = self.children != np.iinfo(np.int32).max
+        self.folders = np.array(self._folders, dtype=np.int8)
+        self.amounts = np.array(self._amounts, dtype=np.float64)
+
+    def bet_size(self, street):
+        return self.big_blind * (1 if street < 2 else 2)
+
+    def _terminal(self, folder, amount):
+        self._folders.append(folder)
+        self._amounts.append(amount)
+        return ~(len(self._folders) - 1)
+
+    def _build(self, street, player, committed, bets, actions):
+        """
+        committed: 两个玩家一共投入的筹码，bets: 这条街已有的下注次数，
+        actions: 这条街已经行动的次数，返回节点编号
+        """
+        node = len(self._players)
+        self._players.append(player)
+        self._streets.append(street)
+        self._children.append(None)
+        other = 1 - player
+        to_call = committed[other] - committed[player]
+        children = [np.iinfo(np.int32).max] * 3
+        if to_call > 0:
+            children[self.FOLD] = self._terminal(player, committed[player])
+        called = list(committed)
+        called[player] = committed[other]
+        if actions == 0:    # 第一个行动的人过牌或者翻牌前小盲补齐，这条街还没结束
+            children[self.CALL] = self._build(street, other, called, bets, 1)
+        elif street == len(self.STREETS) - 1:
+            children[self.CALL] = self._terminal(-1, called[0])
+        else:
+            children[self.CALL] = self._build(street + 1, 1, called, 0, 0)
+        if bets < self.max_bets:
+            raised = list(called)
+            raised[player] += self.bet_size(street)
+            children[self.RAISE] = self._build(street, other, raised,
+                                               bets + 1, actions + 1)
+        self._children[node] = children
+        return node
+
+    def __len__(self):
+        return len(self._players)
+
+    def utility(self, terminal, result):
+        """
+        终局节点对玩家0的收益，result为摊牌时玩家0的比较结果（1、0、-1）
+        """
+        folder = self._folders[terminal]
+        amount = self._amounts[terminal]
+        if folder < 0:
+            return result * amount
+        return -amount if folder == 0 else amount
+
+
+class EquityBucketer:
+    """
+    按对一个随机对手的胜率分桶：每条街用已知的牌随机补齐对手底牌和剩下的公共牌，
+    用BatchEvaluator一次算一整批。翻牌前按169种起手牌预先算好。
+
+    桶的分界是每条街胜率的分位数（用固定种子发calibration手牌估计），
+    每个桶里的手牌差不多一样多，所有进程的分界都相同。桶0最差。
+    """
+    CALIBRATION = 4096
+    _cache = {}     # (buckets, samples, preflop_trials) -> (翻牌前胜率, 分界)
+
+    def __init__(self, buckets=8, samples=32, preflop_trials=2000, seed=None,
+                 preflop_table=None):
+        """
+        preflop_table: 给了PreflopTable就直接用它的胜率
+        """
+        self.buckets = buckets
+        self.samples = samples
+        self._rng = np.random.default_rng(seed)
+        self._dealer = BulkDealer(2, rng=self._rng)
+        classes = np.zeros((52, 52), dtype=np.int16)
+        for card1 in range(52):
+            for card2 in range(52):
+                classes[card1, card2] = PreflopTable.hand_class_ints(card1,
+                                                                     card2)
+        self._classes = classes
+        key = (buckets, samples, preflop_trials)
+        if preflop_table is not None:
+            self._preflop = np.array([preflop_table.class_equity(hand_class)
+                                      for hand_class in range(169)])
+            self._bounds = self._calibrate()
+        elif key in self._cache:
+            self._preflop, self._bounds = self._cache[key]
+        else:
+            self._preflop = self._preflop_equities(preflop_trials)
+            self._bounds = self._calibrate()
+            EquityBucketer._cache[key] = (self._preflop, self._bounds)
+
+    def _preflop_equities(self, trials):
+        dealer = BulkDealer(2, seed=trials)
+        seen = set()
+        equities = np.zeros(169)
+        for card1 in range(52):
+            for card2 in range(card1 + 1, 52):
+                hand_class = PreflopTable.hand_class_ints(card1, card2)
+                if hand_class in seen:
+                    continue
+                seen.add(hand_class)
+                deck = [card for card in range(52)
+                        if card not in (card1, card2)]
+                cards = dealer.sample(deck, 7, trials)
+                hero = np.concatenate(
+                    [np.tile([card1, card2], (trials, 1)), cards[:, 2:]],
+                    axis=1)
+                equities[hand_class] = self._share(
+                    dealer.evaluator.rank_keys(hero),
+                    dealer.evaluator.rank_keys(cards)).mean()
+        return equities
+
+    def _calibrate(self):
+        """
+        每条街胜率的buckets - 1个分位数
+        """
+        quantiles = np.arange(1, self.buckets) / self.buckets
+        combos = [(card1, card2) for card1 in range(52)
+                  for card2 in range(card1 + 1, 52)]
+        cards1, cards2 = np.array(combos).T
+        bounds = [np.quantile(self._preflop[self._classes[cards1, cards2]],
+                              quantiles)]
+        rng = self._rng
+        self._rng = np.random.default_rng(self.CALIBRATION)
+        deals = np.argsort(self._rng.random((self.CALIBRATION, 52)), axis=1)
+        for board_count in (3, 4, 5):
+            bounds.append(np.quantile(
+                self.street_equities(deals, 0, board_count), quantiles))
+        self._rng = rng
+        return bounds
+
+    @staticmethod
+    def _share(keys, other_keys):
+        return (keys > other_keys) + 0.5 * (keys == other_keys)
+
+    def street_equities(self, deals, player, board_count):
+        """
+        deals: (M, 52)的整数编码，每行为玩家0底牌、玩家1底牌、5张公共牌、剩下的牌
+        返回player只知道自己底牌和前board_count张公共牌时对随机对手的胜率
+        """
+        rows = len(deals)
+        samples = self.samples
+        own = deals[:, 2 * player:2 * player + 2]
+        board = deals[:, 4:4 + board_count]
+        known = list(range(2 * player, 2 * player + 2)) + \
+            list(range(4, 4 + board_count))
+        unknown = deals[:, [column for column in range(52)
+                            if column not in known]]
+        draw = 2 + 5 - board_count
+        # 每行每次模拟随机排一下不知道的牌，取前draw张
+        order = np.argsort(self._rng.random((rows, samples, unknown.shape[1])),
+                           axis=2)[:, :, :draw]
+        picked = np.take_along_axis(
+            np.broadcast_to(unknown[:, None, :], order.shape[:2] +
+                            unknown.shape[1:]), order, axis=2)
+        common = np.concatenate(
+            [np.broadcast_to(board[:, None, :], (rows, samples, board_count)),
+             picked[:, :, 2:]], axis=2)
+        hero = np.concatenate(
+            [np.broadcast_to(own[:, None, :], (rows, samples, 2)), common],
+            axis=2).reshape(-1, 7)
+        villain = np.concatenate([picked[:, :, :2], common],
+                                 axis=2).reshape(-1, 7)
+        evaluator = self._dealer.evaluator
+        share = self._share(evaluator.rank_keys(hero),
+                            evaluator.rank_keys(villain))
+        return share.reshape(rows, samples).mean(axis=1)
+
+    def buckets_of(self, deals):
+        """
+        返回(M, 2, 4)：每手牌每个玩家每条街的桶
+        """
+        deals = np.asarray(deals, dtype=np.int16)
+        result = np.empty((len(deals), 2, 4), dtype=np.int16)
+        for player in range(2):
+            classes = self._classes[deals[:, 2 * player],
+                                    deals[:, 2 * player + 1]]
+            result[:, player, 0] = np.searchsorted(
+                self._bounds[0], self._preflop[classes], side='right')
+            for street, board_count in enumerate((3, 4, 5), 1):
+                result[:, player, street] = np.searchsorted(
+                    self._bounds[street],
+                    self.street_equities(deals, player, board_count),
+                    side='right')
+        return result
+
+
+def _train_worker(args):
+    """
+    在一个进程里从regrets出发跑iterations次，返回regret和平均策略的增量
+    """
+    config, regrets, seed, iterations = args
+    solver = CFRSolver(**config)
+    solver.regrets = regrets.copy()
+    start = time.perf_counter()
+    solver.run(iterations, seed)
+    return (solver.regrets - regrets, solver.strategy_sum, iterations,
+            time.perf_counter() - start)
+
+
+class CFRSolver:
+    """
+    单挑限注德州的outcome sampling MCCFR
+
+    牌用EquityBucketer分桶，信息集为(下注树的决策节点, 当前街自己的桶)，
+    编号为node * buckets + bucket（不记以前街的桶，是不完美回忆的抽象）。
+    regret和平均策略存在(信息集数, 3)的数组里，非法动作一直为0。
+    每次迭代用TexasTable发一手牌、比牌，两个玩家各沿一条抽样路径更新一次。
+    多进程时每轮把regrets发给每个进程各跑一段，再把增量加起来。
+
+        solver = CFRSolver(buckets=8, processes=4, seed=1)
+        solver.train(1000000)
+        solver.action_probabilities(0, 7)   # 翻牌前庄家拿最好的桶
+    """
+    def __init__(self, small_blind=1, big_blind=2, max_bets=4, buckets=8,
+                 samples=32, batch_size=1024, epsilon=0.6, processes=1,
+                 seed=None):
+        """
+        samples: 每条街估算胜率时的模拟次数
+        batch_size: 一次发多少手牌一起分桶
+        epsilon: 更新的玩家抽样时均匀探索的比例
+        """
+        self._config = {'small_blind': small_blind, 'big_blind': big_blind,
+                        'max_bets': max_bets, 'buckets': buckets,
+                        'samples': samples, 'batch_size': batch_size,
+                        'epsilon': epsilon}
+        self.buckets = buckets
+        self.samples = samples
+        self.batch_size = batch_size
+        self.epsilon = epsilon
+        self.processes = processes
+        self._rng = random.Random(seed)
+        self._bucketer = None
+        self.set_tree(LimitBettingTree(small_blind, big_blind, max_bets))
+
+    def set_tree(self, tree):
+        """
+        换一棵下注树（需要_players、_streets、_children、legal和utility），
+        regret和平均策略清零
+        """
+        self.tree = tree
+        size = len(tree) * self.buckets
+        self.regrets = np.zeros((size, 3))
+        self.strategy_sum = np.zeros((size, 3))
+        self.iterations = 0
+        self._legal = tree.legal.astype(np.float64)
+        self._uniform = self._legal / self._legal.sum(axis=1, keepdims=True)
+
+    def _deal(self, table, size):
+        """
+        用TexasTable发size手牌，返回(size, 52)的牌和每手牌玩家0的比牌结果
+        """
+        deals = np.empty((size, 52), dtype=np.int16)
+        results = []
+        tp = table._texaspoker
+        for i in range(size):
+            table.shuffle()
+            table.deal()
+            board = table.deal_board()
+            deals[i] = table.get_hole_card(1) + table.get_hole_card(2) + \
+                board + tp.cards
+            key1, key2 = table.get_rank_keys()
+            results.append((key1 > key2) - (key1 < key2))
+        return deals, results
+
+    def _traverse(self, buckets, result, traverser, rand):
+        tree = self.tree
+        players = tree._players
+        streets = tree._streets
+        children = tree._children
+        regrets = self.regrets
+        strategy_sum = self.strategy_sum
+        uniform = self._uniform
+        epsilon = self.epsilon
+        bucket_count = self.buckets
+        node = 0
+        path = []
+        reach = 1.0     # 对手的到达概率
+        sample = 1.0
+        while node >= 0:
+            player = players[node]
+            index = node * bucket_count + buckets[player][streets[node]]
+            positive = np.maximum(regrets[index], 0.0)
+            total = positive.sum()
+            sigma = positive / total if total > 0 else uniform[node]
+            if player == traverser:
+                probs = epsilon * uniform[node] + (1 - epsilon) * sigma
+            else:
+                probs = sigma
+                strategy_sum[index] += sigma * (reach / sample)
+            p_fold, p_call, p_raise = probs.tolist()
+            r = rand()
+            if r < p_fold:
+                action = 0
+            elif r < p_fold + p_call or p_raise == 0:
+                action = 1
+            else:
+                action = 2
+            path.append((node, index, player, sigma, action, reach))
+            if player != traverser:
+                reach *= sigma[action]
+            sample *= probs[action]
+            node = children[node][action]
+        utility = tree.utility(~node, result)
+        if traverser:
+            utility = -utility
+        utility /= sample
+        tail = 1.0
+        legal = self._legal
+        for node, index, player, sigma, action, reach in reversed(path):
+            if player == traverser:
+                # 抽到的动作的反事实价值为weight，其他为0，
+                # 信息集的价值是sigma[action] * weight
+                weight = utility * reach * tail
+                regrets[index] -= weight * sigma[action] * legal[node]
+                regrets[index, action] += weight
+            tail *= sigma[action]
+
+    def run(self, iterations, seed=None):
+        """
+        在当前进程里跑iterations次迭代
+        """
+        if self._bucketer is None:
+            self._bucketer = EquityBucketer(self.buckets, self.samples,
+                                            seed=seed)
+        table = TexasTable(player_count=2, int_cards=True, seed=seed)
+        rand = random.Random(seed).random
+        done = 0
+        while done < iterations:
+            size = min(self.batch_size, iterations - done)
+            deals, results = self._deal(table, size)
+            buckets = self._bucketer.buckets_of(deals).tolist()
+            for row in range(size):
+                self._traverse(buckets[row], results[row], 0, rand)
+                self._traverse(buckets[row], results[row], 1, rand)
+            done += size
+        self.iterations += iterations
+
+    def train(self, iterations, iterations_per_task=None):
+        """
+        训练iterations次，多进程时每轮每个进程跑iterations_per_task次
+        返回每秒迭代次数
+        """
+        start = time.perf_counter()
+        if self.processes <= 1:
+            self.run(iterations, self._rng.getrandbits(64))
+            return iterations / (time.perf_counter() - start)
+        if iterations_per_task is None:
+            iterations_per_task = max(self.batch_size, -(-iterations //
+                                                         (self.processes * 4)))
+        with multiprocessing.Pool(self.processes) as pool:
+            done = 0
+            while done < iterations:
+                tasks = []
+                for i in range(self.processes):
+                    size = min(iterations_per_task, iterations - done)
+                    if size <= 0:
+                        break
+                    tasks.append((self._config, self.regrets,
+                                  self._rng.getrandbits(64), size))
+                    done += size
+                for regrets, strategy_sum, count, elapsed in pool.map(
+                        _train_worker, tasks):
+                    self.regrets += regrets
+                    self.strategy_sum += strategy_sum
+                    self.iterations += count
+        return iterations / (time.perf_counter() - start)
+
+    def average_strategy(self):
+        """
+        每个信息集的平均策略，(信息集数, 3)，没到过的信息集为均匀分布
+        """
+        totals = self.strategy_sum.sum(axis=1, keepdims=True)
+        uniform = np.repeat(self._uniform, self.buckets, axis=0)
+        return np.where(totals > 0, self.strategy_sum /
+                        np.where(totals > 0, totals, 1), uniform)
+
+    def action_probabilities(self, node, bucket):
+        """
+        决策节点node、桶bucket的平均策略，{'fold': 概率, ...}，只含合法动作
+        """
+        index = node * self.buckets + bucket
+        total = self.strategy_sum[index].sum()
+        row = self.strategy_sum[index] / total if total > 0 else \
+            self._uniform[node]
+        return {action: float(row[i])
+                for i, action in enumerate(LimitBettingTree.ACTIONS)
+                if self.tree.legal[node, i]}
+
+    def save(self, path):
+        np.savez_compressed(path, regrets=self.regrets,
+                            strategy_sum=self.strategy_sum,
+                            iterations=self.iterations)
+
+    def load(self, path):
+        with np.load(path) as data:
+            if data['regrets'].shape != self.regrets.shape:
+                raise ValueError('solver shape does not match %s' % path)
+            self.regrets = data['regrets']
+            self.strategy_sum = data['strategy_sum']
+            self.iterations = int(data['iterations'])
+
+
+if __name__ == '__main__':
+    solver = CFRSolver(processes=2, seed=1)
+    print('%d nodes, %d info sets' % (len(solver.tree), len(solver.regrets)))
+    rate = solver.train(40000)
+    print('%.0f iterations/s, %.1fM iterations/hour' % (rate,
+                                                         rate * 3600 / 1e6))
+    for bucket in range(solver.buckets):
+        print(bucket, solver.action_probabilities(0, bucket))
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: texas poker equity calculator
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import itertools
+import math
+import multiprocessing
+import random
+
+from lookup_table import LookupEvaluator
+from texaspoker import TexasPoker
+
+
+def _monte_carlo_worker(args):
+    """
+    在一个随机数流上跑trials次随机发完公共牌，返回EquityResult
+    """
+    holes, board, deck, trials, seed, lut_path = args
+    rank_key = LookupEvaluator.rank_key_func(lut_path)
+    rng = random.Random(seed)
+    need = 5 - len(board)
+    result = EquityResult(len(holes))
+    keys = [0] * len(holes)
+    for i in range(trials):
+        full_board = board + rng.sample(deck, need)
+        for player, hole in enumerate(holes):
+            keys[player] = rank_key(hole + full_board)
+        result.add_showdown(keys)
+    return result
+
+
+class EquityResult:
+    """
+    每个玩家的赢、平、输次数，以及胜率（平局按人数平分）
+    """
+    def __init__(self, player_count):
+        self.trials = 0
+        self.wins = [0] * player_count
+        self.ties = [0] * player_count
+        self.shares = [0.0] * player_count
+        self.shares_square = [0.0] * player_count
+
+    def add_showdown(self, keys, weight=1):
+        """
+        记一次摊牌结果，keys为每个玩家的rank key
+        """
+        best = max(keys)
+        winners = [i for i, key in enumerate(keys) if key == best]
+        self.trials += weight
+        if len(winners) == 1:
+            player = winners[0]
+            self.wins[player] += weight
+            self.shares[player] += weight
+            self.shares_square[player] += weight
+            return
+        share = 1.0 / len(winners)
+        for player in winners:
+            self.ties[player] += weight
+            self.shares[player] += share * weight
+            self.shares_square[player] += share * share * weight
+
+    def merge(self, other):
+        """
+        合并另一组结果
+        """
+        self.trials += other.trials
+        for i in range(len(self.wins)):
+            self.wins[i] += other.wins[i]
+            self.ties[i] += other.ties[i]
+            self.shares[i] += other.shares[i]
+            self.shares_square[i] += other.shares_square[i]
+        return self
+
+    def to_dict(self):
+        return {'trials': self.trials, 'wins': self.wins, 'ties': self.ties,
+                'shares': self.shares, 'shares_square': self.shares_square}
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls(len(data['wins']))
+        result.trials = data['trials']
+        result.wins = list(data['wins'])
+        result.ties = list(data['ties'])
+        result.shares = list(data['shares'])
+        result.shares_square = list(data['shares_square'])
+        return result
+
+    @property
+    def equities(self):
+        return [share / self.trials for share in self.shares]
+
+    @property
+    def win_rates(self):
+        return [win / self.trials for win in self.wins]
+
+    @property
+    def tie_rates(self):
+        return [tie / self.trials for tie in self.ties]
+
+    @property
+    def lose_rates(self):
+        return [(self.trials - win - tie) / self.trials
+                for win, tie in zip(self.wins, self.ties)]
+
+    def confidence_half_width(self, z=1.96):
+        """
+        所有玩家胜率置信区间半宽的最大值
+        """
+        if self.trials < 2:
+            return float('inf')
+        half_width = 0.0
+        for share, square in zip(self.shares, self.shares_square):
+            mean = share / self.trials
+            variance = max(square / self.trials - mean * mean, 0.0)
+            half_width = max(
+                half_width, z * math.sqrt(variance / self.trials))
+        return half_width
+
+
+class EquityCalculator:
+    """
+    计算每个玩家的胜率，公共牌取texaspoker已经发出的，剩下的从texaspoker.cards里发
+    """
+    def __init__(self, texaspoker=None, lut_path=None):
+        if texaspoker is None:
+            texaspoker = TexasPoker(int_cards=True)
+        self._texaspoker = texaspoker
+        self._lut_path = lut_path
+
+    def _to_ints(self, cards):
+        if self._texaspoker._int_cards:
+            return list(cards)
+        return self._texaspoker.cards_to_ints(cards)
+
+    def _prepare(self, hole_cards_list):
+        """
+        转成整数编码，返回底牌、已发公共牌、剩下的牌
+        """
+        tp = self._texaspoker
+        board = tp._flops + [tp._turn, tp._rever]
+        board = self._to_ints([card for card in board if card is not None])
+        holes = [self._to_ints(hole) for hole in hole_cards_list]
+        dead = set(board)
+        for hole in holes:
+            dead.update(hole)
+        deck = [card for card in self._to_ints(tp.cards)
+                if card not in dead]
+        return holes, board, deck
+
+    def monte_carlo(self, hole_cards_list, trials=10000, processes=1,
+                    seed=None, tolerance=None, batch_size=1000):
+        """
+        随机发完公共牌trials次估算胜率
+        processes: 大于1时用进程池，每块用独立的随机数种子
+        tolerance: 所有玩家胜率的95%置信区间半宽都小于它时提前结束
+        """
+        holes, board, deck = self._prepare(hole_cards_list)
+        master_rng = random.Random(seed)
+        result = EquityResult(len(holes))
+        if tolerance is None:   # 不需要中途检查就一次分完
+            batch_size = max(batch_size, -(-trials // processes))
+        pool = multiprocessing.Pool(processes) if processes > 1 else None
+        try:
+            while result.trials < trials:
+                chunks = []
+                for i in range(processes):
+                    size = min(batch_size, trials - result.trials -
+                               batch_size * i)
+                    if size <= 0:
+                        break
+                    chunks.append((holes, board, deck, size,
+                                   master_rng.getrandbits(64),
+                                   self._lut_path))
+                if pool is None:
+                    chunk_results = map(_monte_carlo_worker, chunks)
+                else:
+                    chunk_results = pool.map(_monte_carlo_worker, chunks)
+                for chunk_result in chunk_results:
+                    result.merge(chunk_result)
+                if (tolerance is not None and
+                        result.confidence_half_width() < tolerance):
+                    break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return result
+
+    def bulk_monte_carlo(self, hole_cards_list, trials=100000, seed=None):
+        """
+        用numpy一次发完trials次公共牌，批量判断，需要numpy
+        """
+        from batch_eval import BulkDealer
+
+        holes, board, deck = self._prepare(hole_cards_list)
+        return BulkDealer(len(holes), seed=seed).equity(
+            holes, board, trials, deck=deck)
+
+    def exact(self, hole_cards_list):
+        """
+        枚举所有剩下的公共牌组合，精确计算胜率
+        每种公共牌组合只处理一次，各玩家底牌加已发公共牌的部分预先算好
+        """
+        holes, board, deck = self._prepare(hole_cards_list)
+        need = 5 - len(board)
+        result = EquityResult(len(holes))
+        keys = [0] * len(holes)
+        if self._lut_path is not None:
+            evaluator = LookupEvaluator.load_shared(self._lut_path)
+            states = [evaluator.partial_state(hole + board) for hole in holes]
+            for runout in itertools.combinations(deck, need):
+                run_rank, run_suit, run_masks = evaluator.partial_state(
+                    runout)
+                for player, (rank_sum, suit_sum, masks) in enumerate(states):
+                    keys[player] = evaluator.evaluate_state(
+                        rank_sum + run_rank, suit_sum + run_suit,
+                        masks, run_masks)
+                result.add_showdown(keys)
+            return result
+
+        states = []
+        for hole in holes:
+            counts = [0] * 14
+            suit_masks = [0, 0, 0, 0]
+            for card in hole + board:
+                counts[(card >> 2) + 1] += 1
+                suit_masks[card & 3] |= 1 << (card >> 2) + 1
+            states.append((counts, suit_masks))
+        rank_key_from_counts = TexasPoker._rank_key_from_counts
+        for runout in itertools.combinations(deck, need):
+            run_cards = [((card >> 2) + 1, card & 3) for card in runout]
+            for player, (base_counts, base_masks) in enumerate(states):
+                counts = base_counts[:]
+                suit_masks = base_masks[:]
+                for weight, suit in run_cards:
+                    counts[weight] += 1
+                    suit_masks[suit] |= 1 << weight
+                keys[player] = rank_key_from_counts(counts, suit_masks)
+            result.add_showdown(keys)
+        return result
+
+
+if __name__ == '__main__':
+    tp = TexasPoker()
+    hole_cards1 = tp.pop_hole_cards()
+    hole_cards2 = tp.pop_hole_cards()
+    tp.pop_flop()
+    calculator = EquityCalculator(tp)
+    result = calculator.monte_carlo([hole_cards1, hole_cards2],
+                                    processes=2, tolerance=0.01)
+    print(hole_cards1, hole_cards2, tp._flops)
+    print(result.trials, result.equities)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: persistent sqlite equity cache shared by processes and runs
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import json
+import sqlite3
+import time
+
+from canonical import SuitCanonicalizer
+from equity import EquityResult
+
+
+class EquityStore:
+    """
+    按花色同构的标准形式（底牌、公共牌、人数）把胜率结果存到SQLite文件里
+
+    用WAL模式，多个进程可以同时读；写先放在内存里，攒够batch_size条
+    在一个事务里写进去。条数超过max_entries时删掉最久没用过的。
+    连接不能跨进程，每个进程自己打开一个EquityStore（同一个path）。
+
+        with EquityStore('equity.db') as store:
+            result = store.get(holes, board)
+            if result is None:
+                result = ...
+                store.put(holes, board, result)
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS equity (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            last_used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS equity_last_used ON equity (last_used);
+    """
+
+    def __init__(self, path, max_entries=1000000, batch_size=256,
+                 timeout=30.0):
+        self._path = path
+        self.max_entries = max_entries
+        self._batch_size = batch_size
+        self._conn = sqlite3.connect(path, timeout=timeout)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+        self._pending = {}      # 还没写进去的结果：key -> json
+        self._touched = set()   # 读命中过、要更新last_used的key
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(hole_cards_list, board=(), method='exact', **kwargs):
+        """
+        method和kwargs是算胜率的方式和参数，不同的分开存
+        """
+        canonical = SuitCanonicalizer.canonical_key(hole_cards_list, board)
+        return json.dumps([method, sorted(kwargs.items()), canonical],
+                          separators=(',', ':'))
+
+    def get_by_key(self, key):
+        value = self._pending.get(key)
+        if value is None:
+            row = self._conn.execute(
+                'SELECT result FROM equity WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                value = row[0]
+                self._touched.add(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return EquityResult.from_dict(json.loads(value))
+
+    def put_by_key(self, key, result):
+        self._pending[key] = json.dumps(result.to_dict(),
+                                        separators=(',', ':'))
+        self._touched.discard(key)
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def get(self, hole_cards_list, board=(), method='exact', **kwargs):
+        return self.get_by_key(
+            self.make_key(hole_cards_list, board, method, **kwargs))
+
+    def put(self, hole_cards_list, board, result, method='exact', **kwargs):
+        self.put_by_key(
+            self.make_key(hole_cards_list, board, method, **kwargs), result)
+
+    def flush(self):
+        """
+        把攒着的写和last_used更新一次写进去，超过上限就淘汰
+        """
+        if not self._pending and not self._touched:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO equity (key, result, last_used) '
+                'VALUES (?, ?, ?)',
+                [(key, value, now) for key, value in self._pending.items()])
+            self._conn.executemany(
+                'UPDATE equity SET last_used = ? WHERE key = ?',
+                [(now, key) for key in self._touched])
+            self._evict()
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM equity').fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            'DELETE FROM equity WHERE key IN (SELECT key FROM equity '
+            'ORDER BY last_used, rowid LIMIT ?)', (count - self.max_entries,))
+
+    def __len__(self):
+        """
+        文件里的条数，先把攒着的写进去
+        """
+        self.flush()
+        return self._conn.execute('SELECT COUNT(*) FROM equity').fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'pending': len(self._pending)}
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -20,3 +20,19 @@ class PokerCardRunOutException(PokerException):
     """
     def __init__(self, message):
         super(PokerCardRunOutException, self).__init__(message)
+
+
+class BettingError(PokerException):
+    """
+    不合法的下注动作
+    """
+    def __init__(self, message):
+        super(BettingError, self).__init__(message)
+
+
+class VariantError(PokerException):
+    """
+    玩法不支持的操作，比如奥马哈调用德州扑克专用的方法
+    """
+    def __init__(self, message):
+        super(VariantError, self).__init__(message)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: binary hand history writer and reader
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import collections
+import mmap
+import os
+import struct
+
+from pokerdeck import Poker
+
+
+HandRecord = collections.namedtuple(
+    'HandRecord', ['hand_id', 'seed', 'hole_cards', 'board', 'rank'])
+
+
+class HandHistoryFormat:
+    """
+    文件头16字节：MAGIC、记录长度、最多座位数
+    每手牌一条定长记录（小端序，52字节）：
+        hand_id     uint64
+        seed        uint64
+        座位数      uint8
+        底牌        uint8 * 20     每个座位两张，整数编码，没有牌为0xff
+        公共牌      uint8 * 5
+        名次        uint8 * 10     0为最大，同名次即平分，弃牌或没人为0xff
+    """
+    MAGIC = b'TXPKHH02'     # 01版hand_id是uint32
+    MAX_SEATS = 10
+    NO_CARD = 0xff
+    HEADER = struct.Struct('<8sII')
+    RECORD = struct.Struct('<QQB%dB5B%dB' % (MAX_SEATS * 2, MAX_SEATS))
+
+    @classmethod
+    def pack_into(cls, buffer, offset, hand_id, seed, hole_cards, board,
+                  rank):
+        """
+        hole_cards、board为整数编码，rank为players_rank的分组结果
+        """
+        if len(hole_cards) > cls.MAX_SEATS:
+            raise ValueError('at most %d seats' % cls.MAX_SEATS)
+        cards = [cls.NO_CARD] * (cls.MAX_SEATS * 2 + 5)
+        for seat, hole in enumerate(hole_cards):
+            cards[seat * 2:seat * 2 + 2] = hole
+        cards[cls.MAX_SEATS * 2:cls.MAX_SEATS * 2 + len(board)] = board
+        places = [cls.NO_CARD] * cls.MAX_SEATS
+        for place, player_ids in enumerate(rank):
+            for player_id in player_ids:
+                places[player_id - 1] = place
+        cls.RECORD.pack_into(buffer, offset, hand_id, seed,
+                             len(hole_cards), *(cards + places))
+
+    @classmethod
+    def _check_header(cls, data, path):
+        if len(data) != cls.HEADER.size:
+            raise ValueError('not a hand history file: %s' % path)
+        magic, record_size, max_seats = cls.HEADER.unpack(data)
+        if (magic != cls.MAGIC or record_size != cls.RECORD.size or
+                max_seats != cls.MAX_SEATS):
+            raise ValueError('not a hand history file: %s' % path)
+
+    @classmethod
+    def unpack(cls, values):
+        """
+        RECORD解出来的元组转成HandRecord
+        """
+        hand_id, seed, seat_count = values[:3]
+        cards = values[3:3 + cls.MAX_SEATS * 2]
+        hole_cards = [list(cards[seat * 2:seat * 2 + 2])
+                      for seat in range(seat_count)]
+        board = [card for card in values[3 + cls.MAX_SEATS * 2:
+                                         8 + cls.MAX_SEATS * 2]
+                 if card != cls.NO_CARD]
+        places = values[8 + cls.MAX_SEATS * 2:]
+        groups = {}
+        for seat in range(seat_count):
+            if places[seat] != cls.NO_CARD:
+                groups.setdefault(places[seat], []).append(seat + 1)
+        rank = [groups[place] for place in sorted(groups)]
+        return HandRecord(hand_id, seed, hole_cards, board, rank)
+
+
+class HandHistoryWriter(HandHistoryFormat):
+    """
+    追加写入，先攒在缓冲区里，够batch_size条再一次写到文件
+    """
+    def __init__(self, path, batch_size=4096):
+        self._batch_size = batch_size
+        self._buffer = bytearray(self.RECORD.size * batch_size)
+        self._pending = 0
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size:
+            with open(path, 'rb') as f:
+                self._check_header(f.read(self.HEADER.size), path)
+            count = (size - self.HEADER.size) // self.RECORD.size
+            # 上次写到一半崩溃留下的不完整记录截掉，否则后面的记录都对不齐
+            os.truncate(path, self.HEADER.size + count * self.RECORD.size)
+        self._file = open(path, 'ab')
+        if size:
+            self._next_hand_id = count
+        else:
+            self._file.write(self.HEADER.pack(
+                self.MAGIC, self.RECORD.size, self.MAX_SEATS))
+            self._next_hand_id = 0
+
+    def write_hand(self, hole_cards, board, rank, seed=0):
+        """
+        记一手牌，返回hand_id
+        """
+        hand_id = self._next_hand_id
+        self.pack_into(self._buffer, self._pending * self.RECORD.size,
+                       hand_id, seed, hole_cards, board, rank)
+        self._next_hand_id += 1
+        self._pending += 1
+        if self._pending == self._batch_size:
+            self.flush()
+        return hand_id
+
+    def write_table(self, table, rank=None, seed=0):
+        """
+        记下TexasTable当前这一手牌，rank不给就用players_rank
+        """
+        hole_cards = table._player_hole_cards
+        board = table.get_board()
+        if not table._int_cards:
+            hole_cards = [Poker.cards_to_ints(hole) for hole in hole_cards]
+            board = Poker.cards_to_ints(board)
+        if rank is None:
+            rank = table.players_rank()
+        return self.write_hand(hole_cards, board, rank, seed=seed)
+
+    def flush(self):
+        if self._pending:
+            self._file.write(
+                memoryview(self._buffer)[:self._pending * self.RECORD.size])
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class HandHistoryReader(HandHistoryFormat):
+    """
+    用mmap读，遍历时直接从映射的内存里解包，不复制整个文件
+    """
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < self.HEADER.size:
+            self._file.close()  # 空文件不能mmap
+            raise ValueError('not a hand history file: %s' % path)
+        self._mmap = mmap.mmap(self._file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        self._check_header(self._mmap[:self.HEADER.size], path)
+        count = (len(self._mmap) - self.HEADER.size) // self.RECORD.size
+        self._view = memoryview(self._mmap)[
+            self.HEADER.size:self.HEADER.size + count * self.RECORD.size]
+
+    def __len__(self):
+        return len(self._view) // self.RECORD.size
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError('hand index out of range')
+        return self.unpack(self.RECORD.unpack_from(
+            self._view, (index % len(self)) * self.RECORD.size))
+
+    def __iter__(self):
+        return self.iter_records()
+
+    def iter_records(self, start=0, stop=None):
+        """
+        逐条解出第start到stop-1条记录
+        """
+        size = self.RECORD.size
+        stop = len(self) if stop is None else min(stop, len(self))
+        for values in self.RECORD.iter_unpack(
+                self._view[start * size:max(start, stop) * size]):
+            yield self.unpack(values)
+
+    def iter_raw(self, start=0, stop=None):
+        """
+        按条返回记录的memoryview（指向映射的内存，不复制）
+        """
+        size = self.RECORD.size
+        stop = len(self) if stop is None else min(stop, len(self))
+        for index in range(start, stop):
+            yield self._view[index * size:(index + 1) * size]
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == '__main__':
+    import sys
+    from texas_table import TexasTable
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'hands.hist'
+    table = TexasTable(player_count=6, seed=1)
+    with HandHistoryWriter(path) as writer:
+        for seed in range(1000):
+            table.shuffle(seed=seed)
+            table.deal()
+            table.deal_board()
+            writer.write_table(table, seed=seed)
+    with HandHistoryReader(path) as reader:
+        print(len(reader), reader[-1])
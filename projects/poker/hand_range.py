@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: hand range parser and range vs range equity
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import bisect
+import itertools
+import multiprocessing
+import random
+import re
+
+from lookup_table import LookupEvaluator
+from texaspoker import HandState
+from texaspoker import TexasPoker
+
+
+def _range_worker(args):
+    """
+    对一批公共牌发法，计算range1里每个组合对range2的胜率，返回RangeEquityResult
+    runouts为None时用seed随机发trials次
+    每种发法的公共牌只统计一次，两个范围里的所有组合共用
+    """
+    (combos1, weights1, combos2, weights2, board, deck, runouts, seed,
+     trials, lut_path) = args
+    if runouts is None:
+        rng = random.Random(seed)
+        need = 5 - len(board)
+        runouts = (rng.sample(deck, need) for i in range(trials))
+    evaluator = LookupEvaluator.load_shared(lut_path) if lut_path else None
+    if evaluator is not None:
+        holes1 = [evaluator.partial_state(combo) for combo in combos1]
+        holes2 = [evaluator.partial_state(combo) for combo in combos2]
+    else:
+        holes1 = combos1
+        holes2 = combos2
+    result = RangeEquityResult()
+    for runout in runouts:
+        full_board = board + list(runout)
+        used = set(full_board)
+        if evaluator is not None:
+            rank_sum, suit_sum, masks = evaluator.partial_state(full_board)
+
+            def rank_key(hole):
+                return evaluator.evaluate_state(
+                    rank_sum + hole[0], suit_sum + hole[1], masks, hole[2])
+        else:
+            board_state = HandState(full_board)
+
+            def rank_key(hole):
+                state = board_state.copy()
+                state.add(hole[0])
+                state.add(hole[1])
+                return state.rank_key()
+
+        # range2里没被公共牌挡住的组合：按rank key排序，前缀和算赢/平的权重
+        entries = []
+        for i, combo in enumerate(combos2):
+            if combo[0] in used or combo[1] in used:
+                continue
+            key = rank_key(holes2[i])
+            entries.append((key, weights2[i], combo))
+        entries.sort()
+        keys = [entry[0] for entry in entries]
+        prefix = [0.0]
+        by_card = {}
+        for key, weight, combo in entries:
+            prefix.append(prefix[-1] + weight)
+            by_card.setdefault(combo[0], []).append((key, weight, combo))
+            by_card.setdefault(combo[1], []).append((key, weight, combo))
+        total = prefix[-1]
+
+        for i, combo in enumerate(combos1):
+            card1, card2 = combo
+            if card1 in used or card2 in used:
+                continue
+            key = rank_key(holes1[i])
+            low = bisect.bisect_left(keys, key)
+            high = bisect.bisect_right(keys, key)
+            below = prefix[low]
+            equal = prefix[high] - prefix[low]
+            valid = total
+            # 去掉和这个组合有同一张牌的对手组合
+            for other_key, weight, other in by_card.get(card1, ()):
+                valid -= weight
+                if other_key < key:
+                    below -= weight
+                elif other_key == key:
+                    equal -= weight
+            for other_key, weight, other in by_card.get(card2, ()):
+                if card1 in other:
+                    continue
+                valid -= weight
+                if other_key < key:
+                    below -= weight
+                elif other_key == key:
+                    equal -= weight
+            result.add(combo, weights1[i], below, equal, valid)
+    return result
+
+
+class HandRange:
+    """
+    起手牌范围，如'QQ+, AKs, T9s-65s, AJo:0.5, AhKh'
+    每个具体组合为(大的牌, 小的牌)，整数编码，对应一个权重
+
+    支持的写法：
+        AA, AKs, AKo, AK            对子、同花、不同花、两者都要
+        QQ+, ATs+, KTo+             对子到AA，踢脚升到比大牌小一
+        22-55, KTs-K7s, T9s-65s     对子区间、同一张大牌的踢脚区间、同样间隔的连牌区间
+        AhKd                        一个具体组合
+        :0.5                        附加在任何写法后面表示权重
+    """
+    RANKS = '23456789TJQKA'
+    SUITS = 'cdhs'      # 顺序和Poker.SUITS一致
+    _TOKEN = re.compile(
+        r'^(?P<hand>[2-9TJQKA]{2}[so]?|(?:[2-9TJQKA][cdhs]){2})'
+        r'(?:(?P<plus>\+)|-(?P<end>[2-9TJQKA]{2}[so]?))?'
+        r'(?::(?P<weight>[0-9.]+))?$')
+
+    def __init__(self, text=''):
+        self.weights = {}
+        if text:
+            self.parse(text)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def __iter__(self):
+        return iter(self.weights.items())
+
+    def add(self, card1, card2, weight=1.0):
+        if card1 < card2:
+            card1, card2 = card2, card1
+        if weight > 0:
+            self.weights[(card1, card2)] = weight
+        else:
+            self.weights.pop((card1, card2), None)
+
+    def _add_class(self, high, low, suited, weight):
+        """
+        high、low为点数序号，suited为True/False/None（都要）
+        """
+        for suit1 in range(4):
+            for suit2 in range(4):
+                card1 = high * 4 + suit1
+                card2 = low * 4 + suit2
+                if high == low:
+                    if suit1 < suit2:
+                        self.add(card1, card2, weight)
+                elif suited is None or suited == (suit1 == suit2):
+                    self.add(card1, card2, weight)
+
+    def parse(self, text):
+        for token in text.replace(' ', '').split(','):
+            if not token:
+                continue
+            # 点数大写，花色和s/o小写
+            token = ''.join(char.lower() if char.lower() in 'cdhso' else
+                            char.upper() for char in token)
+            match = self._TOKEN.match(token)
+            if match is None:
+                raise ValueError('bad range token: %s' % token)
+            self._parse_token(match, token)
+        return self
+
+    def _parse_token(self, match, token):
+        hand = match.group('hand')
+        weight = float(match.group('weight') or 1.0)
+        if len(hand) == 4 and hand[1] in self.SUITS:
+            cards = [self.RANKS.index(hand[i]) * 4 + self.SUITS.index(
+                     hand[i + 1]) for i in (0, 2)]
+            if cards[0] == cards[1] or match.group('plus') or \
+                    match.group('end'):
+                raise ValueError('bad range token: %s' % token)
+            self.add(cards[0], cards[1], weight)
+            return
+        high, low = sorted((self.RANKS.index(hand[0]),
+                            self.RANKS.index(hand[1])), reverse=True)
+        suited = {'s': True, 'o': False}.get(hand[2:])
+        if high == low and suited is not None:
+            raise ValueError('bad range token: %s' % token)
+        classes = [(high, low)]
+        if match.group('plus'):
+            if high == low:
+                classes = [(rank, rank) for rank in range(high, 13)]
+            else:
+                classes = [(high, kicker) for kicker in range(low, high)]
+        elif match.group('end'):
+            end = match.group('end')
+            end_high, end_low = sorted((self.RANKS.index(end[0]),
+                                        self.RANKS.index(end[1])),
+                                       reverse=True)
+            if end[2:] != hand[2:] or (high == low) != (end_high == end_low):
+                raise ValueError('bad range token: %s' % token)
+            if high == low:
+                classes = [(rank, rank) for rank in
+                           range(min(high, end_high), max(high, end_high) + 1)]
+            elif high == end_high:
+                classes = [(high, kicker) for kicker in
+                           range(min(low, end_low), max(low, end_low) + 1)]
+            elif high - low == end_high - end_low:
+                gap = high - low
+                classes = [(rank, rank - gap) for rank in
+                           range(min(high, end_high), max(high, end_high) + 1)]
+            else:
+                raise ValueError('bad range token: %s' % token)
+        for class_high, class_low in classes:
+            self._add_class(class_high, class_low, suited, weight)
+
+    @staticmethod
+    def _to_ints(cards):
+        return [card if isinstance(card, int) else TexasPoker.card_to_int(card)
+                for card in cards]
+
+    def combos(self, dead=(), int_cards=True):
+        """
+        去掉和dead（公共牌等已知的牌，两种编码都可以）冲突的组合，返回[(组合, 权重)]
+        """
+        dead = set(self._to_ints(dead))
+        combos = []
+        for combo, weight in sorted(self.weights.items(), reverse=True):
+            if combo[0] in dead or combo[1] in dead:
+                continue
+            if not int_cards:
+                combo = tuple(TexasPoker.ints_to_cards(combo))
+            combos.append((combo, weight))
+        return combos
+
+
+class RangeEquityResult:
+    """
+    按权重累计：每个组合对对手范围的赢、平权重和有效的对局权重
+    """
+    def __init__(self):
+        self.combo_wins = {}
+        self.combo_ties = {}
+        self.combo_totals = {}
+
+    def add(self, combo, weight, wins, ties, total):
+        if total <= 0:
+            return
+        self.combo_wins[combo] = self.combo_wins.get(combo, 0.0) + \
+            weight * wins
+        self.combo_ties[combo] = self.combo_ties.get(combo, 0.0) + \
+            weight * ties
+        self.combo_totals[combo] = self.combo_totals.get(combo, 0.0) + \
+            weight * total
+
+    def merge(self, other):
+        for combo, total in other.combo_totals.items():
+            self.combo_wins[combo] = self.combo_wins.get(combo, 0.0) + \
+                other.combo_wins[combo]
+            self.combo_ties[combo] = self.combo_ties.get(combo, 0.0) + \
+                other.combo_ties[combo]
+            self.combo_totals[combo] = self.combo_totals.get(combo, 0.0) + \
+                total
+        return self
+
+    @property
+    def equity(self):
+        """
+        range1对range2的胜率（平局算一半），range2的胜率为1 - equity
+        """
+        total = sum(self.combo_totals.values())
+        if not total:
+            return 0.0
+        return (sum(self.combo_wins.values()) +
+                sum(self.combo_ties.values()) / 2) / total
+
+    @property
+    def tie_rate(self):
+        total = sum(self.combo_totals.values())
+        return sum(self.combo_ties.values()) / total if total else 0.0
+
+    def combo_equities(self):
+        """
+        range1里每个组合的胜率
+        """
+        return {combo: (self.combo_wins[combo] +
+                        self.combo_ties[combo] / 2) / total
+                for combo, total in self.combo_totals.items()}
+
+
+class RangeEquityCalculator:
+    """
+    两个范围在给定公共牌上的胜率
+    公共牌有3张以上时精确枚举，否则随机发trials次
+    进程池按公共牌发法分块，每种发法的公共牌统计只做一次，所有组合共用
+    """
+    def __init__(self, processes=1, lut_path=None):
+        self._processes = processes
+        self._lut_path = lut_path
+
+    def equity(self, range1, range2, board=(), trials=20000, seed=None,
+               exact=None):
+        """
+        range1、range2: HandRange或者范围字符串
+        exact: 默认公共牌至少3张时精确枚举
+        """
+        if not isinstance(range1, HandRange):
+            range1 = HandRange(range1)
+        if not isinstance(range2, HandRange):
+            range2 = HandRange(range2)
+        board = HandRange._to_ints(board)
+        combos1, weights1 = self._split(range1.combos(board))
+        combos2, weights2 = self._split(range2.combos(board))
+        deck = [card for card in range(52) if card not in board]
+        if exact is None:
+            exact = len(board) >= 3
+        common = (combos1, weights1, combos2, weights2, board, deck)
+        tasks = []
+        chunk_count = max(1, self._processes * 4)
+        if exact:
+            runouts = list(itertools.combinations(deck, 5 - len(board)))
+            size = -(-len(runouts) // chunk_count)
+            for start in range(0, len(runouts), size):
+                tasks.append(common + (runouts[start:start + size], None, 0,
+                                       self._lut_path))
+        else:
+            rng = random.Random(seed)
+            size = -(-trials // chunk_count)
+            for start in range(0, trials, size):
+                tasks.append(common + (None, rng.getrandbits(64),
+                                       min(size, trials - start),
+                                       self._lut_path))
+        result = RangeEquityResult()
+        if self._processes > 1:
+            with multiprocessing.Pool(self._processes) as pool:
+                for task_result in pool.imap_unordered(_range_worker, tasks):
+                    result.merge(task_result)
+        else:
+            for task in tasks:
+                result.merge(_range_worker(task))
+        return result
+
+    @staticmethod
+    def _split(combos):
+        return [combo for combo, weight in combos], \
+            [weight for combo, weight in combos]
+
+
+if __name__ == '__main__':
+    import time
+
+    board = TexasPoker.cards_to_ints(
+        [['heart', '9'], ['heart', '8'], ['club', '2']])
+    start = time.perf_counter()
+    result = RangeEquityCalculator(processes=2).equity(
+        'QQ+, AKs, T9s-65s', '22+, ATs+, KQs, AJo+', board)
+    print('equity %.4f, %.2fs' % (result.equity,
+                                  time.perf_counter() - start))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: independent chip model tournament equity
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import random
+
+
+class ICMCalculator:
+    """
+    ICM（Malmuth-Harville）：剩下的人里拿第一的概率和筹码成正比，
+    拿走一个人后剩下的人再按同样的方法排下一名
+
+    精确计算按名次一层一层往下推：每一层是已经排好名次的玩家集合（位图），
+    同一个集合不管排出来的顺序只算一次，所以是O(2^n * n)而不是O(n!)，
+    只有拿钱的名次需要展开。集合太多时改用蒙特卡洛：
+    按筹码为速率的指数分布随机数排序，和上面的模型是同一个分布。
+
+        calculator = ICMCalculator([50, 30, 20])
+        calculator.equities([5000, 3000, 2000, 1000])
+    """
+    def __init__(self, payouts, max_states=200000, trials=20000, seed=None):
+        """
+        payouts: 第1名、第2名……的奖金
+        max_states: 精确计算最多展开多少个集合，超过就用蒙特卡洛
+        """
+        self.payouts = list(payouts)
+        self.max_states = max_states
+        self.trials = trials
+        self._rng = random.Random(seed)
+
+    def _state_count(self, players, places):
+        """
+        精确计算要展开的集合数：大小为0到places-1的子集个数
+        """
+        count = 0
+        subsets = 1
+        for size in range(min(places, players)):
+            count += subsets
+            subsets = subsets * (players - size) // (size + 1)
+        return count
+
+    def equities(self, stacks):
+        """
+        每个玩家的奖金期望，筹码为0的玩家已经出局，期望为0
+        """
+        live = [i for i, stack in enumerate(stacks) if stack > 0]
+        places = min(len(self.payouts), len(live))
+        if self._state_count(len(live), places) <= self.max_states:
+            return self.exact(stacks)
+        return self.monte_carlo(stacks)
+
+    def exact(self, stacks):
+        live = [i for i, stack in enumerate(stacks) if stack > 0]
+        live_stacks = [stacks[i] for i in live]
+        total = sum(live_stacks)
+        equities = [0.0] * len(stacks)
+        # 已经排好名次的玩家集合 -> (概率, 这些玩家的筹码和)
+        layer = {0: (1.0, 0)}
+        for place in range(min(len(self.payouts), len(live))):
+            payout = self.payouts[place]
+            next_layer = {}
+            for mask, (probability, placed) in layer.items():
+                remaining = total - placed
+                for player, stack in enumerate(live_stacks):
+                    bit = 1 << player
+                    if mask & bit:
+                        continue
+                    p = probability * stack / remaining
+                    equities[live[player]] += p * payout
+                    next_mask = mask | bit
+                    entry = next_layer.get(next_mask)
+                    if entry is None:
+                        next_layer[next_mask] = (p, placed + stack)
+                    else:
+                        next_layer[next_mask] = (entry[0] + p, entry[1])
+            layer = next_layer
+        return equities
+
+    def monte_carlo(self, stacks, trials=None):
+        """
+        随机排trials次名次估算奖金期望
+        """
+        trials = trials or self.trials
+        live = [i for i, stack in enumerate(stacks) if stack > 0]
+        places = min(len(self.payouts), len(live))
+        expovariate = self._rng.expovariate
+        totals = [0.0] * len(stacks)
+        for i in range(trials):
+            order = sorted(live, key=lambda player: expovariate(
+                stacks[player]))
+            for place in range(places):
+                totals[order[place]] += self.payouts[place]
+        return [total / trials for total in totals]
+
+    def table_equities(self, stacks_by_seat):
+        """
+        stacks_by_seat: {player_id: 筹码}，返回{player_id: 奖金期望}
+        """
+        player_ids = sorted(stacks_by_seat)
+        equities = self.equities([stacks_by_seat[player_id]
+                                  for player_id in player_ids])
+        return dict(zip(player_ids, equities))
+
+
+if __name__ == '__main__':
+    import time
+
+    calculator = ICMCalculator([50, 30, 20, 10, 8, 6, 5, 4, 3, 2])
+    stacks = [3000, 2500, 2000, 1800, 1500, 1200, 1000, 800, 500, 200]
+    start = time.perf_counter()
+    equities = calculator.exact(stacks)
+    print('exact %.3fs' % (time.perf_counter() - start))
+    start = time.perf_counter()
+    approximate = calculator.monte_carlo(stacks)
+    print('monte carlo %.3fs' % (time.perf_counter() - start))
+    for stack, equity, estimate in zip(stacks, equities, approximate):
+        print('%6d %8.3f %8.3f' % (stack, equity, estimate))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: opt-in call counters and timers for evaluation hot paths
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import functools
+import time
+
+from pokerdeck import Poker
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+class Profiler:
+    """
+    统计各个阶段的调用次数和累计耗时（包含内部调用的耗时）
+
+    enable()时把要统计的方法换成计数的包装，disable()时换回原来的方法，
+    所以不开启时没有任何额外开销。同一时间只能开启一个Profiler，
+    否则先关掉的那个的包装会留在别人的包装里面。
+
+        profiler = Profiler()
+        with profiler:
+            ...
+        print(profiler.snapshot())
+    """
+    STAGES = {
+        Poker: ['pop_card'],
+        TexasPoker: [
+            'merge_cards', 'order_by_suit', '_get_weights_list',
+            '_statistic_weights',
+            'is_royal_flush', 'is_straight_flush', 'is_four_of_a_kind',
+            'is_fullhouse', 'is_flush', 'is_straight', 'is_three_of_a_kind',
+            'is_two_paires', 'is_one_pair',
+            'straight_flush_compare', '_four_of_a_kind_compare',
+            '_fullhouse_compare', '_flush_compare', '_straight_compare',
+            'rank_key', 'rank_key_ints', '_rank_key_from_counts',
+            'get_rank_key', 'get_rank_keys_by_board', 'get_card_type',
+            'compare_hole_cards', 'current_rank_key',
+        ],
+        TexasTable: ['shuffle', 'deal', 'deal_board', 'get_rank_keys',
+                     'get_current_rank_keys', 'players_rank'],
+    }
+    # 汇总计数：名称 -> 对应的阶段
+    COUNTERS = {
+        'hands_dealt': 'TexasTable.deal',
+        'showdowns': 'TexasTable.get_rank_keys',
+    }
+    _active = None      # 正在开启的Profiler
+
+    def __init__(self, stages=None):
+        self._stages = stages if stages is not None else self.STAGES
+        self._calls = {}
+        self._seconds = {}
+        self._patched = []      # (类, 方法名, 原来的属性, 包装)
+
+    @property
+    def enabled(self):
+        return bool(self._patched)
+
+    def _wrap(self, name, func):
+        calls = self._calls
+        seconds = self._seconds
+        calls.setdefault(name, 0)
+        seconds.setdefault(name, 0.0)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[name] += perf_counter() - start
+                calls[name] += 1
+        return wrapper
+
+    def enable(self):
+        if self.enabled:
+            return
+        if Profiler._active is not None:
+            raise RuntimeError('another Profiler is already enabled')
+        Profiler._active = self
+        for cls, method_names in self._stages.items():
+            for method_name in method_names:
+                attr = cls.__dict__[method_name]
+                name = '%s.%s' % (cls.__name__, method_name)
+                if isinstance(attr, classmethod):
+                    wrapped = classmethod(self._wrap(name, attr.__func__))
+                elif isinstance(attr, staticmethod):
+                    wrapped = staticmethod(self._wrap(name, attr.__func__))
+                else:
+                    wrapped = self._wrap(name, attr)
+                setattr(cls, method_name, wrapped)
+                self._patched.append((cls, method_name, attr, wrapped))
+
+    def disable(self):
+        while self._patched:
+            cls, method_name, attr, wrapped = self._patched.pop()
+            if cls.__dict__.get(method_name) is wrapped:  # 没被别人换掉才换回去
+                setattr(cls, method_name, attr)
+        if Profiler._active is self:
+            Profiler._active = None
+
+    def reset(self):
+        for name in self._calls:
+            self._calls[name] = 0
+            self._seconds[name] = 0.0
+
+    def snapshot(self):
+        """
+        返回{'stages': {阶段: {'calls': 次数, 'seconds': 累计秒数}},
+             'hands_dealt': 发牌手数, 'showdowns': 摊牌次数}
+        """
+        snapshot = {'stages': {
+            name: {'calls': self._calls[name],
+                   'seconds': self._seconds[name]}
+            for name in self._calls}}
+        for counter, stage in self.COUNTERS.items():
+            snapshot[counter] = self._calls.get(stage, 0)
+        return snapshot
+
+    @classmethod
+    def merge_snapshots(cls, snapshots):
+        """
+        合并多个进程的snapshot
+        """
+        merged = {'stages': {}}
+        for counter in cls.COUNTERS:
+            merged[counter] = 0
+        for snapshot in snapshots:
+            for name, stage in snapshot['stages'].items():
+                total = merged['stages'].setdefault(
+                    name, {'calls': 0, 'seconds': 0.0})
+                total['calls'] += stage['calls']
+                total['seconds'] += stage['seconds']
+            for counter in cls.COUNTERS:
+                merged[counter] += snapshot[counter]
+        return merged
+
+    @staticmethod
+    def format_snapshot(snapshot):
+        lines = ['%-36s %10s %12s %10s' % ('stage', 'calls', 'seconds',
+                                            'usec/call')]
+        stages = sorted(snapshot['stages'].items(),
+                        key=lambda item: -item[1]['seconds'])
+        for name, stage in stages:
+            if not stage['calls']:
+                continue
+            lines.append('%-36s %10d %12.4f %10.2f' % (
+                name, stage['calls'], stage['seconds'],
+                stage['seconds'] / stage['calls'] * 1e6))
+        return '\n'.join(lines)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.disable()
+
+
+if __name__ == '__main__':
+    profiler = Profiler()
+    table = TexasTable(player_count=6, seed=1)
+    with profiler:
+        for i in range(1000):
+            table.shuffle()
+            table.deal()
+            table.deal_board()
+            table.players_rank()
+    snapshot = profiler.snapshot()
+    print(Profiler.format_snapshot(snapshot))
+    print('hands dealt: %d, showdowns: %d' % (
+        snapshot['hands_dealt'], snapshot['showdowns']))
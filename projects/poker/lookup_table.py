@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: lookup table hand evaluator
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import itertools
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from texaspoker import TexasPoker
+
+
+class LookupEvaluator:
+    """
+    查表法判断7张牌的大小
+
+    每种点数对应一个hash值，任意7张牌（每个点数最多4张）的hash值之和互不相同，
+    非同花的牌直接用点数hash之和查表；同花的牌用该花色的点数位图查表。
+    表里存的是牌力等级（越大越好），class_keys把等级转换回TexasPoker的rank key。
+    表可以保存成文件，多个进程用mmap共享同一份只读数据。
+    """
+    MAGIC = b'TXPKLUT1'
+    HEADER = struct.Struct('<8sIIII')
+    RANK_HASH = (0, 1, 5, 22, 98, 453, 2031, 8698,
+                 22854, 83661, 262349, 636345, 1479181)
+    SUIT_HASH = (1, 8, 64, 512)    # 每种花色的张数占3位
+    NOFLUSH_SIZE = RANK_HASH[12] * 4 + RANK_HASH[11] * 3 + 1
+    FLUSH_SIZE = 1 << 13
+    FLUSH_SUIT_SIZE = 1 << 12
+    # 按整数编码预先算好每张牌的hash
+    CARD_RANK_HASH = tuple(value for value in RANK_HASH for suit in range(4))
+    CARD_SUIT_HASH = SUIT_HASH * 13
+    _shared = {}    # load_shared加载过的表，按文件路径缓存
+
+    def __init__(self, flush_suit, flush, noflush, class_keys, mm=None):
+        self._flush_suit = flush_suit
+        self._flush = flush
+        self._noflush = noflush
+        self._class_keys = class_keys
+        self._mmap = mm
+
+    @classmethod
+    def build(cls):
+        """
+        生成所有的表
+        """
+        flush_suit = array('b', [-1]) * cls.FLUSH_SUIT_SIZE
+        for suit_sum in range(cls.FLUSH_SUIT_SIZE):
+            for suit in range(4):
+                if suit_sum >> 3 * suit & 7 >= 5:
+                    flush_suit[suit_sum] = suit
+
+        flush_keys = {}
+        for mask in range(cls.FLUSH_SIZE):
+            if 5 <= bin(mask).count('1') <= 7:
+                counts = [0] + [mask >> i & 1 for i in range(13)]
+                flush_keys[mask] = TexasPoker._rank_key_from_counts(
+                    counts, [mask << 1])
+        noflush_keys = {}
+        for ranks in itertools.combinations_with_replacement(range(13), 7):
+            counts = [0] * 14
+            for rank in ranks:
+                counts[rank + 1] += 1
+            if max(counts) > 4:
+                continue
+            rank_sum = sum(cls.RANK_HASH[rank] for rank in ranks)
+            noflush_keys[rank_sum] = TexasPoker._rank_key_from_counts(
+                counts, [])
+
+        keys = sorted(set(flush_keys.values()) | set(noflush_keys.values()))
+        class_keys = array('I', [0] + keys)    # 0号等级不用
+        key_class = {key: i for i, key in enumerate(class_keys)}
+        flush = array('H', bytes(2 * cls.FLUSH_SIZE))
+        for mask, key in flush_keys.items():
+            flush[mask] = key_class[key]
+        noflush = array('H', bytes(2 * cls.NOFLUSH_SIZE))
+        for rank_sum, key in noflush_keys.items():
+            noflush[rank_sum] = key_class[key]
+        return cls(flush_suit, flush, noflush, class_keys)
+
+    def save(self, path):
+        """
+        保存成二进制文件，数据按小端序存放
+        """
+        sections = [array('b', self._flush_suit), array('H', self._flush),
+                    array('H', self._noflush), array('I', self._class_keys)]
+        if sys.byteorder != 'little':
+            for section in sections:
+                section.byteswap()
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, *map(len, sections)))
+            for section in sections:
+                f.write(section.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        用mmap只读加载表文件，多个进程共享同一份物理内存
+        """
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, *sizes = cls.HEADER.unpack_from(mm)
+        if magic != cls.MAGIC:
+            mm.close()
+            raise ValueError('not a lookup table file: %s' % path)
+        if sys.byteorder != 'little':
+            mm.close()
+            raise ValueError('mmap loading needs a little endian machine')
+        view = memoryview(mm)
+        offset = cls.HEADER.size
+        sections = []
+        for size, typecode in zip(sizes, 'bHHI'):
+            itemsize = array(typecode).itemsize
+            sections.append(
+                view[offset:offset + size * itemsize].cast(typecode))
+            offset += size * itemsize
+        return cls(*sections, mm=mm)
+
+    @classmethod
+    def load_shared(cls, path):
+        """
+        同一个进程里同一个文件只加载一次
+        """
+        if path not in cls._shared:
+            cls._shared[path] = cls.load(path)
+        return cls._shared[path]
+
+    @classmethod
+    def rank_key_func(cls, path=None):
+        """
+        返回计算7张整数牌rank key的函数，给了表文件就用查表法
+        """
+        if path is None:
+            return TexasPoker.rank_key_ints
+        return cls.load_shared(path).rank_key
+
+    @classmethod
+    def load_or_build(cls, path):
+        """
+        文件存在就加载，不存在就生成并保存后再加载
+        """
+        if not os.path.exists(path):
+            tmp_path = '%s.%d.tmp' % (path, os.getpid())
+            cls.build().save(tmp_path)
+            os.replace(tmp_path, path)
+        return cls.load(path)
+
+    def evaluate(self, cards):
+        """
+        给出7张整数编码的牌，返回牌力等级
+        """
+        card_rank_hash = self.CARD_RANK_HASH
+        card_suit_hash = self.CARD_SUIT_HASH
+        rank_sum = 0
+        suit_sum = 0
+        for card in cards:
+            rank_sum += card_rank_hash[card]
+            suit_sum += card_suit_hash[card]
+        suit = self._flush_suit[suit_sum]
+        if suit < 0:
+            return self._noflush[rank_sum]
+        mask = 0
+        for card in cards:
+            if card & 3 == suit:
+                mask |= 1 << (card >> 2)
+        return self._flush[mask]
+
+    def partial_state(self, cards):
+        """
+        部分牌的状态：点数hash之和、花色hash之和、每种花色的点数位图
+        两组不重复的牌的状态相加（位图按位或）就是合起来的状态
+        """
+        rank_sum = 0
+        suit_sum = 0
+        suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            rank_sum += self.CARD_RANK_HASH[card]
+            suit_sum += self.CARD_SUIT_HASH[card]
+            suit_masks[card & 3] |= 1 << (card >> 2)
+        return rank_sum, suit_sum, suit_masks
+
+    def evaluate_state(self, rank_sum, suit_sum, suit_masks1, suit_masks2):
+        """
+        两组牌的状态合起来正好7张时，返回牌力等级
+        """
+        suit = self._flush_suit[suit_sum]
+        if suit < 0:
+            return self._noflush[rank_sum]
+        return self._flush[suit_masks1[suit] | suit_masks2[suit]]
+
+    def class_to_rank_key(self, hand_class):
+        """
+        牌力等级转成TexasPoker的rank key
+        """
+        return self._class_keys[hand_class]
+
+    def rank_key(self, cards):
+        """
+        同TexasPoker.rank_key_ints，只支持7张牌
+        """
+        return self._class_keys[self.evaluate(cards)]
+
+    def get_rank_key(self, texaspoker, hole_cards):
+        """
+        根据texaspoker的公共牌计算底牌的rank key，公共牌没发完时用TexasPoker计算
+        """
+        cards = texaspoker.merge_cards(hole_cards)
+        if None in cards:
+            return texaspoker.get_rank_key(hole_cards)
+        if not texaspoker._int_cards:
+            cards = texaspoker.cards_to_ints(cards)
+        return self._class_keys[self.evaluate(cards)]
+
+    def get_card_type(self, texaspoker, hole_cards):
+        """
+        同TexasPoker.get_card_type
+        """
+        return texaspoker.get_card_type_by_key(
+            self.get_rank_key(texaspoker, hole_cards))
+
+    def compare_hole_cards(self, texaspoker, cards1, cards2):
+        """
+        同TexasPoker.compare_hole_cards
+        """
+        return texaspoker._compare_two_weight(
+            self.get_rank_key(texaspoker, cards1),
+            self.get_rank_key(texaspoker, cards2))
+
+    def close(self):
+        """
+        释放mmap
+        """
+        if self._mmap is not None:
+            self._flush_suit.release()
+            self._flush.release()
+            self._noflush.release()
+            self._class_keys.release()
+            self._mmap.close()
+            self._mmap = None
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'texaspoker.lut'
+    evaluator = LookupEvaluator.load_or_build(path)
+    tp = TexasPoker(int_cards=True)
+    hole_cards = tp.pop_hole_cards()
+    tp.pop_flop()
+    tp.pop_turn()
+    tp.pop_rever()
+    print(tp.ints_to_cards(tp.merge_cards(hole_cards)))
+    print(evaluator.get_card_type(tp, hole_cards))
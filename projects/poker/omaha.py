@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: omaha poker class, four hole cards
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import itertools
+
+from exceptions import VariantError
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+class OmahaPoker(TexasPoker):
+    """
+    奥马哈：每人4张底牌，必须正好用2张底牌和3张公共牌组成5张牌
+
+    5张牌的牌力预先做成两张表（第一次用时生成）：
+        不成同花的按点数编码（5进制，每个点数最多4张）查表
+        同花的按点数位图查表
+    摊牌时公共牌的3张组合只算一次，所有玩家共用。
+    rank key和TexasPoker的一样，可以直接比较大小。
+    发牌和公共牌都用TexasPoker的，只换底牌张数和判断牌力的方法。
+    把底牌和公共牌合在一起判断的德州扑克方法（HOLDEM_ONLY）会抛VariantError。
+    """
+    HOLE_CARD_COUNT = 4
+    HOLDEM_ONLY = (
+        'merge_cards', 'order_by_suit', 'current_state',
+        'is_royal_flush', 'is_straight_flush', 'straight_flush_compare',
+        'is_four_of_a_kind', 'is_four_of_a_kind_weight', 'is_fullhouse',
+        'is_fullhouse_weights', 'is_flush', 'is_flush_weight', 'is_straight',
+        'is_straight_weight', 'is_three_of_a_kind', 'is_two_paires',
+        'is_one_pair')
+    RANK_VALUE = [5 ** weight for weight in range(14)]
+    _noflush = None     # 点数编码 -> rank key
+    _flush = None       # 同花的点数位图 -> rank key
+
+    def pop_hole_cards(self):
+        return [self.pop_card() for i in range(self.HOLE_CARD_COUNT)]
+
+    @classmethod
+    def _build_tables(cls):
+        noflush = {}
+        flush = {}
+        for ranks in itertools.combinations_with_replacement(range(13), 5):
+            if max(ranks.count(rank) for rank in ranks) > 4:
+                continue
+            cards = []
+            for rank in ranks:  # 花色轮流用，同一点数不会重复，5张也不会同花
+                cards.append(rank * 4 + sum(1 for card in cards
+                                            if card >> 2 == rank))
+            if len(set(card & 3 for card in cards)) == 1:
+                cards[0] ^= 1
+            key = sum(cls.RANK_VALUE[rank + 1] for rank in ranks)
+            noflush[key] = TexasPoker.rank_key_ints(cards)
+        for ranks in itertools.combinations(range(13), 5):
+            mask = 0
+            for rank in ranks:
+                mask |= 1 << (rank + 1)
+            flush[mask] = TexasPoker.rank_key_ints([rank * 4
+                                                    for rank in ranks])
+        OmahaPoker._noflush = noflush
+        OmahaPoker._flush = flush
+
+    @classmethod
+    def _partial(cls, cards):
+        """
+        几张牌的(点数编码之和, 同一花色时的花色否则-1, 点数位图)
+        """
+        rank_sum = 0
+        suits = set()
+        mask = 0
+        for card in cards:
+            if not isinstance(card, int):
+                card = cls.card_to_int(card)
+            weight = (card >> 2) + 1
+            rank_sum += cls.RANK_VALUE[weight]
+            suits.add(card & 3)
+            mask |= 1 << weight
+        return rank_sum, suits.pop() if len(suits) == 1 else -1, mask
+
+    @classmethod
+    def board_combos(cls, board):
+        """
+        公共牌里所有3张的组合，预先算好每个组合的点数编码、花色和位图
+        公共牌不到3张时抛ValueError
+        """
+        if len(board) < 3:
+            raise ValueError('omaha needs at least 3 board cards, got %d' %
+                             len(board))
+        return [cls._partial(combo)
+                for combo in itertools.combinations(board, 3)]
+
+    @classmethod
+    def rank_key_by_combos(cls, hole_cards, board_combos):
+        """
+        底牌的6种2张组合和公共牌的3张组合两两配对，返回最大的rank key
+        """
+        if cls._noflush is None:
+            cls._build_tables()
+        noflush = cls._noflush
+        flush = cls._flush
+        best = 0
+        for pair in itertools.combinations(hole_cards, 2):
+            pair_sum, pair_suit, pair_mask = cls._partial(pair)
+            for board_sum, board_suit, board_mask in board_combos:
+                if pair_suit >= 0 and pair_suit == board_suit:
+                    key = flush[pair_mask | board_mask]
+                else:
+                    key = noflush[pair_sum + board_sum]
+                if key > best:
+                    best = key
+        return best
+
+    @classmethod
+    def omaha_rank_key(cls, hole_cards, board):
+        """
+        4张底牌和3~5张公共牌，两种编码都可以
+        """
+        return cls.rank_key_by_combos(hole_cards, cls.board_combos(board))
+
+    @classmethod
+    def rank_key(cls, cards):
+        """
+        和TexasPoker.rank_key参数一样：前4张是底牌，后面是公共牌（None为还没发）
+        """
+        return cls.omaha_rank_key(
+            cards[:cls.HOLE_CARD_COUNT],
+            [card for card in cards[cls.HOLE_CARD_COUNT:] if card is not None])
+
+    @classmethod
+    def rank_key_ints(cls, cards):
+        return cls.rank_key(cards)
+
+    @classmethod
+    def get_rank_keys(cls, cards):
+        """
+        批量计算，cards为(N, 7~9)的整数编码数组，每行前4张是底牌，需要numpy
+        """
+        import numpy as np
+
+        return np.array([cls.rank_key(row)
+                         for row in np.asarray(cards).tolist()],
+                        dtype=np.int32)
+
+    @classmethod
+    def get_card_types(cls, cards):
+        categories = cls.get_rank_keys(cards) >> cls.CATEGORY_SHIFT
+        return [cls.CARD_TYPE[cls.ROYAL_FLUSH - category]
+                for category in categories.tolist()]
+
+    def get_rank_keys_by_board(self, hole_cards_list):
+        """
+        公共牌的3张组合只算一次，返回每组底牌的rank key
+        """
+        board_combos = self.board_combos(self.get_board())
+        return [self.rank_key_by_combos(hole_cards, board_combos)
+                for hole_cards in hole_cards_list]
+
+    def get_rank_key(self, hole_cards):
+        return self.omaha_rank_key(hole_cards, self.get_board())
+
+    def current_rank_key(self, hole_cards):
+        """
+        目前已发出的公共牌能组成的最大rank key，翻牌前调用抛ValueError
+        """
+        return self.get_rank_key(hole_cards)
+
+    def get_card_type(self, hole_cards):
+        return TexasPoker.get_card_type_by_key(self.get_rank_key(hole_cards))
+
+    def compare_hole_cards(self, cards1, cards2):
+        """
+        比较两组手牌
+        return:
+            cards1 > cards2:    1
+            cards1 == cards2:   0
+            cards1 < cards2:    -1
+        """
+        key1, key2 = self.get_rank_keys_by_board([cards1, cards2])
+        return (key1 > key2) - (key1 < key2)
+
+
+def _holdem_only(name):
+    def method(self, *args, **kwargs):
+        raise VariantError("%s is hold'em only, not supported by %s" %
+                           (name, type(self).__name__))
+    method.__name__ = name
+    return method
+
+
+for _name in OmahaPoker.HOLDEM_ONLY:
+    setattr(OmahaPoker, _name, _holdem_only(_name))
+
+
+class OmahaTable(TexasTable):
+    """
+    奥马哈的牌桌，发牌、摊牌和TexasTable一样
+    """
+    POKER_CLASS = OmahaPoker
+
+
+if __name__ == '__main__':
+    table = OmahaTable(player_count=6, seed=1)
+    table.deal()
+    print(table.deal_board())
+    for player_id in range(1, 7):
+        print(player_id, table.get_hole_card(player_id))
+    print(table.players_rank())
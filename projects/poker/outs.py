@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: outs and draw analyzer for the flop and turn
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import collections
+
+from texaspoker import HandState
+from texaspoker import TexasPoker
+
+
+# 发出card后的结果
+# improves: 牌型变大，而且比只用公共牌的牌型大（比如公共牌成对不算）
+# wins/ties: 有对手时，发出这张牌后单独最大/并列最大
+CardOutcome = collections.namedtuple(
+    'CardOutcome', ['card', 'rank_key', 'card_type', 'improves', 'wins',
+                    'ties'])
+
+
+class OutsReport:
+    """
+    一组底牌在当前公共牌下的补牌分析结果
+    """
+    def __init__(self, rank_key, outcomes, cards_to_come, winning):
+        self.rank_key = rank_key
+        self.card_type = TexasPoker.get_card_type_by_key(rank_key)
+        self.outcomes = outcomes            # 每张剩下的牌的CardOutcome
+        self.cards_to_come = cards_to_come  # 翻牌时为2，转牌时为1
+        self.winning = winning              # 现在是否单独领先，没有对手时为None
+
+    @property
+    def outs(self):
+        """
+        补到后牌型变大，或者从落后/平手变成单独领先的牌
+        """
+        return [outcome.card for outcome in self.outcomes
+                if outcome.improves or
+                (outcome.wins and self.winning is False)]
+
+    @property
+    def improving_cards(self):
+        return [outcome.card for outcome in self.outcomes if outcome.improves]
+
+    @property
+    def winning_cards(self):
+        return [outcome.card for outcome in self.outcomes if outcome.wins]
+
+    def _odds(self, count):
+        """
+        剩下的牌里至少发到一张的概率（翻牌时算转牌和河牌两张）
+        """
+        total = len(self.outcomes)
+        if not total:
+            return 0.0
+        miss = (total - count) / total
+        if self.cards_to_come == 2:
+            miss *= (total - count - 1) / (total - 1)
+        return 1 - max(miss, 0.0)
+
+    @property
+    def next_card_odds(self):
+        """
+        下一张牌就是out的概率
+        """
+        return len(self.outs) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def improve_odds(self):
+        """
+        到河牌为止至少发到一张out的概率
+        不算两张都不是out但合起来才成牌的情况（runner-runner）
+        """
+        return self._odds(len(self.outs))
+
+
+class OutsAnalyzer:
+    """
+    在texaspoker当前的公共牌（翻牌或转牌）上，逐张试发剩下的牌
+    每张牌只在HandState上加一张再拿掉，不用把7张牌重新判断一遍
+    """
+    def __init__(self, texaspoker):
+        self._texaspoker = texaspoker
+
+    def _board(self):
+        tp = self._texaspoker
+        return [card for card in tp._flops + [tp._turn, tp._rever]
+                if card is not None]
+
+    def analyze(self, hole_cards, opponents=()):
+        """
+        hole_cards: 要分析的底牌
+        opponents: 对手的底牌列表，给了才判断能否赢
+        """
+        tp = self._texaspoker
+        board = self._board()
+        if len(board) not in (3, 4):
+            raise ValueError('outs need a flop or a turn, got %d board cards'
+                             % len(board))
+        board_state = HandState(board)
+        state = board_state.copy()
+        for card in hole_cards:
+            state.add(card)
+        opponent_states = []
+        for opponent in opponents:
+            opponent_state = board_state.copy()
+            for card in opponent:
+                opponent_state.add(card)
+            opponent_states.append(opponent_state)
+
+        rank_key = state.rank_key()
+        category = rank_key >> TexasPoker.CATEGORY_SHIFT
+        winning = None
+        if opponent_states:
+            winning = rank_key > max(opponent_state.rank_key()
+                                     for opponent_state in opponent_states)
+
+        dead = set(map(self._card_id, board + list(hole_cards)))
+        for opponent in opponents:
+            dead.update(map(self._card_id, opponent))
+        outcomes = []
+        for card in tp.cards:
+            if self._card_id(card) in dead:
+                continue
+            state.add(card)
+            key = state.rank_key()
+            state.remove(card)
+            new_category = key >> TexasPoker.CATEGORY_SHIFT
+            improves = False
+            if new_category > category:
+                board_state.add(card)
+                improves = new_category > (board_state.rank_key() >>
+                                           TexasPoker.CATEGORY_SHIFT)
+                board_state.remove(card)
+            wins = ties = False
+            if opponent_states:
+                best = 0
+                for opponent_state in opponent_states:
+                    opponent_state.add(card)
+                    best = max(best, opponent_state.rank_key())
+                    opponent_state.remove(card)
+                wins = key > best
+                ties = key == best
+            outcomes.append(CardOutcome(
+                card, key, TexasPoker.get_card_type_by_key(key), improves,
+                wins, ties))
+        return OutsReport(rank_key, outcomes, 5 - len(board), winning)
+
+    @staticmethod
+    def _card_id(card):
+        if isinstance(card, int):
+            return card
+        return TexasPoker.card_to_int(card)
+
+
+if __name__ == '__main__':
+    tp = TexasPoker()
+    tp._flops = [['heart', '9'], ['heart', '8'], ['club', '2']]
+    hole_cards = [['heart', 'A'], ['heart', 'K']]
+    opponent = [['spade', '9'], ['diamond', '9']]
+    report = OutsAnalyzer(tp).analyze(hole_cards, [opponent])
+    print(report.card_type, len(report.outs), report.outs)
+    print('next card %.3f, by river %.3f' % (report.next_card_odds,
+                                              report.improve_odds))
@@ -17,22 +17,106 @@ class Poker:
         '9': 8, '10': 9, 'J': 10, 'Q': 11, 'K': 12, 'A': 13
     }
 
-    def __init__(self):
-        self.cards = []
-        for suit in self.SUITS:
-            for point in self.POINTS:
-                card = [suit, point]    # a card
-                self.cards.append(card)
+    # 整数编码：card = 点数序号 * 4 + 花色序号，取值0~51
+    # 点数权重为(card >> 2) + 1，花色为SUITS[card & 3]
+    SUIT_INDEX = {'club': 0, 'diamond': 1, 'heart': 2, 'spade': 3}
+
+    def __init__(self, int_cards=False, rng=None):
+        """
+        rng: random.Random或者numpy的Generator，不给就用random模块的全局状态
+        """
+        self._int_cards = int_cards
+        self.set_rng(rng if rng is not None else random)
+        if int_cards:
+            self._full_deck = list(range(52))
+        else:
+            self._full_deck = []
+            for suit in self.SUITS:
+                for point in self.POINTS:
+                    card = [suit, point]    # a card
+                    self._full_deck.append(card)
+        self.cards = list(self._full_deck)
+        self._shuffled = False
+
+    def set_rng(self, rng):
+        """
+        换一个随机数发生器，pop_card用的_randbelow跟着换
+        """
+        self._rng = rng
+        if hasattr(rng, 'integers'):      # numpy Generator
+            self._randbelow = lambda n: int(rng.integers(n))
+        else:
+            self._randbelow = rng.randrange
+
+    def reset(self):
+        """
+        把所有的牌放回来，重用原来的列表
+        """
+        self.cards[:] = self._full_deck
+        self._shuffled = False
+
+    def shuffle(self):
+        """
+        放回所有的牌后原地Fisher-Yates洗牌，之后发牌直接从尾部取
+        """
+        self.reset()
+        self._rng.shuffle(self.cards)
+        self._shuffled = True
 
     def pop_card(self):
         """
         发一张牌
         """
-        if len(self.cards) == 0:
+        cards = self.cards
+        if len(cards) == 0:
             raise PokerCardRunOutException('card run out')
-        index = random.randint(0, len(self.cards)-1)
-        card = self.cards.pop(index)
-        return card
+        if self._shuffled:
+            return cards.pop()
+        # 没洗过牌就随机抽一张换到尾部再取，相当于做一步Fisher-Yates
+        index = self._randbelow(len(cards))
+        cards[index], cards[-1] = cards[-1], cards[index]
+        return cards.pop()
+
+    @classmethod
+    def card_to_int(cls, card):
+        """
+        [suit, point]形式的牌转成整数编码
+        """
+        return (cls.POINT_WEIGHT[card[1]] - 1) << 2 | cls.SUIT_INDEX[card[0]]
+
+    @classmethod
+    def int_to_card(cls, card):
+        """
+        整数编码的牌转成[suit, point]形式
+        """
+        return [cls.SUITS[card & 3], cls.POINTS[card >> 2]]
+
+    @classmethod
+    def cards_to_ints(cls, cards):
+        return [cls.card_to_int(card) for card in cards]
+
+    @classmethod
+    def ints_to_cards(cls, cards):
+        return [cls.int_to_card(card) for card in cards]
+
+    @staticmethod
+    def cards_to_mask(cards):
+        """
+        整数编码的牌列表转成52位的位图
+        """
+        mask = 0
+        for card in cards:
+            mask |= 1 << card
+        return mask
+
+    @classmethod
+    def card_weight(cls, card):
+        """
+        牌的点数权重，两种编码都可以
+        """
+        if isinstance(card, int):
+            return (card >> 2) + 1
+        return cls.POINT_WEIGHT[card[1]]
 
     @classmethod
     def get_largest_card(cls, cards):
@@ -42,8 +126,9 @@ class Poker:
         weight_tmp = 0
         card_tmp = None
         for card in cards:
-            if cls.POINT_WEIGHT[card[1]] > weight_tmp:
-                weight_tmp = cls.POINT_WEIGHT[card[1]]
+            weight = cls.card_weight(card)
+            if weight > weight_tmp:
+                weight_tmp = weight
                 card_tmp = card
         return card_tmp
 
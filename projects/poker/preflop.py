@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: precomputed preflop equity for the 169 starting hand classes
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import multiprocessing
+import random
+import struct
+import sys
+from array import array
+
+from lookup_table import LookupEvaluator
+from pokerdeck import Poker
+
+
+def _class_combos():
+    """
+    每种起手牌对应的所有具体组合（整数编码）
+    """
+    combos = [[] for i in range(169)]
+    for card1 in range(52):
+        for card2 in range(card1 + 1, 52):
+            combos[PreflopTable.hand_class_ints(card1, card2)].append(
+                (card1, card2))
+    return combos
+
+
+def _generate_row(args):
+    """
+    计算一种起手牌对其他每种起手牌的胜率（只算j >= i的部分），以及对多个随机对手的胜率
+    """
+    hand_class, trials, max_players, seed, lut_path = args
+    rank_key = LookupEvaluator.rank_key_func(lut_path)
+    rng = random.Random(seed)
+    combos = _class_combos()
+    deck = list(range(52))
+
+    def remaining(dead):
+        return [card for card in deck if card not in dead]
+
+    row = [0.0] * 169
+    for other in range(hand_class, 169):
+        if other == hand_class:     # 同样的起手牌对称，胜率就是一半
+            row[other] = 0.5
+            continue
+        share = 0.0
+        done = 0
+        while done < trials:
+            hole1 = rng.choice(combos[hand_class])
+            hole2 = rng.choice(combos[other])
+            if hole1[0] in hole2 or hole1[1] in hole2:
+                continue
+            board = rng.sample(remaining(hole1 + hole2), 5)
+            key1 = rank_key(list(hole1) + board)
+            key2 = rank_key(list(hole2) + board)
+            share += 1.0 if key1 > key2 else 0.5 if key1 == key2 else 0.0
+            done += 1
+        row[other] = share / trials
+
+    multiway = [0.0] * (max_players - 1)
+    for players in range(2, max_players + 1):
+        share = 0.0
+        for i in range(trials):
+            hole = list(rng.choice(combos[hand_class]))
+            cards = rng.sample(remaining(hole), 2 * (players - 1) + 5)
+            board = cards[:5]
+            key = rank_key(hole + board)
+            keys = [rank_key(cards[5 + 2 * j:7 + 2 * j] + board)
+                    for j in range(players - 1)]
+            best = max(keys)
+            if key > best:
+                share += 1.0
+            elif key == best:
+                share += 1.0 / (keys.count(best) + 1)
+        multiway[players - 2] = share / trials
+    return hand_class, row, multiway
+
+
+class PreflopTable:
+    """
+    169种起手牌的翻牌前胜率表
+
+    起手牌编号为13x13格子的下标：对子在对角线上，同花为[大][小]，
+    不同花为[小][大]，点数序号和整数编码一样（0为2，12为A）。
+    胜率用uint16定点数保存（65535为100%）。
+    """
+    MAGIC = b'TXPKPF01'
+    HEADER = struct.Struct('<8sII')     # MAGIC、每个对局的模拟次数、最多人数
+    SCALE = 65535
+
+    def __init__(self, matrix, multiway, trials, max_players):
+        self._matrix = matrix           # 169 * 169
+        self._multiway = multiway       # 169 * (max_players - 1)
+        self.trials = trials
+        self.max_players = max_players
+
+    @staticmethod
+    def hand_class_ints(card1, card2):
+        rank1 = card1 >> 2
+        rank2 = card2 >> 2
+        high, low = max(rank1, rank2), min(rank1, rank2)
+        if (card1 & 3) == (card2 & 3):
+            return high * 13 + low
+        return low * 13 + high
+
+    @classmethod
+    def hand_class(cls, hole_cards):
+        """
+        底牌对应的起手牌编号，两种编码都可以
+        """
+        card1, card2 = hole_cards
+        if not isinstance(card1, int):
+            card1 = Poker.card_to_int(card1)
+            card2 = Poker.card_to_int(card2)
+        return cls.hand_class_ints(card1, card2)
+
+    @staticmethod
+    def class_name(hand_class):
+        """
+        起手牌名称，如'AA'、'AKs'、'T9o'
+        """
+        points = '23456789TJQKA'
+        row, column = divmod(hand_class, 13)
+        if row == column:
+            return points[row] * 2
+        if row > column:
+            return points[row] + points[column] + 's'
+        return points[column] + points[row] + 'o'
+
+    @classmethod
+    def generate(cls, trials=1000, max_players=10, processes=1, seed=None,
+                 lut_path=None):
+        """
+        用蒙特卡洛模拟生成整张表，每种起手牌一个任务
+        """
+        rng = random.Random(seed)
+        tasks = [(hand_class, trials, max_players, rng.getrandbits(64),
+                  lut_path) for hand_class in range(169)]
+        if processes > 1:
+            with multiprocessing.Pool(processes) as pool:
+                rows = pool.map(_generate_row, tasks)
+        else:
+            rows = map(_generate_row, tasks)
+        matrix = array('H', bytes(2 * 169 * 169))
+        multiway = array('H', bytes(2 * 169 * (max_players - 1)))
+        for hand_class, row, row_multiway in rows:
+            for other in range(hand_class, 169):
+                equity = round(row[other] * cls.SCALE)
+                matrix[hand_class * 169 + other] = equity
+                matrix[other * 169 + hand_class] = cls.SCALE - equity
+            for i, equity in enumerate(row_multiway):
+                multiway[hand_class * (max_players - 1) + i] = round(
+                    equity * cls.SCALE)
+        return cls(matrix, multiway, trials, max_players)
+
+    def save(self, path):
+        matrix = array('H', self._matrix)
+        multiway = array('H', self._multiway)
+        if sys.byteorder != 'little':
+            matrix.byteswap()
+            multiway.byteswap()
+        with open(path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.trials,
+                                     self.max_players))
+            f.write(matrix.tobytes())
+            f.write(multiway.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, trials, max_players = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError('not a preflop table file: %s' % path)
+        offset = cls.HEADER.size
+        matrix = array('H', data[offset:offset + 2 * 169 * 169])
+        offset += 2 * 169 * 169
+        multiway = array('H', data[offset:])
+        if sys.byteorder != 'little':
+            matrix.byteswap()
+            multiway.byteswap()
+        return cls(matrix, multiway, trials, max_players)
+
+    def class_equity(self, hand_class, players=2):
+        """
+        起手牌对players-1个随机对手的胜率
+        """
+        if not 2 <= players <= self.max_players:
+            raise ValueError('players must be in 2..%d' % self.max_players)
+        return self._multiway[hand_class * (self.max_players - 1) +
+                              players - 2] / self.SCALE
+
+    def class_matchup(self, hand_class1, hand_class2):
+        """
+        两种起手牌单挑时前者的胜率
+        """
+        return self._matrix[hand_class1 * 169 + hand_class2] / self.SCALE
+
+    def equity(self, hole_cards, players=2):
+        return self.class_equity(self.hand_class(hole_cards), players)
+
+    def matchup(self, hole_cards1, hole_cards2):
+        return self.class_matchup(self.hand_class(hole_cards1),
+                                  self.hand_class(hole_cards2))
+
+    def table_equities(self, table):
+        """
+        TexasTable里每个玩家按在座人数算的翻牌前胜率，按player_id顺序
+        """
+        players = len(table._player_hole_cards)
+        return [self.equity(table.get_hole_card(player_id), players)
+                for player_id in range(1, players + 1)]
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else 'preflop.eq'
+    trials = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    PreflopTable.generate(trials=trials,
+                          processes=multiprocessing.cpu_count()).save(path)
+    table = PreflopTable.load(path)
+    for name in ('AA', 'KK', 'AKs', 'AKo', '72o'):
+        hand_class = [i for i in range(169)
+                      if PreflopTable.class_name(i) == name][0]
+        print(name, table.class_equity(hand_class),
+              table.class_equity(hand_class, 6))
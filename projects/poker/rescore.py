@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: re-evaluate stored hand histories
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import collections
+import json
+import multiprocessing
+
+from hand_history import HandHistoryReader
+from lookup_table import LookupEvaluator
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+def _rescore_range(args):
+    """
+    重新计算第start到stop-1手牌的名次，返回(RescoreStats, 差异列表)
+    每个任务只带文件路径和范围，记录在子进程里从mmap直接读
+    """
+    path, start, stop, lut_path = args
+    evaluator = LookupEvaluator.load_shared(lut_path) if lut_path else None
+    stats = RescoreStats()
+    diffs = []
+    with HandHistoryReader(path) as reader:
+        for record in reader.iter_records(start, stop):
+            player_ids = sorted(sum(record.rank, []))
+            if not player_ids:
+                player_ids = list(range(1, len(record.hole_cards) + 1))
+            keys = []
+            for player_id in player_ids:
+                cards = record.hole_cards[player_id - 1] + record.board
+                if evaluator is not None and len(cards) == 7:
+                    keys.append(evaluator.rank_key(cards))
+                else:
+                    keys.append(TexasPoker.rank_key_ints(cards))
+            rank = TexasTable.group_rank_keys(zip(player_ids, keys))
+            stats.add(keys, changed=rank != record.rank)
+            if rank != record.rank:
+                diffs.append((record.hand_id, record.rank, rank))
+    return stats, diffs
+
+
+def _imap_bounded(pool, func, tasks, window):
+    """
+    和pool.imap一样按顺序返回结果，但最多只提交window个任务，
+    不会一次把整个任务生成器读进内存
+    """
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+class RescoreStats:
+    """
+    流式汇总：手数、名次变化的手数、每种牌型出现的次数
+    """
+    def __init__(self):
+        self.hands = 0
+        self.changed = 0
+        self.category_counts = [0] * len(TexasPoker.CARD_TYPE)
+
+    def add(self, keys, changed=False):
+        self.hands += 1
+        self.changed += changed
+        for key in keys:
+            self.category_counts[key >> TexasPoker.CATEGORY_SHIFT] += 1
+
+    def merge(self, other):
+        self.hands += other.hands
+        self.changed += other.changed
+        for i, count in enumerate(other.category_counts):
+            self.category_counts[i] += count
+        return self
+
+
+class Rescorer:
+    """
+    按块读取牌局记录，用当前的判断逻辑重新算名次，差异边算边输出
+    内存占用只和chunk_size、processes有关，和文件大小无关
+    """
+    def __init__(self, path, chunk_size=10000, processes=1, lut_path=None):
+        self._path = path
+        self._chunk_size = chunk_size
+        self._processes = processes
+        self._lut_path = lut_path
+
+    def _tasks(self):
+        with HandHistoryReader(self._path) as reader:
+            count = len(reader)
+        for start in range(0, count, self._chunk_size):
+            yield (self._path, start, start + self._chunk_size,
+                   self._lut_path)
+
+    def iter_chunks(self):
+        """
+        按顺序逐块返回(RescoreStats, 差异列表)
+        """
+        if self._processes <= 1:
+            for task in self._tasks():
+                yield _rescore_range(task)
+            return
+        with multiprocessing.Pool(self._processes) as pool:
+            yield from _imap_bounded(pool, _rescore_range, self._tasks(),
+                                     self._processes * 2)
+
+    def iter_diffs(self):
+        """
+        逐个返回(hand_id, 原来的名次, 新的名次)
+        """
+        for stats, diffs in self.iter_chunks():
+            yield from diffs
+
+    def rescore(self, diff_file=None):
+        """
+        跑完整个文件，差异按JSON行写到diff_file，返回汇总结果
+        """
+        total = RescoreStats()
+        for stats, diffs in self.iter_chunks():
+            total.merge(stats)
+            if diff_file is None:
+                continue
+            for hand_id, old_rank, new_rank in diffs:
+                diff_file.write(json.dumps({'hand_id': hand_id,
+                                            'old_rank': old_rank,
+                                            'new_rank': new_rank}) + '\n')
+        return total
+
+
+if __name__ == '__main__':
+    import sys
+
+    stats = Rescorer(sys.argv[1], processes=2).rescore(sys.stdout)
+    print('%d hands, %d changed' % (stats.hands, stats.changed))
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: multi table texas poker simulation
+author: haoranzeus@gmail.com (zhanghaoran)
+"""
+import multiprocessing
+import random
+import time
+
+from instrument import Profiler
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+def _simulate_tables(args):
+    """
+    在一个进程里跑一批桌子，每张桌子用自己的种子，返回SimulationStats
+    """
+    table_seeds, player_count, hands_per_table, profile, bulk = args
+    stats = SimulationStats(player_count)
+    if bulk:    # 每张桌子用自己的种子分块发牌，几张桌子的块凑起来一起判断
+        from batch_eval import BulkDealer
+        from batch_eval import BulkDeals
+
+        start = time.perf_counter()
+        chunk_size = BulkDealer.CHUNK_SIZE
+        dealer = BulkDealer(player_count)
+        pending = []
+        pending_hands = 0
+        for seed in table_seeds:
+            table_dealer = BulkDealer(player_count, seed=seed)
+            # 每张桌子固定按chunk_size切块，结果和怎么分任务无关
+            for done in range(0, hands_per_table, chunk_size):
+                size = min(chunk_size, hands_per_table - done)
+                if pending_hands + size > chunk_size:
+                    dealer.record(BulkDeals.concatenate(pending), stats)
+                    pending = []
+                    pending_hands = 0
+                pending.append(table_dealer.deal(size))
+                pending_hands += size
+        if pending:
+            dealer.record(BulkDeals.concatenate(pending), stats)
+        stats.elapsed = time.perf_counter() - start
+        return stats
+    profiler = Profiler()
+    if profile:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        for seed in table_seeds:
+            table = TexasTable(player_count=player_count, int_cards=True,
+                               seed=seed)
+            for i in range(hands_per_table):
+                table.shuffle()
+                table.deal()
+                table.deal_board()
+                stats.add_hand(table.get_rank_keys())
+    finally:
+        profiler.disable()
+    stats.elapsed = time.perf_counter() - start
+    if profile:
+        stats.profile = profiler.snapshot()
+    return stats
+
+
+class SimulationStats:
+    """
+    流式统计：只累计计数，不保存每一手牌
+    """
+    def __init__(self, player_count):
+        self.hands = 0
+        self.elapsed = 0.0      # 各个进程计算时间之和
+        self.wall_time = 0.0
+        self.category_counts = [0] * len(TexasPoker.CARD_TYPE)
+        self.seat_wins = [0] * player_count
+        self.seat_ties = [0] * player_count
+        self.seat_shares = [0.0] * player_count
+        self.profile = None     # 开启profile时为Profiler.snapshot()的结果
+
+    def add_hand(self, keys):
+        """
+        记一手牌，keys为每个座位的rank key
+        """
+        self.hands += 1
+        for key in keys:
+            self.category_counts[key >> TexasPoker.CATEGORY_SHIFT] += 1
+        best = max(keys)
+        winners = [seat for seat, key in enumerate(keys) if key == best]
+        if len(winners) == 1:
+            self.seat_wins[winners[0]] += 1
+            self.seat_shares[winners[0]] += 1
+            return
+        for seat in winners:
+            self.seat_ties[seat] += 1
+            self.seat_shares[seat] += 1.0 / len(winners)
+
+    def merge(self, other):
+        self.hands += other.hands
+        self.elapsed += other.elapsed
+        for i, count in enumerate(other.category_counts):
+            self.category_counts[i] += count
+        for seat in range(len(self.seat_wins)):
+            self.seat_wins[seat] += other.seat_wins[seat]
+            self.seat_ties[seat] += other.seat_ties[seat]
+            self.seat_shares[seat] += other.seat_shares[seat]
+        if other.profile is not None:
+            self.profile = Profiler.merge_snapshots(
+                [other.profile] + ([self.profile] if self.profile else []))
+        return self
+
+    @property
+    def category_frequencies(self):
+        """
+        每种牌型出现的频率（按所有座位的牌计算），键为牌型名称
+        """
+        total = sum(self.category_counts) or 1
+        return {TexasPoker.get_card_type_by_key(
+                    category << TexasPoker.CATEGORY_SHIFT): count / total
+                for category, count in enumerate(self.category_counts)}
+
+    @property
+    def seat_win_rates(self):
+        return [share / (self.hands or 1) for share in self.seat_shares]
+
+    @property
+    def hands_per_second(self):
+        return self.hands / self.wall_time if self.wall_time else 0.0
+
+
+class Simulator:
+    """
+    同时模拟很多张TexasTable，桌子分块后交给进程池，结果边算边合并
+    """
+    def __init__(self, table_count=1000, player_count=2, hands_per_table=100,
+                 processes=1, seed=None, tables_per_task=None,
+                 profile=False, bulk=False):
+        """
+        bulk: 用BulkDealer一次发一整块牌（需要numpy），不经过TexasTable，
+              不能和profile一起用。每张桌子还是用自己的种子，
+              结果和tables_per_task无关
+        """
+        if bulk and profile:
+            raise ValueError('bulk cannot be combined with profile')
+        self._table_count = table_count
+        self._player_count = player_count
+        self._hands_per_table = hands_per_table
+        self._processes = processes
+        self._seed = seed
+        self._profile = profile
+        self._bulk = bulk
+        if tables_per_task is None:     # 每个进程大约分到4块，便于负载均衡
+            tables_per_task = max(1, -(-table_count // (processes * 4)))
+        self._tables_per_task = tables_per_task
+
+    def _tasks(self):
+        rng = random.Random(self._seed)
+        seeds = [rng.getrandbits(64) for i in range(self._table_count)]
+        for start in range(0, self._table_count, self._tables_per_task):
+            yield (seeds[start:start + self._tables_per_task],
+                   self._player_count, self._hands_per_table,
+                   self._profile, self._bulk)
+
+    def run(self):
+        stats = SimulationStats(self._player_count)
+        start = time.perf_counter()
+        if self._processes > 1:
+            with multiprocessing.Pool(self._processes) as pool:
+                for task_stats in pool.imap_unordered(_simulate_tables,
+                                                      self._tasks()):
+                    stats.merge(task_stats)
+        else:
+            for task in self._tasks():
+                stats.merge(_simulate_tables(task))
+        stats.wall_time = time.perf_counter() - start
+        return stats
+
+
+if __name__ == '__main__':
+    simulator = Simulator(table_count=100, player_count=6,
+                          hands_per_table=100, processes=2, seed=1)
+    stats = simulator.run()
+    print('%d hands, %.0f hands/s' % (stats.hands, stats.hands_per_second))
+    for card_type, frequency in stats.category_frequencies.items():
+        print('%-16s %.4f' % (card_type, frequency))
+    print(stats.seat_win_rates)
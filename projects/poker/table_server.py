@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# coding=utf-8
+"""
+synopsis: asyncio texas poker table server
+author: haoranzeus@gmail.com (zhanghaoran)
+
+协议是每行一个JSON对象。
+客户端发送：
+    {"action": "join", "table": 3}      加入3号桌，不给table就找一张有空位的桌子
+    {"action": "check"}                 轮到自己时继续
+    {"action": "fold"}                  轮到自己时弃牌
+只有check和fold两种行动（不下注），其他行动回一个error，继续等。
+桌号只能是整数或者不超过32个字符的字符串，桌子数有上限max_tables。
+服务端发送的消息都带"event"字段：joined, hole_cards, board, action_request,
+hand_over, error
+"""
+import asyncio
+import concurrent.futures
+import json
+import sys
+
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+def _rank_players(board, player_hole_cards):
+    """
+    在执行器里算摊牌结果，player_hole_cards为{player_id: 底牌}
+    """
+    tp = TexasPoker()
+    tp._flops = board[:3]
+    tp._turn = board[3]
+    tp._rever = board[4]
+    player_ids = list(player_hole_cards)
+    keys = tp.get_rank_keys_by_board(
+        [player_hole_cards[player_id] for player_id in player_ids])
+    return TexasTable.group_rank_keys(zip(player_ids, keys))
+
+
+class PlayerSession:
+    """
+    一个客户端连接
+    """
+    def __init__(self, writer):
+        self._writer = writer
+        self.actions = asyncio.Queue()
+        self.table = None
+        self.player_id = None
+
+    async def send(self, message):
+        if self._writer.is_closing():
+            return
+        self._writer.write(json.dumps(message).encode() + b'\n')
+        try:
+            await self._writer.drain()
+        except ConnectionError:
+            pass
+
+
+class TableGame:
+    """
+    一张桌子一个协程：坐满就开始发牌，轮流等玩家行动，摊牌交给执行器
+    """
+    STREETS = ('preflop', 'flop', 'turn', 'rever')
+    ACTIONS = ('check', 'fold')
+
+    def __init__(self, table_id, player_count, executor, action_timeout):
+        self.table_id = table_id
+        self._player_count = player_count
+        self._executor = executor
+        self._action_timeout = action_timeout
+        self._table = TexasTable(player_count=player_count)
+        self._seats = {}    # player_id -> PlayerSession
+        self._full = asyncio.Event()
+        self.hands_played = 0
+
+    @property
+    def is_full(self):
+        return len(self._seats) >= self._player_count
+
+    def join(self, session):
+        """
+        坐到第一个空位上，返回player_id
+        """
+        for player_id in range(1, self._player_count + 1):
+            if player_id not in self._seats:
+                break
+        self._seats[player_id] = session
+        session.table = self
+        session.player_id = player_id
+        if self.is_full:
+            self._full.set()
+        return player_id
+
+    def leave(self, session):
+        if self._seats.get(session.player_id) is session:
+            del self._seats[session.player_id]
+            self._full.clear()
+        session.actions.put_nowait({'action': 'fold'})  # 手上的牌按弃牌算
+        session.table = None
+
+    async def _broadcast(self, message):
+        for session in list(self._seats.values()):
+            await session.send(message)
+
+    async def _ask_action(self, player_id, session, street):
+        """
+        等玩家行动，超时或者离开都按弃牌算，不认识的行动回error后继续等
+        """
+        while not session.actions.empty():  # 丢掉不是轮到自己时发的行动
+            session.actions.get_nowait()
+        await session.send({'event': 'action_request', 'street': street,
+                            'player_id': player_id})
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._action_timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(session.actions.get(),
+                                                 deadline - loop.time())
+            except asyncio.TimeoutError:
+                return 'fold'
+            action = message.get('action')
+            if action in self.ACTIONS:
+                return action
+            await session.send({'event': 'error', 'message':
+                                'missing action' if action is None else
+                                'unknown action: %s' % action})
+
+    async def _play_hand(self):
+        table = self._table
+        seats = dict(self._seats)
+        table.shuffle()
+        table.deal()
+        for player_id, session in seats.items():
+            await session.send({'event': 'hole_cards', 'player_id': player_id,
+                                'cards': table.get_hole_card(player_id)})
+        active = sorted(seats)
+        board = []
+        for street in self.STREETS:
+            if street != 'preflop':
+                board = table.deal_street(street)
+                await self._broadcast({'event': 'board', 'street': street,
+                                       'cards': board})
+            for player_id in list(active):
+                session = seats[player_id]
+                if session.table is not self:   # 已经离开
+                    action = 'fold'
+                else:
+                    action = await self._ask_action(player_id, session, street)
+                if action == 'fold':
+                    active.remove(player_id)
+                if len(active) == 1:
+                    break
+            if len(active) == 1:
+                break
+
+        hole_cards = {}
+        if len(active) == 1:
+            rank = [active]
+        else:
+            hole_cards = {player_id: table.get_hole_card(player_id)
+                          for player_id in active}
+            loop = asyncio.get_running_loop()
+            rank = await loop.run_in_executor(
+                self._executor, _rank_players, board, hole_cards)
+        self.hands_played += 1
+        await self._broadcast({'event': 'hand_over', 'rank': rank,
+                               'winners': rank[0], 'board': board,
+                               'hole_cards': hole_cards})
+
+    async def run(self):
+        while True:
+            await self._full.wait()
+            await self._play_hand()
+
+
+class TableServer:
+    """
+    一个进程里跑很多张桌子，每张桌子一个协程，没有人的桌子只是一个挂起的协程
+    """
+    MAX_TABLE_ID_LENGTH = 32
+
+    def __init__(self, player_count=2, executor=None, action_timeout=30.0,
+                 max_tables=1000):
+        """
+        max_tables: 最多开多少张桌子，满了就不能再新建
+        """
+        self._player_count = player_count
+        self._max_tables = max_tables
+        self._executor = executor
+        self._action_timeout = action_timeout
+        self._tables = {}
+        self._tasks = []
+
+    def get_table(self, table_id=None):
+        """
+        按table_id取桌子，不存在就新建；不给table_id就找有空位的桌子
+        table_id不合法或者桌子数到了上限时抛ValueError
+        """
+        if table_id is not None and not (
+                type(table_id) is int or
+                isinstance(table_id, str) and
+                len(table_id) <= self.MAX_TABLE_ID_LENGTH):
+            raise ValueError('table must be an int or a short string')
+        if table_id is None:
+            for table in self._tables.values():
+                if not table.is_full:
+                    return table
+            table_id = len(self._tables)
+            while table_id in self._tables:
+                table_id += 1
+        if table_id not in self._tables:
+            if len(self._tables) >= self._max_tables:
+                raise ValueError('too many tables')
+            table = TableGame(table_id, self._player_count, self._executor,
+                              self._action_timeout)
+            self._tables[table_id] = table
+            self._tasks.append(asyncio.ensure_future(table.run()))
+        return self._tables[table_id]
+
+    async def _handle_message(self, session, message):
+        action = message.get('action')
+        if action == 'join':
+            if session.table is not None:
+                raise ValueError('already at table %s' %
+                                 session.table.table_id)
+            table = self.get_table(message.get('table'))
+            if table.is_full:
+                raise ValueError('table %s is full' % table.table_id)
+            player_id = table.join(session)
+            await session.send({'event': 'joined', 'table': table.table_id,
+                                'player_id': player_id})
+        elif session.table is None:
+            raise ValueError('join a table first')
+        else:
+            session.actions.put_nowait(message)
+
+    async def handle_client(self, reader, writer):
+        session = PlayerSession(writer)
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError('message must be a JSON object')
+                    await self._handle_message(session, message)
+                except ValueError as e:
+                    await session.send({'event': 'error', 'message': str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            if session.table is not None:
+                session.table.leave(session)
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def start_unix(self, path):
+        return await asyncio.start_unix_server(self.handle_client, path)
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+async def _main(port):
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        server = TableServer(executor=executor)
+        tcp_server = await server.start(port=port)
+        async with tcp_server:
+            await tcp_server.serve_forever()
+
+
+if __name__ == '__main__':
+    asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
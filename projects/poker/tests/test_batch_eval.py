@@ -0,0 +1,49 @@
+from nose.tools import assert_equal
+from nose.tools import assert_true
+
+
+from batch_eval import BulkDealer
+from equity import EquityCalculator
+from texaspoker import TexasPoker
+
+
+class TestBulkDealer:
+    def test_deal(self):
+        dealer = BulkDealer(player_count=4, seed=1)
+        deals = dealer.deal(500)
+        assert_equal((500, 4, 2), deals.hole_cards.shape)
+        assert_equal((500, 5), deals.board.shape)
+        for hole_cards, board in zip(deals.hole_cards.tolist(),
+                                     deals.board.tolist()):
+            cards = sum(hole_cards, []) + board
+            assert_equal(13, len(set(cards)))
+        keys = dealer.rank_keys(deals)
+        hole_cards = deals.hole_cards.tolist()
+        board = deals.board.tolist()
+        assert_equal([[TexasPoker.rank_key_ints(hole + board[i])
+                       for hole in hole_cards[i]] for i in range(500)],
+                     keys.tolist())
+        again = BulkDealer(player_count=4, seed=1).deal(500)
+        assert_equal(board, again.board.tolist())
+
+    def test_simulate(self):
+        stats = BulkDealer(player_count=3, seed=2).simulate(3000)
+        assert_equal(3000, stats.hands)
+        assert_equal(9000, sum(stats.category_counts))
+        assert_true(abs(sum(stats.seat_win_rates) - 1) < 1e-9)
+        assert_true(sum(stats.seat_wins) <= 3000)
+
+    def test_equity(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        calculator = EquityCalculator(tp)
+        result = calculator.bulk_monte_carlo(
+            [[['diamond', '9'], ['club', '2']],
+             [['diamond', '2'], ['club', '3']]], trials=10)
+        assert_equal([10, 0], result.wins)
+        result = EquityCalculator().bulk_monte_carlo(
+            [[48, 49], [44, 45]], trials=20000, seed=1)
+        assert_equal(20000, result.trials)
+        assert_true(0.79 < result.equities[0] < 0.85)
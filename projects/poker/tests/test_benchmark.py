@@ -0,0 +1,26 @@
+from nose.tools import assert_equal
+
+
+from benchmark import Benchmark
+from benchmark import HandCorpus
+from texaspoker import TexasPoker
+
+
+class TestBenchmark:
+    def test_hand_corpus(self):
+        corpus = HandCorpus(count=20)
+        tp = TexasPoker()
+        for card_type, hands in corpus.hands.items():
+            assert_equal(20, len(hands))
+            for hole_cards, board in hands:
+                tp._flops, (tp._turn, tp._rever) = board[:3], board[3:]
+                assert_equal(card_type, tp.get_card_type(hole_cards))
+        assert_equal(corpus.hands, HandCorpus(count=20).hands)
+
+    def test_compare(self):
+        baseline = {'a': {'ops_per_sec': 100.0},
+                    'b': {'ops_per_sec': 100.0}}
+        results = {'a': {'ops_per_sec': 90.0},
+                   'b': {'ops_per_sec': 70.0},
+                   'c': {'ops_per_sec': 1.0}}
+        assert_equal([('b', 0.7)], Benchmark.compare(results, baseline))
@@ -0,0 +1,154 @@
+from nose.tools import assert_equal
+from nose.tools import assert_false
+from nose.tools import assert_raises
+from nose.tools import assert_true
+
+
+from betting import BettingEngine
+from exceptions import BettingError
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+def _fix_cards(table, hole_cards_list, board):
+    """
+    发完底牌后换成指定的底牌，之后按board的顺序发公共牌
+    """
+    tp = table._texaspoker
+    table._player_hole_cards = [TexasPoker.cards_to_ints(hole_cards)
+                                for hole_cards in hole_cards_list]
+    tp.cards = TexasPoker.cards_to_ints(board)[::-1]
+    tp._shuffled = True
+
+
+class TestBettingEngine:
+    def test_fold_to_big_blind(self):
+        engine = BettingEngine(TexasTable(player_count=3, seed=1),
+                               [1000, 1000, 1000], 5, 10)
+        engine.start_hand()
+        assert_equal(1, engine.to_act_player)
+        assert_equal({'fold': True, 'call': 10, 'raise': (20, 1000)},
+                     engine.legal_actions())
+        assert_raises(BettingError, engine.act, 'check')
+        assert_raises(BettingError, engine.act, 'raise', 15)
+        engine.act('fold')
+        assert_equal(2, engine.to_act_player)
+        engine.act('fold')
+        assert_true(engine.finished)
+        assert_equal({3: 15}, engine.result.payouts)
+        assert_equal({}, engine.result.rank_keys)
+        assert_equal({1: 1000, 2: 995, 3: 1005}, engine.stacks)
+
+    def test_start_hand_seed_numpy_rng(self):
+        import numpy as np
+
+        table = TexasTable(player_count=2, int_cards=True,
+                           rng=np.random.default_rng(1))
+        engine = BettingEngine(table, [100, 100], 1, 2)
+        engine.start_hand(seed=3)
+        hole_cards = table.get_hole_card(1)
+        engine.act('fold')
+        engine.start_hand(seed=3)
+        assert_equal(hole_cards, table.get_hole_card(1))
+
+    def test_side_pots(self):
+        table = TexasTable(player_count=3, int_cards=True, seed=2)
+        engine = BettingEngine(table, [100, 300, 500], 5, 10)
+        engine.start_hand()
+        # 1号最大但只能分主池，2号第二大拿边池
+        _fix_cards(table, [[['spade', 'A'], ['heart', 'A']],
+                           [['spade', 'K'], ['heart', 'K']],
+                           [['spade', '7'], ['heart', '2']]],
+                   [['club', '3'], ['diamond', '8'], ['club', '9'],
+                    ['diamond', 'J'], ['spade', '4']])
+        engine.act('all_in')
+        engine.act('all_in')
+        assert_equal(3, engine.to_act_player)
+        engine.act('call')
+        assert_true(engine.finished)
+        pots = engine.result.pots
+        assert_equal([300, 400], [pot.amount for pot in pots])
+        assert_equal([[1, 2, 3], [2, 3]], [pot.eligible for pot in pots])
+        assert_equal([[1], [2]], [pot.winners for pot in pots])
+        assert_equal({1: 300, 2: 400}, engine.result.payouts)
+        assert_equal({1: 300, 2: 400, 3: 200}, engine.stacks)
+        assert_equal(5, len(engine.result.board))
+
+    def test_short_big_blind(self):
+        engine = BettingEngine(TexasTable(player_count=3, seed=6),
+                               [1000, 1000, 3], 5, 10)
+        engine.start_hand()
+        # 大盲只有3个也全下了，其他人还是要跟到10
+        assert_equal(1, engine.to_act_player)
+        assert_equal({'fold': True, 'call': 10, 'raise': (20, 1000)},
+                     engine.legal_actions())
+        engine.act('call')
+        assert_equal({'fold': True, 'call': 5, 'raise': (20, 1000)},
+                     engine.legal_actions())
+        assert_raises(BettingError, engine.act, 'check')
+        engine.act('call')
+        while not engine.finished:
+            engine.act('check')
+        pots = engine.result.pots
+        assert_equal([9, 14], [pot.amount for pot in pots])
+        assert_equal([[1, 2, 3], [1, 2]], [pot.eligible for pot in pots])
+        assert_equal(2003, sum(engine.stacks.values()))
+
+    def test_short_all_in(self):
+        table = TexasTable(player_count=3, seed=3)
+        engine = BettingEngine(table, [1000, 1000, 45], 5, 10)
+        engine.start_hand()
+        engine.act('raise', 30)
+        engine.act('fold')
+        # 大盲全下到45，比最小加注少，1号已经行动过，只能跟或弃
+        engine.act('all_in')
+        assert_equal(1, engine.to_act_player)
+        assert_equal({'fold': True, 'call': 15}, engine.legal_actions())
+        assert_raises(BettingError, engine.act, 'raise', 100)
+        engine.act('call')
+        assert_true(engine.finished)
+        assert_equal(95, sum(engine.result.payouts.values()))
+        assert_equal(2045, sum(engine.stacks.values()))
+
+    def test_streets(self):
+        table = TexasTable(player_count=2, seed=4)
+        engine = BettingEngine(table, [500, 500], 5, 10, ante=1)
+        engine.start_hand()
+        # 单挑时庄家是小盲，翻牌前先行动，翻牌后后行动
+        assert_equal(1, engine.to_act_player)
+        engine.act('call')
+        engine.act('check')
+        assert_equal('flop', engine.STREETS[engine.street])
+        assert_equal(3, len(table.get_board()))
+        assert_equal(2, engine.to_act_player)
+        engine.act('bet', 20)
+        engine.act('raise', 60)
+        engine.act('call')
+        assert_equal('turn', engine.STREETS[engine.street])
+        engine.act('check')
+        engine.act('check')
+        engine.act('check')
+        assert_false(engine.finished)
+        engine.act('check')
+        assert_true(engine.finished)
+        assert_equal(142, engine.pot_total)
+        assert_equal(1000, sum(engine.stacks.values()))
+        assert_equal([1, 2], sorted(engine.result.rank_keys))
+
+    def test_run_hands(self):
+        engine = BettingEngine(TexasTable(player_count=6, int_cards=True,
+                                          seed=5), [200] * 6, 5, 10)
+
+        def policy(engine, seat):
+            actions = engine.legal_actions()
+            if 'raise' in actions and seat.player_id % 2:
+                return 'raise', actions['raise'][1]
+            return ('call', None) if 'call' in actions else ('check', None)
+        for i in range(50):
+            if sum(1 for seat in engine.seats if seat.stack > 0) < 2:
+                break
+            result = engine.run_hand(policy)
+            assert_equal(sum(pot.amount for pot in result.pots),
+                         sum(result.payouts.values()))
+            assert_equal(1200, sum(engine.stacks.values()))
+            engine.next_button()
@@ -0,0 +1,87 @@
+import itertools
+import random
+
+from nose.tools import assert_equal
+from nose.tools import assert_false
+from nose.tools import assert_true
+
+
+from canonical import CachedEvaluator
+from canonical import LRUCache
+from canonical import SuitCanonicalizer
+from texaspoker import TexasPoker
+
+
+def _permute(cards, permutation):
+    return [card & ~3 | permutation[card & 3] for card in cards]
+
+
+class TestSuitCanonicalizer:
+    def test_isomorphic(self):
+        rng = random.Random(1)
+        for i in range(50):
+            cards = rng.sample(range(52), 9)
+            holes = [cards[:2], cards[2:4]]
+            board = cards[4:]
+            key = SuitCanonicalizer.canonical_key(holes, board)
+            for permutation in itertools.permutations(range(4)):
+                assert_equal(key, SuitCanonicalizer.canonical_key(
+                    [_permute(hole, permutation) for hole in holes],
+                    _permute(board, permutation)))
+            canonical_holes, canonical_board = \
+                SuitCanonicalizer.canonical_cards(holes, board)
+            assert_equal(key, SuitCanonicalizer.canonical_key(
+                canonical_holes, canonical_board))
+            assert_equal(TexasPoker.rank_key_ints(holes[0] + board),
+                         TexasPoker.rank_key_ints(canonical_holes[0] +
+                                                  canonical_board))
+
+    def test_not_isomorphic(self):
+        # 同花色的底牌和不同花色的底牌
+        suited = SuitCanonicalizer.canonical_key([[48, 44]], [0, 4, 8])
+        offsuit = SuitCanonicalizer.canonical_key([[48, 45]], [0, 4, 8])
+        assert_false(suited == offsuit)
+        # 玩家顺序不同
+        assert_false(SuitCanonicalizer.canonical_key([[48, 49], [0, 4]]) ==
+                     SuitCanonicalizer.canonical_key([[0, 4], [48, 49]]))
+
+
+class TestLRUCache:
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert_equal(1, cache.get('a'))
+        cache.put('c', 3)
+        assert_false('b' in cache)
+        assert_true('a' in cache)
+        assert_equal(None, cache.get('b'))
+        assert_equal({'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 1,
+                      'hit_rate': 0.5}, cache.stats())
+
+
+class TestCachedEvaluator:
+    def test_equity_hit(self):
+        evaluator = CachedEvaluator(maxsize=100)
+        holes = [[['heart', 'A'], ['heart', 'K']],
+                 [['spade', '9'], ['diamond', '9']]]
+        board = [['heart', '9'], ['heart', '8'], ['club', '2']]
+        result = evaluator.equity(holes, board)
+        swapped = evaluator.equity(
+            [[['club', 'A'], ['club', 'K']],
+             [['spade', '9'], ['diamond', '9']]],
+            [['club', '9'], ['club', '8'], ['heart', '2']])
+        assert_true(result is swapped)
+        assert_equal(990, result.trials)
+        assert_equal(1, evaluator.equity_cache.hits)
+        assert_equal(1, evaluator.equity_cache.misses)
+        evaluator.equity(holes, board, method='monte_carlo', trials=100,
+                         seed=1)
+        assert_equal(2, evaluator.equity_cache.misses)
+
+    def test_rank_key(self):
+        evaluator = CachedEvaluator(maxsize=100)
+        key = evaluator.rank_key([48, 44], [40, 36, 32, 0, 1])
+        assert_equal(TexasPoker.ROYAL_FLUSH << TexasPoker.CATEGORY_SHIFT, key)
+        assert_equal(key, evaluator.rank_key([49, 45], [41, 37, 33, 1, 0]))
+        assert_equal(1, evaluator.rank_key_cache.hits)
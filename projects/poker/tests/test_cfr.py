@@ -0,0 +1,124 @@
+import random
+
+from nose.tools import assert_equal
+from nose.tools import assert_false
+from nose.tools import assert_true
+import numpy as np
+
+
+from cfr import CFRSolver
+from cfr import EquityBucketer
+from cfr import LimitBettingTree
+from texaspoker import TexasPoker
+
+
+class _OneNodeTree:
+    """
+    只有玩家0的一个决策节点，三个动作分别赢1、2、3
+    """
+    _players = [0]
+    _streets = [0]
+    _children = [[~0, ~1, ~2]]
+    legal = np.ones((1, 3), dtype=bool)
+
+    def __len__(self):
+        return 1
+
+    def utility(self, terminal, result):
+        return terminal + 1.0
+
+
+class TestLimitBettingTree:
+    def test_tree(self):
+        tree = LimitBettingTree(1, 2, max_bets=4)
+        fold, call, raise_ = (LimitBettingTree.FOLD, LimitBettingTree.CALL,
+                              LimitBettingTree.RAISE)
+        assert_equal(0, tree.players[0])
+        assert_true(tree.legal[0].all())
+        # 小盲弃牌输1个
+        assert_equal(-1, tree.utility(~tree.children[0, fold], 1))
+        # 小盲补齐后大盲可以过牌，不能弃牌
+        limp = tree.children[0, call]
+        assert_equal((1, 0), (tree.players[limp], tree.streets[limp]))
+        assert_false(tree.legal[limp, fold])
+        # 大盲过牌进入翻牌圈，大盲先行动
+        flop = tree.children[limp, call]
+        assert_equal((1, 1), (tree.players[flop], tree.streets[flop]))
+        # 翻牌前加注到封顶后不能再加
+        node = 0
+        for i in range(3):
+            node = tree.children[node, raise_]
+        assert_false(tree.legal[node, raise_])
+        assert_equal(6, tree.utility(~tree.children[node, fold], 1))
+        # 每条街都过牌，摊牌时每人投入2个
+        node = flop
+        for i in range(6):
+            node = tree.children[node, call]
+        assert_true(node < 0)
+        assert_equal(-2, tree.utility(~node, -1))
+        assert_equal(0, tree.utility(~node, 0))
+
+
+class TestEquityBucketer:
+    def test_buckets(self):
+        bucketer = EquityBucketer(buckets=8, samples=64, preflop_trials=200,
+                                  seed=1)
+        # 玩家0拿AA，玩家1拿72不同花，公共牌给玩家0皇家同花顺
+        cards = TexasPoker.cards_to_ints(
+            [['spade', 'A'], ['heart', 'A'], ['club', '7'], ['diamond', '2'],
+             ['spade', 'K'], ['spade', 'Q'], ['spade', 'J'], ['spade', '10'],
+             ['heart', '3']])
+        deals = np.array([cards + [card for card in range(52)
+                                   if card not in cards]])
+        buckets = bucketer.buckets_of(deals)
+        assert_equal((1, 2, 4), buckets.shape)
+        assert_equal(7, buckets[0, 0, 0])
+        assert_equal(0, buckets[0, 1, 0])
+        assert_equal(7, buckets[0, 0, 3])
+
+
+class TestCFRSolver:
+    def test_run(self):
+        solver = CFRSolver(buckets=4, samples=8, batch_size=64, seed=1)
+        solver.run(200, seed=2)
+        assert_equal(200, solver.iterations)
+        assert_true(np.abs(solver.regrets).sum() > 0)
+        strategy = solver.average_strategy()
+        assert_equal((len(solver.tree) * 4, 3), strategy.shape)
+        assert_true(np.allclose(strategy.sum(axis=1), 1))
+        legal = np.repeat(solver.tree.legal, 4, axis=0)
+        assert_equal(0, strategy[~legal].sum())
+        probabilities = solver.action_probabilities(0, 3)
+        assert_equal(['fold', 'call', 'raise'], list(probabilities))
+
+        # 同样的种子结果相同
+        other = CFRSolver(buckets=4, samples=8, batch_size=64, seed=1)
+        other.run(200, seed=2)
+        assert_true(np.array_equal(solver.regrets, other.regrets))
+
+    def test_train_processes(self):
+        solver = CFRSolver(buckets=4, samples=8, batch_size=64, processes=2,
+                           seed=1)
+        solver.train(256, iterations_per_task=64)
+        assert_equal(256, solver.iterations)
+        assert_true(solver.strategy_sum.sum() > 0)
+
+    def test_expected_regret(self):
+        solver = CFRSolver(buckets=1)
+        solver.set_tree(_OneNodeTree())
+        base = np.array([0.2, 0.3, 0.5])     # 正regret归一化就是sigma
+        total = np.zeros(3)
+        rand = random.Random(1).random
+        count = 50000
+        for i in range(count):
+            solver.regrets[0] = base
+            solver._traverse([[0], [0]], 0, 0, rand)
+            total += solver.regrets[0] - base
+        # 期望增量为每个动作的价值减去sigma下的价值2.3
+        assert_true(np.allclose(total / count, [-1.3, -0.3, 0.7], atol=0.05))
+
+        solver.set_tree(_OneNodeTree())
+        for i in range(2000):
+            solver._traverse([[0], [0]], 0, 0, rand)
+        assert_equal(2, int(solver.regrets[0].argmax()))
+        assert_true((solver.regrets[0][:2] < 0).all())
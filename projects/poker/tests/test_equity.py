@@ -0,0 +1,53 @@
+from nose.tools import assert_equal
+from nose.tools import assert_true
+
+
+from equity import EquityCalculator
+from texaspoker import TexasPoker
+
+
+class TestEquityCalculator:
+    def test_monte_carlo(self):
+        calculator = EquityCalculator(TexasPoker())
+        aces = [['spade', 'A'], ['heart', 'A']]
+        kings = [['spade', 'K'], ['heart', 'K']]
+        result = calculator.monte_carlo([aces, kings], trials=4000, seed=1)
+        assert_equal(4000, result.trials)
+        assert_true(0.78 < result.equities[0] < 0.86)
+        assert_true(abs(sum(result.equities) - 1) < 1e-9)
+        again = calculator.monte_carlo([aces, kings], trials=4000, seed=1)
+        assert_equal(result.wins, again.wins)
+
+    def test_monte_carlo_board(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        calculator = EquityCalculator(tp)
+        result = calculator.monte_carlo(
+            [[['diamond', '9'], ['club', '2']],
+             [['diamond', '2'], ['club', '3']]], trials=10)
+        assert_equal([10, 0], result.wins)
+        assert_equal([0.0, 1.0], result.lose_rates)
+
+    def test_monte_carlo_pool(self):
+        calculator = EquityCalculator()
+        result = calculator.monte_carlo(
+            [[0, 1], [48, 49]], trials=20000, processes=2, seed=2,
+            tolerance=0.02, batch_size=500)
+        assert_true(result.trials < 20000)
+        assert_true(result.confidence_half_width() < 0.02)
+
+    def test_exact(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        hole1 = [['diamond', '9'], ['club', '2']]
+        hole2 = [['heart', 'K'], ['heart', 'Q']]
+        result = EquityCalculator(tp).exact([hole1, hole2])
+        assert_equal(990, result.trials)
+        assert_equal(result.trials, sum(result.wins) + result.ties[0])
+        tp._turn = ['spade', 'Q']
+        result = EquityCalculator(tp).exact([hole1, hole2])
+        assert_equal(44, result.trials)
+        # 除了红桃2以外的8张红桃成同花，两张Q成更大的葫芦，后者赢
+        assert_equal([34, 10], result.wins)
@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_true
+
+
+from canonical import CachedEvaluator
+from equity import EquityResult
+from equity_store import EquityStore
+
+
+def _result(wins):
+    result = EquityResult(2)
+    result.add_showdown([2, 1], weight=wins)
+    result.add_showdown([1, 1])
+    return result
+
+
+class TestEquityStore:
+    def test_put_get(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'equity.db')
+        try:
+            holes = [[48, 44], [36, 37]]
+            board = [40, 32, 0]
+            with EquityStore(path, batch_size=10) as store:
+                store.put(holes, board, _result(3))
+                # 还没写进文件，也能读到
+                assert_equal(3, store.get(holes, board).wins[0])
+            with EquityStore(path) as store:
+                # 花色换一下是同一个牌面
+                result = store.get([[49, 45], [37, 36]], [41, 33, 1])
+                assert_equal([3, 0], result.wins)
+                assert_equal(4, result.trials)
+                assert_equal(None, store.get(holes, board, 'monte_carlo'))
+                assert_equal(None, store.get([[48, 44], [28, 29]], board))
+                assert_equal({'hits': 1, 'misses': 2, 'hit_rate': 1 / 3,
+                              'pending': 0}, store.stats())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_evict(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'equity.db')
+        try:
+            with EquityStore(path, max_entries=3, batch_size=2) as store:
+                for i in range(5):
+                    store.put([[48, 44], [i * 4, i * 4 + 1]], [], _result(i))
+                assert_equal(3, len(store))
+                assert_equal(None, store.get([[48, 44], [0, 1]], []))
+                assert_equal(4, store.get([[48, 44], [16, 17]], []).wins[0])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_cached_evaluator(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'equity.db')
+        holes = [[48, 44], [36, 37]]
+        board = [40, 32, 0]
+        try:
+            with EquityStore(path) as store:
+                cold = CachedEvaluator(store=store).equity(holes, board)
+            with EquityStore(path) as store:
+                evaluator = CachedEvaluator(store=store)
+                warm = evaluator.equity(holes, board)
+                assert_equal(1, evaluator.stats()['store']['hits'])
+            assert_equal(cold.wins, warm.wins)
+            assert_true(warm.trials > 0)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+
+from hand_history import HandHistoryReader
+from hand_history import HandHistoryWriter
+from texas_table import TexasTable
+
+
+class TestHandHistory:
+    def test_write_and_read(self):
+        table = TexasTable(player_count=3, seed=1)
+        records = []
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hands.hist')
+            with HandHistoryWriter(path, batch_size=4) as writer:
+                for seed in range(10):
+                    table.shuffle(seed=seed)
+                    table.deal()
+                    table.deal_board()
+                    writer.write_table(table, seed=seed)
+                    records.append((table.players_rank(),
+                                    table.get_hole_card(3)))
+            with HandHistoryWriter(path) as writer:     # 追加
+                writer.write_hand([[0, 1], [2, 3]], [4, 5, 6], [[1, 2]])
+            with HandHistoryReader(path) as reader:
+                assert_equal(11, len(reader))
+                for record, (rank, hole_cards) in zip(reader, records):
+                    assert_equal(rank, record.rank)
+                    assert_equal(table._texaspoker.cards_to_ints(hole_cards),
+                                 record.hole_cards[2])
+                last = reader[-1]
+                assert_equal(10, last.hand_id)
+                assert_equal([4, 5, 6], last.board)
+                assert_equal([[1, 2]], last.rank)
+                assert_equal(11, len(list(reader.iter_raw())))
+            # 同样的seed可以重现这一手牌
+            table.shuffle(seed=9)
+            table.deal()
+            assert_equal(records[9][1], table.get_hole_card(3))
+
+    def test_partial_record(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hands.hist')
+            with HandHistoryWriter(path) as writer:
+                writer.write_hand([[0, 1], [2, 3]], [4, 5, 6], [[1], [2]])
+            with open(path, 'ab') as f:     # 写到一半崩溃
+                f.write(b'\x01\x02\x03')
+            with HandHistoryWriter(path) as writer:
+                assert_equal(1, writer.write_hand([[7, 8], [9, 10]],
+                                                  [11, 12, 13], [[2], [1]]))
+            with HandHistoryReader(path) as reader:
+                assert_equal(2, len(reader))
+                assert_equal([7, 8], reader[1].hole_cards[0])
+                assert_equal([[2], [1]], reader[1].rank)
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'empty.hist')
+            open(path, 'wb').close()
+            assert_raises(ValueError, HandHistoryReader, path)
+
+    def test_large_hand_id(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hands.hist')
+            with HandHistoryWriter(path) as writer:
+                writer._next_hand_id = 2 ** 32 + 5  # 超过uint32
+                writer.write_hand([[0, 1], [2, 3]], [4, 5, 6], [[1], [2]])
+            with HandHistoryReader(path) as reader:
+                assert_equal(2 ** 32 + 5, reader[0].hand_id)
@@ -0,0 +1,65 @@
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+from nose.tools import assert_true
+
+
+from equity import EquityCalculator
+from hand_range import HandRange
+from hand_range import RangeEquityCalculator
+from texaspoker import TexasPoker
+
+
+class TestHandRange:
+    def test_parse(self):
+        assert_equal(18, len(HandRange('QQ+')))
+        assert_equal(4, len(HandRange('AKs')))
+        assert_equal(12, len(HandRange('ako')))
+        assert_equal(16, len(HandRange('AK')))
+        assert_equal(20, len(HandRange('T9s-65s')))
+        assert_equal(16, len(HandRange('ATs+')))
+        assert_equal(48, len(HandRange('KTo-K7o')))
+        assert_equal(18, len(HandRange('22-44')))
+        hand_range = HandRange('QQ+, AKs, T9s-65s, AhKd:0.5')
+        assert_equal(43, len(hand_range))
+        ace_king = (TexasPoker.card_to_int(['heart', 'A']),
+                    TexasPoker.card_to_int(['diamond', 'K']))
+        assert_equal(0.5, hand_range.weights[ace_king])
+        assert_raises(ValueError, HandRange, 'AAs')
+        assert_raises(ValueError, HandRange, 'AKs-QJo')
+        assert_raises(ValueError, HandRange, 'XY')
+
+    def test_combos_blocked(self):
+        hand_range = HandRange('AA, AKs')
+        combos = hand_range.combos([['spade', 'A'], ['heart', '2']])
+        # 黑桃A挡住了3个AA和1个AKs
+        assert_equal(6, len(combos))
+        cards = hand_range.combos(int_cards=False)[0][0]
+        assert_equal(('A', 'A'), (cards[0][1], cards[1][1]))
+
+
+class TestRangeEquityCalculator:
+    def test_single_combos(self):
+        board = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        result = RangeEquityCalculator().equity('AcKc', '9dTd', board)
+        tp = TexasPoker()
+        tp._flops = board
+        exact = EquityCalculator(tp).exact(
+            [[['club', 'A'], ['club', 'K']],
+             [['diamond', '9'], ['diamond', '10']]])
+        assert_true(abs(exact.equities[0] - result.equity) < 1e-9)
+
+    def test_ranges(self):
+        board = [['spade', '9'], ['heart', '8'], ['heart', '2']]
+        calculator = RangeEquityCalculator(processes=2)
+        result = calculator.equity('QQ+, AKs', '99, 88, T9s', board)
+        reverse = calculator.equity('99, 88, T9s', 'QQ+, AKs', board)
+        assert_true(abs(result.equity + reverse.equity - 1) < 1e-9)
+        assert_true(result.equity < 0.5)
+        equities = result.combo_equities()
+        assert_equal(len(HandRange('QQ+, AKs').combos(board)),
+                     len(equities))
+
+    def test_monte_carlo(self):
+        result = RangeEquityCalculator().equity('AA', 'KK', trials=300,
+                                                seed=1)
+        assert_true(0.75 < result.equity < 0.9)
@@ -0,0 +1,44 @@
+from nose.tools import assert_equal
+from nose.tools import assert_true
+
+
+from icm import ICMCalculator
+
+
+class TestICMCalculator:
+    def test_exact(self):
+        calculator = ICMCalculator([50, 30, 20])
+        equities = calculator.exact([50, 30, 20])
+        assert_true(abs(equities[0] - (25 + 0.3 * 50 / 70 * 30 +
+                                       0.2 * 50 / 80 * 30 +
+                                       (0.3 * 20 / 70 + 0.2 * 30 / 80) * 20))
+                    < 1e-9)
+        assert_true(abs(sum(equities) - 100) < 1e-9)
+        # 筹码一样期望一样，出局的玩家为0
+        equities = calculator.equities([10, 10, 0, 10, 10])
+        assert_equal(0.0, equities[2])
+        for equity in equities[:2] + equities[3:]:
+            assert_true(abs(equity - 25) < 1e-9)
+
+    def test_final_table(self):
+        calculator = ICMCalculator([50, 30, 20, 10, 8, 6, 5, 4, 3, 2],
+                                   seed=1)
+        stacks = [3000, 2500, 2000, 1800, 1500, 1200, 1000, 800, 500, 200]
+        # 10人全拿钱也走精确计算
+        assert_true(calculator._state_count(10, 10) <= calculator.max_states)
+        equities = calculator.equities(stacks)
+        assert_true(abs(sum(equities) - 138) < 1e-9)
+        assert_equal(sorted(equities, reverse=True), equities)
+        estimate = calculator.monte_carlo(stacks, trials=5000)
+        for equity, approximate in zip(equities, estimate):
+            assert_true(abs(equity - approximate) < 1)
+
+    def test_large_field(self):
+        calculator = ICMCalculator(list(range(30, 0, -1)), max_states=1000,
+                                   trials=500, seed=2)
+        stacks = [1000 + i * 10 for i in range(100)]
+        equities = calculator.equities(stacks)
+        assert_true(abs(sum(equities) - sum(range(31))) < 1e-6)
+        by_seat = calculator.table_equities({2: 100, 1: 300})
+        assert_equal([1, 2], sorted(by_seat))
+        assert_true(by_seat[1] > by_seat[2])
@@ -0,0 +1,62 @@
+from nose.tools import assert_equal
+from nose.tools import assert_false
+from nose.tools import assert_raises
+from nose.tools import assert_true
+
+
+from instrument import Profiler
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+class TestProfiler:
+    def test_profiler(self):
+        rank_key = TexasPoker.__dict__['rank_key']
+        deal = TexasTable.deal
+        profiler = Profiler()
+        table = TexasTable(player_count=3, seed=1)
+        with profiler:
+            assert_true(profiler.enabled)
+            for i in range(5):
+                table.shuffle()
+                table.deal()
+                table.deal_board()
+                table.players_rank()
+            tp = TexasPoker()
+            tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+            tp._turn = ['spade', '6']
+            tp._rever = ['heart', '8']
+            tp.is_one_pair([['spade', '8'], ['spade', '10']])
+        assert_false(profiler.enabled)
+        assert_true(TexasPoker.__dict__['rank_key'] is rank_key)
+        assert_true(TexasTable.deal is deal)
+        table.deal()    # 关闭以后不再统计
+        snapshot = profiler.snapshot()
+        assert_equal(5, snapshot['hands_dealt'])
+        assert_equal(5, snapshot['showdowns'])
+        stages = snapshot['stages']
+        assert_equal(15, stages['TexasPoker._rank_key_from_counts']['calls'])
+        assert_equal(1, stages['TexasPoker.is_one_pair']['calls'])
+        assert_equal(1, stages['TexasPoker._statistic_weights']['calls'])
+        merged = Profiler.merge_snapshots([snapshot, snapshot])
+        assert_equal(10, merged['hands_dealt'])
+        assert_equal(110, merged['stages']['Poker.pop_card']['calls'])
+
+    def test_one_profiler_at_a_time(self):
+        deal = TexasTable.deal
+        first = Profiler()
+        second = Profiler()
+        first.enable()
+        try:
+            assert_raises(RuntimeError, second.enable)
+        finally:
+            first.disable()
+        second.disable()
+        assert_true(TexasTable.deal is deal)
+        second.enable()
+        second.disable()
+        assert_true(TexasTable.deal is deal)
+        table = TexasTable(player_count=2, seed=1)
+        table.deal()
+        assert_equal(0, first.snapshot()['hands_dealt'])
+        assert_equal(0, second.snapshot()['hands_dealt'])
@@ -0,0 +1,36 @@
+import os
+import random
+import tempfile
+
+from nose.tools import assert_equal
+
+
+from lookup_table import LookupEvaluator
+from texaspoker import TexasPoker
+
+
+class TestLookupEvaluator:
+    evaluator = LookupEvaluator.build()
+
+    def test_rank_key(self):
+        rng = random.Random(1)
+        for i in range(2000):
+            cards = rng.sample(range(52), 7)
+            assert_equal(TexasPoker.rank_key_ints(cards),
+                         self.evaluator.rank_key(cards))
+
+    def test_save_and_load(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        hole1 = [['diamond', '9'], ['spade', 'K']]
+        hole2 = [['diamond', '9'], ['club', '9']]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'texaspoker.lut')
+            evaluator = LookupEvaluator.load_or_build(path)
+            assert_equal('Fullhouse', evaluator.get_card_type(tp, hole1))
+            assert_equal(-1, evaluator.compare_hole_cards(tp, hole1, hole2))
+            assert_equal(tp.get_rank_key(hole1),
+                         evaluator.get_rank_key(tp, hole1))
+            evaluator.close()
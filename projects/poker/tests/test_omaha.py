@@ -0,0 +1,86 @@
+import itertools
+import random
+
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+
+
+from exceptions import VariantError
+from omaha import OmahaPoker
+from omaha import OmahaTable
+from texaspoker import TexasPoker
+
+
+class TestOmahaPoker:
+    def test_two_plus_three(self):
+        op = OmahaPoker()
+        op._flops = [['heart', 'A'], ['heart', 'K'], ['heart', 'Q']]
+        op._turn = ['heart', 'J']
+        op._rever = ['club', '2']
+        # 只有一张红桃，不能用公共牌的四张红桃成同花，只能是9到K的顺子
+        hole_cards = [['heart', '10'], ['spade', '9'], ['club', '7'],
+                      ['diamond', '8']]
+        assert_equal('Straight', op.get_card_type(hole_cards))
+        # 三张A在手里也只能用两张，加上公共牌的A是三条而不是四条
+        hole_cards = [['spade', 'A'], ['club', 'A'], ['diamond', 'A'],
+                      ['spade', '2']]
+        assert_equal('Three of a kind', op.get_card_type(hole_cards))
+        assert_equal(-1, op.compare_hole_cards(
+            hole_cards, [['heart', '10'], ['spade', '9'], ['club', '7'],
+                         ['diamond', '8']]))
+
+    def test_brute_force(self):
+        rng = random.Random(3)
+        for i in range(500):
+            cards = rng.sample(range(52), 9)
+            hole_cards = cards[:4]
+            board = cards[4:]
+            expected = max(
+                TexasPoker.rank_key_ints(list(pair) + list(combo))
+                for pair in itertools.combinations(hole_cards, 2)
+                for combo in itertools.combinations(board, 3))
+            assert_equal(expected,
+                         OmahaPoker.omaha_rank_key(hole_cards, board))
+            # 和TexasPoker.rank_key一样只传一个列表，前4张是底牌
+            assert_equal(expected, OmahaPoker.rank_key_ints(cards))
+
+    def test_holdem_only(self):
+        op = OmahaPoker()
+        kings = [['club', 'K'], ['diamond', 'K'], ['heart', 'K'],
+                 ['spade', 'K']]
+        # 没有公共牌不能判断
+        assert_raises(ValueError, op.current_rank_key, kings)
+        assert_raises(ValueError, op.get_card_type, kings)
+        op._flops = [['spade', '2'], ['heart', '7'], ['diamond', '9']]
+        assert_equal('one Pair', op.get_card_type(kings))
+        # 合在一起判断的德州扑克方法不能用
+        assert_raises(VariantError, op.is_four_of_a_kind, kings)
+        assert_raises(VariantError, op.current_state, kings)
+        cards = TexasPoker.cards_to_ints(kings + op._flops)
+        assert_equal(['one Pair'], OmahaPoker.get_card_types([cards]))
+        assert_equal([OmahaPoker.rank_key_ints(cards)],
+                     OmahaPoker.get_rank_keys([cards]).tolist())
+
+
+class TestOmahaTable:
+    def test_deal(self):
+        table = OmahaTable(player_count=6, int_cards=True, seed=2)
+        table.deal()
+        board = table.deal_board()
+        cards = list(board)
+        for player_id in range(1, 7):
+            assert_equal(4, len(table.get_hole_card(player_id)))
+            cards.extend(table.get_hole_card(player_id))
+        assert_equal(29, len(set(cards)))
+        keys = table.get_rank_keys()
+        assert_equal([OmahaPoker.omaha_rank_key(table.get_hole_card(player_id),
+                                          board)
+                      for player_id in range(1, 7)], keys)
+        assert_equal(list(range(1, 7)),
+                     sorted(sum(table.players_rank(), [])))
+        # 发公共牌用的是TexasPoker的，公共牌的HandState也跟着更新
+        assert_equal(TexasPoker.rank_key_ints(board),
+                     table._texaspoker.board_state.rank_key())
+        table.shuffle()
+        assert_equal([], table.get_board())
+        assert_equal(0, table._texaspoker.board_state.size)
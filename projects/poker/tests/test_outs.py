@@ -0,0 +1,48 @@
+from nose.tools import assert_equal
+from nose.tools import assert_false
+from nose.tools import assert_raises
+from nose.tools import assert_true
+
+
+from outs import OutsAnalyzer
+from texaspoker import TexasPoker
+
+
+class TestOutsAnalyzer:
+    def test_flush_draw(self):
+        tp = TexasPoker()
+        tp._flops = [['heart', '9'], ['heart', '8'], ['club', '2']]
+        hole_cards = [['heart', 'A'], ['heart', 'K']]
+        report = OutsAnalyzer(tp).analyze(hole_cards)
+        assert_equal('high card', report.card_type)
+        assert_equal(47, len(report.outcomes))
+        # 9张红桃成同花，3张A和3张K成对子，公共牌成对的不算
+        assert_equal(15, len(report.outs))
+        assert_true(['heart', '2'] in report.outs)
+        assert_false(['diamond', '2'] in report.outs)
+        assert_equal(15 / 47, report.next_card_odds)
+        assert_equal(1 - 32 / 47 * 31 / 46, report.improve_odds)
+
+    def test_opponent(self):
+        tp = TexasPoker(int_cards=True)
+        tp._flops = TexasPoker.cards_to_ints(
+            [['heart', '9'], ['heart', '8'], ['club', '2']])
+        tp._turn = TexasPoker.card_to_int(['spade', '3'])
+        hole_cards = TexasPoker.cards_to_ints(
+            [['heart', 'A'], ['heart', 'K']])
+        opponent = TexasPoker.cards_to_ints(
+            [['spade', '9'], ['diamond', '9']])
+        report = OutsAnalyzer(tp).analyze(hole_cards, [opponent])
+        assert_false(report.winning)
+        assert_equal(1, report.cards_to_come)
+        assert_equal(44, len(report.outcomes))
+        # 能赢的只有不让对方成葫芦的红桃
+        winning = sorted(TexasPoker.ints_to_cards(report.winning_cards))
+        assert_equal(7, len(winning))
+        assert_true(all(card[0] == 'heart' for card in winning))
+        assert_equal(report.next_card_odds, len(report.outs) / 44)
+
+    def test_board_required(self):
+        tp = TexasPoker()
+        assert_raises(ValueError, OutsAnalyzer(tp).analyze,
+                      [['heart', 'A'], ['heart', 'K']])
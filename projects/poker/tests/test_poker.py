@@ -1,9 +1,13 @@
+import random
+
 from nose.tools import assert_equal
 from nose.tools import assert_raises
 from nose.tools import assert_true
 from nose.tools import assert_false
 
 
+from exceptions import PokerCardRunOutException
+from texaspoker import HandState
 from texaspoker import TexasPoker
 
 
@@ -136,3 +140,134 @@ class TestTexasPoker:
         weights3 = [1, 2, 3, 4, 5, 9]
         assert_equal(6, self.tp._if_straight_weight(weights1))
         assert_equal(5, self.tp._if_straight_weight(weights3))
+
+    def test_get_rank_key(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        assert_equal('Four of a Kind',
+                     tp.get_card_type([['diamond', '9'], ['club', '9']]))
+        assert_equal('Fullhouse',
+                     tp.get_card_type([['diamond', '9'], ['spade', 'K']]))
+        assert_equal('Two Pairs',
+                     tp.get_card_type([['diamond', 'Q'], ['spade', '2']]))
+        # 三对只取最大的两对，踢脚取剩下的最大牌
+        key1 = tp.get_rank_key([['diamond', 'Q'], ['spade', 'K']])
+        key2 = tp.get_rank_key([['diamond', 'Q'], ['spade', 'A']])
+        assert_true(key1 < key2)
+
+    def test_compare_hole_cards(self):
+        tp = TexasPoker()
+        tp._flops = [['spade', 'A'], ['spade', '4'], ['heart', 'A']]
+        tp._turn = ['spade', '5']
+        tp._rever = ['club', 'K']
+        wheel = [['spade', '2'], ['spade', '3']]
+        straight = [['heart', '3'], ['club', '2']]
+        assert_equal('Straight Flush', tp.get_card_type(wheel))
+        assert_equal(1, tp.compare_hole_cards(wheel, straight))
+        assert_equal(-1, tp.compare_hole_cards(straight, wheel))
+        # 踢脚相同，平分
+        hole1 = [['heart', '7'], ['club', '8']]
+        hole2 = [['diamond', '7'], ['heart', '8']]
+        assert_equal(0, tp.compare_hole_cards(hole1, hole2))
+        hole3 = [['heart', 'Q'], ['club', '8']]
+        assert_equal(-1, tp.compare_hole_cards(hole1, hole3))
+
+    def test_int_cards(self):
+        card = ['heart', 'Q']
+        card_int = TexasPoker.card_to_int(card)
+        assert_equal(card, TexasPoker.int_to_card(card_int))
+        assert_equal(list(range(52)), TexasPoker.cards_to_ints(
+            TexasPoker.ints_to_cards(range(52))))
+        tp = TexasPoker()
+        assert_equal(52, len(set(tp.cards_to_ints(tp.cards))))
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        hole_cards = [['diamond', '9'], ['spade', 'K']]
+        tp_int = TexasPoker(int_cards=True)
+        tp_int._flops = tp.cards_to_ints(tp._flops)
+        tp_int._turn = tp.card_to_int(tp._turn)
+        tp_int._rever = tp.card_to_int(tp._rever)
+        hole_ints = tp.cards_to_ints(hole_cards)
+        assert_equal(tp.get_rank_key(hole_cards),
+                     tp_int.get_rank_key(hole_ints))
+        assert_true(tp_int.is_fullhouse(hole_ints))
+        assert_equal((8, 12), tp_int.is_fullhouse_weights(hole_ints))
+
+    def test_get_rank_keys(self):
+        rng = random.Random(1)
+        hands = [rng.sample(range(52), 7) for i in range(500)]
+        hands.append([48, 49, 50, 51, 0, 1, 2])     # 四条A
+        hands.append([51, 47, 43, 39, 35, 0, 4])    # 同花大顺
+        hands.append([48, 1, 4, 8, 12, 21, 25])     # A2345
+        keys = TexasPoker.get_rank_keys(hands)
+        assert_equal([TexasPoker.rank_key_ints(hand) for hand in hands],
+                     keys.tolist())
+        card_types = TexasPoker.get_card_types(hands[-3:])
+        assert_equal(['Four of a Kind', 'Royal Flush', 'Straight'],
+                     card_types.tolist())
+
+    def test_hand_state(self):
+        rng = random.Random(2)
+        for i in range(2000):
+            cards = rng.sample(range(52), rng.randrange(1, 8))
+            state = HandState(cards)
+            assert_equal(TexasPoker.rank_key_ints(cards), state.rank_key())
+            state.remove(cards[-1])
+            assert_equal(TexasPoker.rank_key_ints(cards[:-1]),
+                         state.rank_key())
+        state = HandState([['spade', 'A'], ['spade', 'K'], ['spade', 'Q'],
+                           ['spade', 'J'], ['club', '5']])
+        assert_true(state.flush_suit is None)
+        assert_equal('high card', state.card_type())
+        state.add(['spade', '10'])
+        assert_equal(3, state.flush_suit)
+        assert_equal(1 << 13, state.straight_mask)
+        assert_equal('Royal Flush', state.card_type())
+
+    def test_current_rank_key(self):
+        tp = TexasPoker(int_cards=True, rng=random.Random(5))
+        hole_cards = tp.pop_hole_cards()
+        board = tp.pop_flop()[:]
+        assert_equal(TexasPoker.rank_key_ints(hole_cards + board),
+                     tp.current_rank_key(hole_cards))
+        board.append(tp.pop_turn())
+        assert_equal(TexasPoker.rank_key_ints(hole_cards + board),
+                     tp.current_rank_key(hole_cards))
+        tp.pop_rever()
+        assert_equal(tp.get_rank_key(hole_cards),
+                     tp.current_rank_key(hole_cards))
+        assert_equal(5, tp.board_state.size)
+        tp.reset()
+        assert_equal(0, tp.board_state.size)
+
+    def test_shuffle(self):
+        tp1 = TexasPoker(int_cards=True, rng=random.Random(7))
+        tp2 = TexasPoker(int_cards=True, rng=random.Random(7))
+        storage = tp1.cards
+        tp1.pop_flop()
+        tp2.pop_flop()
+        tp1.shuffle()
+        tp2.shuffle()
+        assert_true(tp1.cards is storage)
+        assert_equal([], tp1._flops)
+        assert_equal(list(range(52)), sorted(tp1.cards))
+        assert_equal(tp1.pop_hole_cards(), tp2.pop_hole_cards())
+        assert_equal(50, len(tp1.cards))
+        tp1.reset()
+        assert_equal(52, len(tp1.cards))
+        cards = [tp1.pop_card() for i in range(52)]
+        assert_equal(list(range(52)), sorted(cards))
+        assert_raises(PokerCardRunOutException, tp1.pop_card)
+
+    def test_shuffle_numpy_rng(self):
+        import numpy as np
+        tp = TexasPoker(rng=np.random.default_rng(3))
+        tp.shuffle()
+        hole_cards = tp.pop_hole_cards()
+        tp.pop_card()
+        tp = TexasPoker(rng=np.random.default_rng(3))
+        tp.shuffle()
+        assert_equal(hole_cards, tp.pop_hole_cards())
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+from nose.tools import assert_equal
+from nose.tools import assert_true
+
+
+from preflop import PreflopTable
+from texas_table import TexasTable
+
+
+class TestPreflopTable:
+    def test_hand_class(self):
+        aces = PreflopTable.hand_class([['spade', 'A'], ['heart', 'A']])
+        assert_equal('AA', PreflopTable.class_name(aces))
+        suited = PreflopTable.hand_class([['spade', 'K'], ['spade', 'A']])
+        assert_equal('AKs', PreflopTable.class_name(suited))
+        offsuit = PreflopTable.hand_class([48, 45])
+        assert_equal('AKo', PreflopTable.class_name(offsuit))
+        names = set(PreflopTable.class_name(i) for i in range(169))
+        assert_equal(169, len(names))
+
+    def test_generate_save_load(self):
+        table = PreflopTable.generate(trials=4, max_players=3, seed=1)
+        aces = [['spade', 'A'], ['heart', 'A']]
+        kings = [['spade', 'K'], ['heart', 'K']]
+        assert_true(abs(table.matchup(aces, aces) - 0.5) < 1e-4)
+        assert_equal(1.0, table.matchup(aces, kings) +
+                     table.matchup(kings, aces))
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            table.save(path)
+            loaded = PreflopTable.load(path)
+        finally:
+            os.remove(path)
+        assert_equal(3, loaded.max_players)
+        assert_equal(table.equity(aces, 3), loaded.equity(aces, 3))
+        assert_equal(table.matchup(kings, aces), loaded.matchup(kings, aces))
+
+        texas_table = TexasTable(player_count=3, seed=1)
+        texas_table.deal()
+        assert_equal(3, len(loaded.table_equities(texas_table)))
@@ -0,0 +1,37 @@
+import io
+import json
+import os
+import tempfile
+
+from nose.tools import assert_equal
+
+
+from hand_history import HandHistoryWriter
+from rescore import Rescorer
+from texas_table import TexasTable
+
+
+class TestRescorer:
+    def test_rescore(self):
+        table = TexasTable(player_count=4, int_cards=True, seed=2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'hands.hist')
+            with HandHistoryWriter(path) as writer:
+                for i in range(50):
+                    table.shuffle()
+                    table.deal()
+                    table.deal_board()
+                    writer.write_table(table)
+                # 四条2被记成输给葫芦
+                writer.write_hand([[0, 1], [48, 49]], [2, 3, 4, 5, 6],
+                                  [[2], [1]])
+            for processes in (1, 2):
+                diff_file = io.StringIO()
+                rescorer = Rescorer(path, chunk_size=7, processes=processes)
+                stats = rescorer.rescore(diff_file)
+                assert_equal(51, stats.hands)
+                assert_equal(1, stats.changed)
+                assert_equal(202, sum(stats.category_counts))
+                diff = json.loads(diff_file.getvalue())
+                assert_equal(50, diff['hand_id'])
+                assert_equal([[1], [2]], diff['new_rank'])
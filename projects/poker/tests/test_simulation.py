@@ -0,0 +1,57 @@
+from nose.tools import assert_equal
+from nose.tools import assert_raises
+from nose.tools import assert_true
+
+
+from simulation import Simulator
+
+
+class TestSimulator:
+    def test_run(self):
+        stats = Simulator(table_count=10, player_count=3, hands_per_table=20,
+                          seed=5).run()
+        assert_equal(200, stats.hands)
+        assert_equal(600, sum(stats.category_counts))
+        assert_true(abs(sum(stats.seat_win_rates) - 1) < 1e-9)
+        assert_true(sum(stats.seat_wins) <= 200)
+        assert_true(stats.hands_per_second > 0)
+
+    def test_run_pool(self):
+        simulator = Simulator(table_count=8, player_count=2,
+                              hands_per_table=10, seed=5)
+        pooled = Simulator(table_count=8, player_count=2, hands_per_table=10,
+                           processes=2, seed=5)
+        stats = simulator.run()
+        pooled_stats = pooled.run()
+        assert_equal(stats.category_counts, pooled_stats.category_counts)
+        assert_equal(stats.seat_wins, pooled_stats.seat_wins)
+
+    def test_run_bulk(self):
+        stats = Simulator(table_count=10, player_count=6, hands_per_table=100,
+                          processes=2, seed=5, bulk=True).run()
+        assert_equal(1000, stats.hands)
+        assert_equal(6000, sum(stats.category_counts))
+        assert_true(abs(sum(stats.seat_win_rates) - 1) < 1e-9)
+        # 每张桌子用自己的种子，分块方式不影响结果
+        other = Simulator(table_count=10, player_count=6, hands_per_table=100,
+                          seed=5, tables_per_task=3, bulk=True).run()
+        assert_equal(stats.category_counts, other.category_counts)
+        assert_equal(stats.seat_wins, other.seat_wins)
+        assert_raises(ValueError, Simulator, bulk=True, profile=True)
+
+    def test_run_bulk_chunks(self):
+        from batch_eval import BulkDealer
+
+        chunk_size = BulkDealer.CHUNK_SIZE
+        BulkDealer.CHUNK_SIZE = 64  # 每张桌子的牌要分几块发
+        try:
+            results = [Simulator(table_count=3, player_count=3,
+                                 hands_per_table=150, seed=7,
+                                 tables_per_task=tables_per_task,
+                                 bulk=True).run()
+                       for tables_per_task in (1, 3)]
+        finally:
+            BulkDealer.CHUNK_SIZE = chunk_size
+        assert_equal(450, results[0].hands)
+        assert_equal(results[0].category_counts, results[1].category_counts)
+        assert_equal(results[0].seat_wins, results[1].seat_wins)
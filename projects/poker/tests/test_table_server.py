@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from nose.tools import assert_equal
+
+
+from table_server import TableServer
+
+
+async def _play(port, table_id, fold):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(json.dumps({'action': 'join', 'table': table_id}).encode() +
+                 b'\n')
+    events = []
+    async for line in reader:
+        message = json.loads(line)
+        events.append(message)
+        if message['event'] == 'action_request':
+            action = 'fold' if fold else 'check'
+            writer.write(json.dumps({'action': action}).encode() + b'\n')
+        elif message['event'] == 'hand_over':
+            break
+    writer.close()
+    return events
+
+
+async def _run_tables():
+    server = TableServer(action_timeout=5)
+    tcp_server = await server.start(port=0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    results = await asyncio.gather(
+        _play(port, 0, False), _play(port, 0, False),
+        _play(port, 1, False), _play(port, 1, True))
+    server.close()
+    tcp_server.close()
+    await tcp_server.wait_closed()
+    return results
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+
+
+async def _run_bad_requests():
+    server = TableServer(action_timeout=5, max_tables=1)
+    tcp_server = await server.start(port=0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    events = []
+    await _send(writer, {'action': 'join', 'table': [1]})
+    events.append(json.loads(await reader.readline()))
+    await _send(writer, {'action': 'join', 'table': 'x' * 100})
+    events.append(json.loads(await reader.readline()))
+    await _send(writer, {'action': 'join', 'table': 0})
+    events.append(json.loads(await reader.readline()))
+    other_reader, other_writer = await asyncio.open_connection('127.0.0.1',
+                                                               port)
+    await _send(other_writer, {'action': 'join', 'table': 1})
+    events.append(json.loads(await other_reader.readline()))
+    await _send(other_writer, {'action': 'join', 'table': 0})
+    events.append(json.loads(await other_reader.readline()))
+    # 坐满开始发牌，轮到1号时先发一个不认识的行动
+    events.append(json.loads(await reader.readline()))
+    events.append(json.loads(await reader.readline()))
+    await _send(writer, {'action': 'raise'})
+    events.append(json.loads(await reader.readline()))
+    await _send(writer, {'foo': 1})
+    events.append(json.loads(await reader.readline()))
+    await _send(writer, {'action': 'fold'})
+    while events[-1]['event'] != 'hand_over':
+        events.append(json.loads(await reader.readline()))
+    writer.close()
+    other_writer.close()
+    server.close()
+    tcp_server.close()
+    await tcp_server.wait_closed()
+    return events
+
+
+class TestTableServer:
+    def test_tables(self):
+        results = asyncio.run(_run_tables())
+        for events in results:
+            assert_equal('joined', events[0]['event'])
+            assert_equal('hole_cards', events[1]['event'])
+            assert_equal(2, len(events[1]['cards']))
+        showdown = results[0][-1]
+        assert_equal(5, len(showdown['board']))
+        assert_equal([1, 2], sorted(sum(showdown['rank'], [])))
+        # 弃牌的一方直接输
+        folded = results[3][0]['player_id']
+        assert_equal([3 - folded], results[3][-1]['winners'])
+
+    def test_bad_requests(self):
+        events = asyncio.run(_run_bad_requests())
+        assert_equal(['error', 'error', 'joined', 'error', 'joined',
+                      'hole_cards', 'action_request', 'error', 'error'],
+                     [event['event'] for event in events[:9]])
+        assert_equal('too many tables', events[3]['message'])
+        assert_equal('unknown action: raise', events[7]['message'])
+        # 没有action也不算弃牌
+        assert_equal('missing action', events[8]['message'])
+        assert_equal([2], events[-1]['winners'])
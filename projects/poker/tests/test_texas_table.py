@@ -0,0 +1,68 @@
+from nose.tools import assert_equal
+
+
+from texas_table import TexasTable
+from texaspoker import TexasPoker
+
+
+class TestTexasTable:
+    def test_players_rank(self):
+        tb = TexasTable(player_count=4)
+        tp = tb._texaspoker
+        tp._flops = [['spade', '9'], ['heart', '9'], ['heart', 'A']]
+        tp._turn = ['spade', 'Q']
+        tp._rever = ['club', 'K']
+        tb._player_hole_cards = [
+            [['diamond', '2'], ['club', '3']],
+            [['diamond', '9'], ['spade', 'K']],
+            [['club', '2'], ['heart', '3']],
+            [['diamond', 'A'], ['club', '4']],
+        ]
+        assert_equal([[2], [4], [1, 3]], tb.players_rank())
+
+    def test_deal(self):
+        tb = TexasTable(player_count=9, int_cards=True)
+        tb.deal()
+        board = tb.deal_board()
+        cards = board[:]
+        for player_id in range(1, 10):
+            cards.extend(tb.get_hole_card(player_id))
+        assert_equal(23, len(set(cards)))
+        ranks = tb.players_rank()
+        assert_equal(list(range(1, 10)), sorted(sum(ranks, [])))
+
+    def test_seed(self):
+        tb1 = TexasTable(player_count=3, seed=11)
+        tb2 = TexasTable(player_count=3, seed=11)
+        for i in range(3):
+            tb1.shuffle()
+            tb2.shuffle()
+            tb1.deal()
+            tb2.deal()
+            assert_equal(tb1.deal_board(), tb2.deal_board())
+            assert_equal(tb1.get_hole_card(3), tb2.get_hole_card(3))
+
+    def test_shuffle_seed_numpy_rng(self):
+        import numpy as np
+
+        tb1 = TexasTable(player_count=3, int_cards=True,
+                         rng=np.random.default_rng(1))
+        tb2 = TexasTable(player_count=3, int_cards=True,
+                         rng=np.random.default_rng(2))
+        for tb in (tb1, tb2):
+            tb.shuffle(seed=7)
+            tb.deal()
+        assert_equal(tb1.deal_board(), tb2.deal_board())
+        assert_equal(tb1.get_hole_card(2), tb2.get_hole_card(2))
+
+    def test_current_rank_keys(self):
+        tb = TexasTable(player_count=3, int_cards=True, seed=4)
+        tb.deal()
+        for street in ('flop', 'turn', 'rever'):
+            board = tb.deal_street(street)
+            assert_equal(
+                [TexasPoker.rank_key_ints(tb.get_hole_card(player_id) +
+                                          board)
+                 for player_id in range(1, 4)],
+                tb.get_current_rank_keys())
+        assert_equal(tb.get_rank_keys(), tb.get_current_rank_keys())
@@ -4,22 +4,42 @@
 synopsis: texas poker table class
 author: haoranzeus@gmail.com (zhanghaoran)
 """
-
+import random
 
 from texaspoker import TexasPoker
 
 
 class TexasTable:
-    def __init__(self, player_count=2):
+    POKER_CLASS = TexasPoker    # 子类换成别的玩法，比如OmahaPoker
+
+    def __init__(self, player_count=2, int_cards=False, seed=None, rng=None):
+        """
+        每张桌子用自己的随机数发生器，给定seed可以重现发牌
+        rng: random.Random或者numpy的Generator，给了就不用seed
+        """
         self._player_count = player_count
-        self._texaspoker = TexasPoker()
+        self._int_cards = int_cards
+        self._rng = rng if rng is not None else random.Random(seed)
+        self._texaspoker = self.POKER_CLASS(int_cards=int_cards,
+                                            rng=self._rng)
         self._player_hole_cards = []
 
-    def shuffle(self):
+    def shuffle(self, seed=None):
         """
-        洗牌，就是重新弄一个TexasPoker实例
+        洗牌，重用同一个TexasPoker实例
+        只把牌放回来，pop_card每发一张牌做一步Fisher-Yates，比整副洗一遍省
+        seed: 给了就用它重置随机数发生器，这一手牌可以重现
+              numpy的Generator不能重置，换成default_rng(seed)
         """
-        self._texaspoker = TexasPoker()
+        if seed is not None:
+            if hasattr(self._rng, 'integers'):
+                import numpy as np
+
+                self._rng = np.random.default_rng(seed)
+                self._texaspoker.set_rng(self._rng)
+            else:
+                self._rng.seed(seed)
+        self._texaspoker.reset()
 
     def deal(self):
         """
@@ -29,21 +49,85 @@ class TexasTable:
         for player_id in range(1, self._player_count+1):
             self._player_hole_cards.append(self._texaspoker.pop_hole_cards())
 
+    def deal_board(self):
+        """
+        把没发的公共牌（翻牌、转牌、河牌）发完
+        """
+        tp = self._texaspoker
+        if not tp._flops:
+            tp.pop_flop()
+        if tp._turn is None:
+            tp.pop_turn()
+        if tp._rever is None:
+            tp.pop_rever()
+        return tp._flops + [tp._turn, tp._rever]
+
+    def deal_street(self, street):
+        """
+        发一条街的公共牌，street为'flop'、'turn'或'rever'，返回目前所有的公共牌
+        """
+        tp = self._texaspoker
+        {'flop': tp.pop_flop, 'turn': tp.pop_turn, 'rever': tp.pop_rever}[
+            street]()
+        return self.get_board()
+
+    def get_board(self):
+        """
+        已经发出的公共牌
+        """
+        return self._texaspoker.get_board()
+
     def get_hole_card(self, player_id):
         """
-        根据id获取底牌
+        根据id获取底牌，player_id从1开始
         """
         assert isinstance(player_id, int), 'player_id must be int'
-        assert player_id <= self._player_count, 'wrong player_id'
-        return self._player_hole_cards[player_id]
+        assert 1 <= player_id <= self._player_count, 'wrong player_id'
+        return self._player_hole_cards[player_id - 1]
+
+    def get_rank_keys(self, player_ids=None):
+        """
+        每个玩家的rank key，按player_id顺序
+        player_ids: 只算这些玩家（比如没弃牌的），公共牌还是只统计一次
+        """
+        if player_ids is None:
+            hole_cards_list = self._player_hole_cards
+        else:
+            hole_cards_list = [self._player_hole_cards[player_id - 1]
+                               for player_id in player_ids]
+        return self._texaspoker.get_rank_keys_by_board(hole_cards_list)
+
+    def get_current_rank_keys(self):
+        """
+        每个玩家用目前已发出的公共牌能组成的最大rank key，每条街都可以调用
+        公共牌的统计随着发牌增量更新，不用重新从头算
+        """
+        tp = self._texaspoker
+        return [tp.current_rank_key(hole_cards)
+                for hole_cards in self._player_hole_cards]
 
     def players_rank(self):
         """
         根据每个人的底牌给他们的牌排序
+        返回按牌力从大到小的分组，同一组的player_id牌力相同（平分底池），如
+        [[2], [1, 3]]
+        """
+        return self.group_rank_keys(enumerate(self.get_rank_keys(), 1))
+
+    @staticmethod
+    def group_rank_keys(player_keys):
+        """
+        给出(player_id, rank key)的序列，按rank key从大到小分组
         """
+        groups = {}
+        for player_id, key in player_keys:
+            groups.setdefault(key, []).append(player_id)
+        return [groups[key] for key in sorted(groups, reverse=True)]
 
 
 if __name__ == '__main__':
     tb = TexasTable()
     tb.deal()
     print(tb.get_hole_card(1))
+    print(tb.deal_board())
+    print(tb.players_rank())
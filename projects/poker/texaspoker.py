@@ -22,11 +22,36 @@ class TexasPoker(Poker):
         'high card'             # 9. 高牌
     ]
 
-    def __init__(self):
-        super(TexasPoker, self).__init__()
+    # 牌型等级，数值越大牌越大；CARD_TYPE[9 - category]即为牌型名称
+    ROYAL_FLUSH = 9
+    STRAIGHT_FLUSH = 8
+    FOUR_OF_A_KIND = 7
+    FULLHOUSE = 6
+    FLUSH = 5
+    STRAIGHT = 4
+    THREE_OF_A_KIND = 3
+    TWO_PAIRS = 2
+    ONE_PAIR = 1
+    HIGH_CARD = 0
+    CATEGORY_SHIFT = 20     # rank key中牌型所在的位，低20位是5张踢脚各4位
+    _batch_evaluator = None
+
+    def __init__(self, int_cards=False, rng=None):
+        super(TexasPoker, self).__init__(int_cards=int_cards, rng=rng)
         self._flops = []
         self._turn = None
         self._rever = None
+        self._board_state = HandState()
+
+    def reset(self):
+        """
+        把所有的牌放回来，清空公共牌
+        """
+        super(TexasPoker, self).reset()
+        self._flops = []
+        self._turn = None
+        self._rever = None
+        self._board_state.clear()
 
     def pop_hole_cards(self):
         hole_cards = []
@@ -38,9 +63,10 @@ class TexasPoker(Poker):
         """
         前三张公共牌
         """
-        self._flops.append(self.pop_card())
-        self._flops.append(self.pop_card())
-        self._flops.append(self.pop_card())
+        for i in range(3):
+            card = self.pop_card()
+            self._flops.append(card)
+            self._board_state.add(card)
         return self._flops
 
     def pop_turn(self):
@@ -48,6 +74,7 @@ class TexasPoker(Poker):
         第四张公共牌
         """
         self._turn = self.pop_card()
+        self._board_state.add(self._turn)
         return self._turn
 
     def pop_rever(self):
@@ -55,8 +82,39 @@ class TexasPoker(Poker):
         第五张公共牌
         """
         self._rever = self.pop_card()
+        self._board_state.add(self._rever)
         return self._rever
 
+    def get_board(self):
+        """
+        已经发出的公共牌
+        """
+        return [card for card in self._flops + [self._turn, self._rever]
+                if card is not None]
+
+    @property
+    def board_state(self):
+        """
+        用pop_flop、pop_turn、pop_rever发出的公共牌的HandState
+        直接给_flops等赋值不会更新它
+        """
+        return self._board_state
+
+    def current_state(self, hole_cards):
+        """
+        底牌加上目前已发出的公共牌的HandState
+        """
+        state = self._board_state.copy()
+        for card in hole_cards:
+            state.add(card)
+        return state
+
+    def current_rank_key(self, hole_cards):
+        """
+        底牌加上目前已发出的公共牌的最大牌力，每条街都可以调用
+        """
+        return self.current_state(hole_cards).rank_key()
+
     def merge_cards(self, hole_cards):
         """
         将底牌、翻牌、转牌、河牌合到一起
@@ -77,6 +135,10 @@ class TexasPoker(Poker):
             'heart': [],
             'spade': []
         }
+        if self._int_cards:
+            for card in cards:
+                cards_ordered[self.SUITS[card & 3]].append(card)
+            return cards_ordered
         for card in cards:
             cards_ordered[card[0]].append(card)
         return cards_ordered
@@ -106,7 +168,10 @@ class TexasPoker(Poker):
         """
         给出一个牌的列表，给出权重值的列表
         """
-        weights = [self.POINT_WEIGHT[card[1]] for card in cards]
+        if self._int_cards:
+            weights = [(card >> 2) + 1 for card in cards]
+        else:
+            weights = [self.POINT_WEIGHT[card[1]] for card in cards]
         weights.sort(reverse=reverse)
         return weights
 
@@ -361,8 +426,7 @@ class TexasPoker(Poker):
         for cards in cards_by_suit.values():
             if len(cards) >= 5:
                 largest_card = self.get_largest_card(cards)
-                weight = self.POINT_WEIGHT[largest_card[1]]
-                return weight
+                return self.card_weight(largest_card)
 
     def _flush_compare(self, hole1, hole2):
         weight1 = self.is_flush_weight(hole1)
@@ -435,30 +499,203 @@ class TexasPoker(Poker):
         else:
             return False
 
+    @staticmethod
+    def _straight_high(mask):
+        """
+        给出点数位图（第w位表示权重w），如果有顺子返回最大牌权重，否则返回0
+        """
+        mask |= (mask >> 13) & 1    # A也可以当作最小的牌，A2345
+        mask &= mask << 1 & mask << 2 & mask << 3 & mask << 4
+        return mask.bit_length() - 1 if mask else 0
+
+    @staticmethod
+    def _top_weights(mask, count):
+        """
+        给出点数位图，从大到小返回最多count个权重值
+        """
+        weights = []
+        weight = 13
+        while mask and len(weights) < count:
+            if mask >> weight & 1:
+                weights.append(weight)
+                mask ^= 1 << weight
+            weight -= 1
+        return weights
+
+    @classmethod
+    def _pack_rank_key(cls, category, weights):
+        """
+        把牌型和最多5个踢脚权重打包成一个整数
+        """
+        key = category
+        for i in range(5):
+            key = key << 4 | (weights[i] if i < len(weights) else 0)
+        return key
+
+    @classmethod
+    def _rank_key_from_counts(cls, counts, suit_masks):
+        """
+        根据每个权重的张数（counts[w]）和每种花色的点数位图计算rank key
+        """
+        for suit_mask in suit_masks:
+            if bin(suit_mask).count('1') >= 5:
+                high = cls._straight_high(suit_mask)
+                if high == 13:
+                    return cls.ROYAL_FLUSH << cls.CATEGORY_SHIFT
+                if high:
+                    return cls._pack_rank_key(cls.STRAIGHT_FLUSH, [high])
+                flush_mask = suit_mask
+                break
+        else:
+            flush_mask = 0
+
+        quads = []
+        trips = []
+        pairs = []
+        rank_mask = 0
+        for weight in range(13, 0, -1):
+            count = counts[weight]
+            if count == 0:
+                continue
+            rank_mask |= 1 << weight
+            if count == 4:
+                quads.append(weight)
+            elif count == 3:
+                trips.append(weight)
+            elif count == 2:
+                pairs.append(weight)
+
+        if quads:
+            kicker = cls._top_weights(rank_mask ^ 1 << quads[0], 1)
+            return cls._pack_rank_key(cls.FOUR_OF_A_KIND, quads[:1] + kicker)
+        if trips and (len(trips) > 1 or pairs):
+            pair = max(trips[1:2] + pairs[:1])
+            return cls._pack_rank_key(cls.FULLHOUSE, [trips[0], pair])
+        if flush_mask:
+            return cls._pack_rank_key(
+                cls.FLUSH, cls._top_weights(flush_mask, 5))
+        high = cls._straight_high(rank_mask)
+        if high:
+            return cls._pack_rank_key(cls.STRAIGHT, [high])
+        if trips:
+            kickers = cls._top_weights(rank_mask ^ 1 << trips[0], 2)
+            return cls._pack_rank_key(
+                cls.THREE_OF_A_KIND, trips[:1] + kickers)
+        if len(pairs) >= 2:
+            kicker = cls._top_weights(
+                rank_mask ^ 1 << pairs[0] ^ 1 << pairs[1], 1)
+            return cls._pack_rank_key(cls.TWO_PAIRS, pairs[:2] + kicker)
+        if pairs:
+            kickers = cls._top_weights(rank_mask ^ 1 << pairs[0], 3)
+            return cls._pack_rank_key(cls.ONE_PAIR, pairs[:1] + kickers)
+        return cls._pack_rank_key(
+            cls.HIGH_CARD, cls._top_weights(rank_mask, 5))
+
+    @classmethod
+    def rank_key(cls, cards):
+        """
+        一次遍历牌的列表（最多7张），返回可以直接比较大小的rank key
+        rank key越大牌越大，相等即平局
+        """
+        counts = [0] * 14
+        suit_masks = {'club': 0, 'diamond': 0, 'heart': 0, 'spade': 0}
+        for card in cards:
+            if card is None:    # 还没发的转牌、河牌
+                continue
+            weight = cls.POINT_WEIGHT[card[1]]
+            counts[weight] += 1
+            suit_masks[card[0]] |= 1 << weight
+        return cls._rank_key_from_counts(counts, suit_masks.values())
+
+    @classmethod
+    def rank_key_ints(cls, cards):
+        """
+        同rank_key，牌用整数编码
+        """
+        counts = [0] * 14
+        suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            if card is None:
+                continue
+            weight = (card >> 2) + 1
+            counts[weight] += 1
+            suit_masks[card & 3] |= 1 << weight
+        return cls._rank_key_from_counts(counts, suit_masks)
+
+    @classmethod
+    def _count_cards(cls, cards, counts, suit_masks):
+        """
+        把牌加到每个权重的张数和每种花色的点数位图里，两种编码都可以
+        """
+        for card in cards:
+            if card is None:
+                continue
+            if isinstance(card, int):
+                weight = (card >> 2) + 1
+                suit = card & 3
+            else:
+                weight = cls.POINT_WEIGHT[card[1]]
+                suit = cls.SUIT_INDEX[card[0]]
+            counts[weight] += 1
+            suit_masks[suit] |= 1 << weight
+
+    def get_rank_keys_by_board(self, hole_cards_list):
+        """
+        公共牌只统计一次，返回每组底牌的rank key
+        """
+        board_counts = [0] * 14
+        board_suit_masks = [0, 0, 0, 0]
+        self._count_cards(self._flops + [self._turn, self._rever],
+                          board_counts, board_suit_masks)
+        keys = []
+        for hole_cards in hole_cards_list:
+            counts = board_counts[:]
+            suit_masks = board_suit_masks[:]
+            self._count_cards(hole_cards, counts, suit_masks)
+            keys.append(self._rank_key_from_counts(counts, suit_masks))
+        return keys
+
+    def get_rank_key(self, hole_cards):
+        """
+        底牌加上公共牌的rank key
+        """
+        if self._int_cards:
+            return self.rank_key_ints(self.merge_cards(hole_cards))
+        return self.rank_key(self.merge_cards(hole_cards))
+
+    @classmethod
+    def get_card_type_by_key(cls, key):
+        """
+        根据rank key返回牌型名称
+        """
+        return cls.CARD_TYPE[cls.ROYAL_FLUSH - (key >> cls.CATEGORY_SHIFT)]
+
     def get_card_type(self, hole_cards):
         """
         判断一副牌的排型
         """
-        if self.is_royal_flush(hole_cards):
-            return 'Royal Flush'    # 0
-        if self.is_straight_flush(hole_cards):
-            return 'Straight Flush'
-        if self.is_four_of_a_kind(hole_cards):
-            return 'Four of a Kind'
-        if self.is_fullhouse(hole_cards):
-            return 'Fullhouse'
-        if self.is_flush(hole_cards):
-            return 'Flush'
-        if self.is_straight(hole_cards):
-            return 'Straight'
-        if self.is_three_of_a_kind(hole_cards):
-            return 'Three of a kind'
-        if self.is_two_paires(hole_cards):
-            return 'Two Pairs'
-        if self.is_one_pair(hole_cards):
-            return 'one Pair'
-        else:
-            return 'high card'
+        return self.get_card_type_by_key(self.get_rank_key(hole_cards))
+
+    @classmethod
+    def get_rank_keys(cls, cards):
+        """
+        批量计算，cards为(N, 7)的整数编码数组，返回N个rank key，需要numpy
+        """
+        return cls._get_batch_evaluator().rank_keys(cards)
+
+    @classmethod
+    def get_card_types(cls, cards):
+        """
+        批量判断牌型，需要numpy
+        """
+        return cls._get_batch_evaluator().card_types(cards)
+
+    @classmethod
+    def _get_batch_evaluator(cls):
+        if cls._batch_evaluator is None:
+            from batch_eval import BatchEvaluator
+            TexasPoker._batch_evaluator = BatchEvaluator()
+        return cls._batch_evaluator
 
     def compare_hole_cards(self, cards1, cards2):
         """
@@ -468,27 +705,160 @@ class TexasPoker(Poker):
             cards1 == cards2:   0
             cards1 < cards2:    -1
         """
-        type1 = self.get_card_type(cards1)
-        type2 = self.get_card_type(cards2)
-        if self.CARD_TYPE.index(type1) < self.CARD_TYPE.index(type2):
-            return -1
-        elif self.CARD_TYPE.index(type1) > self.CARD_TYPE.index(type2):
-            return 1
-        # 同一种牌型的情况：
-        if type1 == self.CARD_TYPE[0]:      # 同花大顺不分大小
-            return 0
-        elif type1 == self.CARD_TYPE[1]:    # 同花顺看最大牌
-            return self._if_straight_return_largest(cards1, cards2)
-        elif type1 == self.CARD_TYPE[2]:    # 四条看四条大小，再看单牌大小
-            return self.test_is_four_od_a_kind_weight(cards1, cards2)
-        elif type1 == self.CARD_TYPE[3]:    # 葫芦分别看三条大小和一对儿大小
-            self._fullhouse_compare(cards1, cards2)
-        elif type1 == self.CARD_TYPE[4]:    # 同花看同花的最高牌
-            self._flush_compare(cards1, cards2)
-        elif type1 == self.CARD_TYPE[5]:    # 顺子看最高牌
-            self._straight_compare(cards1, cards2)
-        elif type1 == self.CARD_TYPE[6]:    # 三条看三条的大小，然后看高牌
-            pass
+        return self._compare_two_weight(
+            self.get_rank_key(cards1), self.get_rank_key(cards2))
+
+
+class HandState:
+    """
+    增量的牌面状态：每加一张牌O(1)更新各花色张数、各点数张数和点数位图，
+    随时可以算出目前最大的rank key（结果缓存到下一次改动）
+
+    count_masks[k]是张数至少为k的点数位图（第w位表示权重w），
+    count_masks[1]就是出现过的所有点数，用来找顺子
+    """
+    __slots__ = ('counts', 'suit_counts', 'suit_masks', 'count_masks',
+                 'size', '_key')
+
+    def __init__(self, cards=()):
+        self.clear()
+        for card in cards:
+            self.add(card)
+
+    def clear(self):
+        self.counts = [0] * 14
+        self.suit_counts = [0, 0, 0, 0]
+        self.suit_masks = [0, 0, 0, 0]
+        self.count_masks = [0, 0, 0, 0, 0]
+        self.size = 0
+        self._key = None
+
+    def copy(self):
+        state = HandState.__new__(HandState)
+        state.counts = self.counts[:]
+        state.suit_counts = self.suit_counts[:]
+        state.suit_masks = self.suit_masks[:]
+        state.count_masks = self.count_masks[:]
+        state.size = self.size
+        state._key = self._key
+        return state
+
+    @staticmethod
+    def _split(card):
+        if isinstance(card, int):
+            return (card >> 2) + 1, card & 3
+        return TexasPoker.POINT_WEIGHT[card[1]], TexasPoker.SUIT_INDEX[card[0]]
+
+    def add(self, card):
+        """
+        加一张牌，两种编码都可以
+        """
+        weight, suit = self._split(card)
+        bit = 1 << weight
+        count = self.counts[weight] + 1
+        self.counts[weight] = count
+        self.count_masks[count] |= bit
+        self.suit_counts[suit] += 1
+        self.suit_masks[suit] |= bit
+        self.size += 1
+        self._key = None
+
+    def remove(self, card):
+        """
+        拿掉一张之前加过的牌，枚举后面的牌时用来回退
+        """
+        weight, suit = self._split(card)
+        bit = 1 << weight
+        count = self.counts[weight]
+        self.counts[weight] = count - 1
+        self.count_masks[count] &= ~bit
+        self.suit_counts[suit] -= 1
+        self.suit_masks[suit] &= ~bit
+        self.size -= 1
+        self._key = None
+
+    @property
+    def rank_mask(self):
+        return self.count_masks[1]
+
+    @property
+    def straight_mask(self):
+        """
+        能组成顺子的最大牌的位图，A2345的最大牌记为5（权重4）
+        """
+        mask = self.count_masks[1]
+        mask |= (mask >> 13) & 1
+        return mask & mask << 1 & mask << 2 & mask << 3 & mask << 4
+
+    @property
+    def flush_suit(self):
+        """
+        有5张以上的花色序号，没有返回None
+        """
+        for suit in range(4):
+            if self.suit_counts[suit] >= 5:
+                return suit
+        return None
+
+    @staticmethod
+    def _top(mask, count):
+        weights = []
+        while mask and len(weights) < count:
+            weight = mask.bit_length() - 1
+            weights.append(weight)
+            mask ^= 1 << weight
+        return weights
+
+    def rank_key(self):
+        """
+        目前这些牌（最多7张）里最大的rank key
+        """
+        if self._key is None:
+            self._key = self._rank_key()
+        return self._key
+
+    def _rank_key(self):
+        tp = TexasPoker
+        pack = tp._pack_rank_key
+        flush_mask = 0
+        suit = self.flush_suit
+        if suit is not None:
+            flush_mask = self.suit_masks[suit]
+            high = tp._straight_high(flush_mask)
+            if high == 13:
+                return tp.ROYAL_FLUSH << tp.CATEGORY_SHIFT
+            if high:
+                return pack(tp.STRAIGHT_FLUSH, [high])
+
+        ranks, pairs, trips, quads = self.count_masks[1:]
+        if quads:
+            quad = quads.bit_length() - 1
+            return pack(tp.FOUR_OF_A_KIND,
+                        [quad] + self._top(ranks ^ 1 << quad, 1))
+        if trips:
+            trip = trips.bit_length() - 1
+            rest = pairs ^ 1 << trip    # 另一个三条也可以当对子用
+            if rest:
+                return pack(tp.FULLHOUSE, [trip, rest.bit_length() - 1])
+        if flush_mask:
+            return pack(tp.FLUSH, self._top(flush_mask, 5))
+        high = tp._straight_high(ranks)
+        if high:
+            return pack(tp.STRAIGHT, [high])
+        if trips:
+            return pack(tp.THREE_OF_A_KIND,
+                        [trip] + self._top(ranks ^ 1 << trip, 2))
+        if pairs & (pairs - 1):
+            top_pairs = self._top(pairs, 2)
+            kickers = ranks ^ 1 << top_pairs[0] ^ 1 << top_pairs[1]
+            return pack(tp.TWO_PAIRS, top_pairs + self._top(kickers, 1))
+        if pairs:
+            pair = pairs.bit_length() - 1
+            return pack(tp.ONE_PAIR, [pair] + self._top(ranks ^ 1 << pair, 3))
+        return pack(tp.HIGH_CARD, self._top(ranks, 5))
+
+    def card_type(self):
+        return TexasPoker.get_card_type_by_key(self.rank_key())
 
 
 if __name__ == '__main__':